@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+D-GRID Result Aggregator
+
+Con RESULT_MODE=branch ogni nodo pusha i risultati sul proprio ref
+refs/dgrid/results/<node_id>, senza contesa sul branch principale.
+Questo script li riporta su main a lotti.
+
+Responsabilità:
+1. Scarica main, i branch dei risultati e i ref di avanzamento
+   refs/dgrid/aggregated/<node_id> (ultimo commit già aggregato per nodo)
+2. Raccoglie i file dei commit non ancora aggregati (solo tasks/completed,
+   tasks/failed e cache/results)
+3. Crea un unico commit lineare su main con i risultati, rimuovendo i task
+   corrispondenti da tasks/in_progress
+4. Pusha main e i ref di avanzamento in un solo push atomico: se main o un
+   ref è cambiato nel frattempo (worker o altro aggregatore), riscarica e
+   ricalcola il lotto
+
+Il commit è costruito con un indice temporaneo (read-tree + update-index),
+senza checkout: il working tree del runner non viene toccato.
+
+Uso come leader: con AGGREGATE_INTERVAL > 0 lo script resta attivo e
+aggrega ogni AGGREGATE_INTERVAL secondi (es. su un worker del cluster).
+"""
+
+import os
+import sys
+import tempfile
+import subprocess
+import time
+from pathlib import Path
+
+# --- CONFIGURAZIONE ---
+REPO_ROOT = Path(__file__).parent.parent.parent
+REMOTE = os.getenv("AGGREGATE_REMOTE", "origin")
+BRANCH = os.getenv("AGGREGATE_BRANCH", "main")
+MAX_ATTEMPTS = int(os.getenv("AGGREGATE_MAX_ATTEMPTS", "5"))  # Push ritentati se main cambia nel frattempo
+AGGREGATE_INTERVAL = float(os.getenv("AGGREGATE_INTERVAL", "0"))  # Secondi tra due aggregazioni (0 = una sola)
+RESULT_DIRS = ["tasks/completed", "tasks/failed", "cache/results"]  # cache/results: indice condiviso dei risultati (worker/result_cache.py)
+RESULT_REF_PREFIX = "refs/dgrid/results"  # Branch dei risultati, uno per nodo (vedi worker/result_branch.py)
+AGGREGATED_REF_PREFIX = "refs/dgrid/aggregated"  # Ultimo commit aggregato di ogni nodo
+NULL_SHA = "0" * 40
+
+
+def git(*args, input=None, env=None, check=True):
+    """Runs a git command in the repository and returns stdout."""
+    result = subprocess.run(["git", *args], cwd=REPO_ROOT, input=input, capture_output=True, check=False,
+                            env={**os.environ, **env} if env else None)
+    if check and result.returncode != 0:
+        raise RuntimeError(f"git {args[0]} failed: {result.stderr.decode().strip()}")
+    return result.stdout.decode().strip()
+
+
+def fetch():
+    """Fetches BRANCH, the result branches and the aggregation refs (forced: the remote is authoritative)."""
+    git("fetch", "--quiet", REMOTE, f"+refs/heads/{BRANCH}:refs/remotes/{REMOTE}/{BRANCH}",
+        f"+{RESULT_REF_PREFIX}/*:{RESULT_REF_PREFIX}/*", f"+{AGGREGATED_REF_PREFIX}/*:{AGGREGATED_REF_PREFIX}/*")
+
+
+def pending_results():
+    """
+    Result commits not aggregated yet, per node.
+    
+    Returns:
+        dict: node_id -> {"tip", "commits", "files"}, with files as an
+              ordered dict of path -> (mode, blob sha), later commits first
+              to win
+    """
+    pending = {}
+    refs = git("for-each-ref", "--format=%(refname) %(objectname)", RESULT_REF_PREFIX).splitlines()
+    for line in refs:
+        ref, tip = line.split()
+        node_id = ref[len(RESULT_REF_PREFIX) + 1:]
+        done = git("rev-parse", "--verify", "-q", f"{AGGREGATED_REF_PREFIX}/{node_id}", check=False)
+        commits = git("rev-list", "--reverse", tip, *(["--not", done] if done else [])).split()
+        if not commits:
+            continue
+        
+        files = {}
+        for commit in commits:
+            for entry in git("ls-tree", "-r", "-z", commit, "--", *RESULT_DIRS).split("\0"):
+                if entry:
+                    info, path = entry.split("\t", 1)
+                    mode, _, sha = info.split(" ")
+                    files[path] = (mode, sha)
+        pending[node_id] = {"tip": tip, "commits": len(commits), "files": files}
+    return pending
+
+
+def build_commit(base, pending):
+    """
+    One commit on top of base adding every pending result file and removing
+    the matching tasks from tasks/in_progress.
+    
+    Returns:
+        tuple: (commit sha, results, tasks removed from in_progress)
+    """
+    files = {path: entry for node in pending.values() for path, entry in node["files"].items()}
+    tasks = {Path(path).name for path in files if path.startswith("tasks/") and not path.endswith((".log", "/.gitkeep"))}
+    removed = []
+    if tasks:
+        removed = git("--literal-pathspecs", "ls-tree", "--name-only", base, "--",
+                      *(f"tasks/in_progress/{task}" for task in tasks)).splitlines()
+    
+    index_info = "".join(f"{mode} {sha}\t{path}\0" for path, (mode, sha) in files.items())
+    index_info += "".join(f"0 {NULL_SHA}\t{path}\0" for path in removed)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {"GIT_INDEX_FILE": str(Path(tmp) / "index")}
+        git("read-tree", base, env=env)
+        git("update-index", "-z", "--index-info", input=index_info.encode(), env=env)
+        tree = git("write-tree", env=env)
+    
+    results = len(tasks)
+    message = (f"[D-GRID] Aggregate {results} result(s) from {len(pending)} node(s)\n\n"
+               + "\n".join(f"{node_id}: {len(node['files'])} file(s) in {node['commits']} commit(s) up to {node['tip']}"
+                           for node_id, node in sorted(pending.items())) + "\n")
+    return git("commit-tree", tree, "-p", base, "-m", message), results, len(removed)
+
+
+def aggregate(max_attempts=MAX_ATTEMPTS):
+    """
+    Merges the pending node results into BRANCH and pushes it together with
+    the aggregation refs.
+    
+    Returns:
+        dict: Summary (results, nodes, tasks removed from in_progress, new
+              tip), or None if no result was pending.
+    """
+    for attempt in range(1, max_attempts + 1):
+        fetch()
+        pending = pending_results()
+        if not pending:
+            return None
+        
+        base = git("rev-parse", f"refs/remotes/{REMOTE}/{BRANCH}")
+        commit, results, removed = build_commit(base, pending)
+        # Non-forced and atomic: main and every aggregation ref must still be
+        # where they were read, or nothing is updated
+        push = subprocess.run(
+            ["git", "push", "--quiet", "--atomic", REMOTE, f"{commit}:refs/heads/{BRANCH}",
+             *(f"{node['tip']}:{AGGREGATED_REF_PREFIX}/{node_id}" for node_id, node in pending.items())],
+            cwd=REPO_ROOT, capture_output=True, text=True
+        )
+        if push.returncode == 0:
+            for node_id, node in pending.items():
+                git("update-ref", f"{AGGREGATED_REF_PREFIX}/{node_id}", node["tip"])
+            return {"results": results, "nodes": sorted(pending), "removed": removed, "commit": commit}
+        
+        print(f"   ⚠️  Push rejected (attempt {attempt}/{max_attempts}): {push.stderr.strip()}")
+        time.sleep(attempt)
+    
+    raise RuntimeError(f"Push still rejected after {max_attempts} attempts")
+
+
+def write_summary(result):
+    """Appends the aggregation outcome to the GitHub Actions step summary."""
+    summary_path = os.getenv("GITHUB_STEP_SUMMARY")
+    if not summary_path:
+        return
+    
+    if result is None:
+        lines = ["## 📥 Result Aggregation", "", "ℹ️ No pending results."]
+    else:
+        lines = ["## 📥 Result Aggregation", "",
+                 f"**Results:** {result['results']} from {len(result['nodes'])} node(s) "
+                 f"({', '.join(result['nodes'])}), **removed from in_progress:** {result['removed']}"]
+    with open(summary_path, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def run_once():
+    """One aggregation with console output; returns the exit code."""
+    try:
+        result = aggregate()
+    except RuntimeError as e:
+        print(f"❌ Aggregation failed: {e}")
+        return 1
+    
+    if result is None:
+        print("   → No pending results")
+    else:
+        print(f"   ✓ {result['results']} result(s) from {', '.join(result['nodes'])} merged into {BRANCH} "
+              f"({result['removed']} task(s) removed from in_progress)")
+    write_summary(result)
+    return 0
+
+
+def main():
+    """Main entry point."""
+    print("=" * 70)
+    print("📥 D-GRID Result Aggregator")
+    print("=" * 70)
+    print(f"  Branch: {REMOTE}/{BRANCH}, results: {RESULT_REF_PREFIX}/*")
+    
+    if AGGREGATE_INTERVAL <= 0:
+        return run_once()
+    
+    print(f"  Leader mode: aggregating every {AGGREGATE_INTERVAL:g}s")
+    try:
+        while True:
+            run_once()
+            time.sleep(AGGREGATE_INTERVAL)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+D-GRID History Compaction
+
+Responsabilità:
+1. Misura clone (depth=1 e completo) e dimensione del pack prima della compattazione
+2. Trova il commit di taglio: il più recente più vecchio di RETENTION_DAYS
+3. Crea un commit snapshot senza genitori con l'albero del commit di taglio,
+   senza i risultati già presenti (tasks/completed, tasks/failed)
+4. Riapplica sopra lo snapshot le modifiche dei commit più recenti (stessi
+   autori e messaggi)
+5. Pusha il nuovo main e la vecchia storia in refs/dgrid/archive/<timestamp>
+6. Misura di nuovo clone e pack
+
+I risultati archiviati restano leggibili dal ref di archivio:
+    git fetch origin refs/dgrid/archive/<timestamp>
+    git show FETCH_HEAD:tasks/completed/<task>.json
+
+Sicurezza con i worker attivi:
+- Il push usa --force-with-lease sul tip letto: se un worker ha pushato nel
+  frattempo, i suoi commit vengono riapplicati sopra e il push ritentato
+- Coda, task in corso e nodi restano identici, cambia solo la storia
+- I worker riconoscono la riscrittura al pull successivo e riapplicano solo
+  i propri commit locali (vedi GitHandler._rebase_onto())
+- La storia completa resta nel ref di archivio, che i worker non scaricano
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+import time
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+# --- CONFIGURAZIONE ---
+REPO_ROOT = Path(__file__).parent.parent.parent
+REMOTE = os.getenv("COMPACTION_REMOTE", "origin")
+BRANCH = os.getenv("COMPACTION_BRANCH", "main")
+RETENTION_DAYS = float(os.getenv("RETENTION_DAYS", "7"))  # Storia più recente mantenuta commit per commit
+MAX_ATTEMPTS = int(os.getenv("COMPACTION_MAX_ATTEMPTS", "5"))  # Push ritentati se i worker pushano nel frattempo
+ARCHIVE_RESULTS = os.getenv("ARCHIVE_RESULTS", "true").lower() == "true"  # Risultati più vecchi del taglio solo nell'archivio
+RESULT_DIRS = ["tasks/completed", "tasks/failed"]
+ARCHIVE_REF_PREFIX = "refs/dgrid/archive"  # Storia completa prima di ogni compattazione
+WORK_REF = "refs/dgrid/compaction"  # Ref locale della storia riscritta
+
+
+def git(*args, input=None, cwd=None, check=True):
+    """Runs a git command in the repository and returns stdout (bytes if input is bytes)."""
+    result = subprocess.run(["git", *args], cwd=cwd or REPO_ROOT, input=input, capture_output=True, check=False)
+    if check and result.returncode != 0:
+        raise RuntimeError(f"git {args[0]} failed: {result.stderr.decode().strip()}")
+    return result.stdout if isinstance(input, bytes) else result.stdout.decode().strip()
+
+
+def find_cutoff(tip, retention_days):
+    """
+    Newest first-parent ancestor of tip committed before the retention window.
+    
+    Returns:
+        str: Commit sha, or None if the whole history is within the window
+             or the cutoff is already a root commit (nothing to squash).
+    """
+    since = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    cutoff = git("rev-list", "--first-parent", "-n1", f"--before={int(since.timestamp())}", tip)
+    if not cutoff or not git("rev-list", "--parents", "-n1", cutoff).split()[1:]:
+        return None
+    return cutoff
+
+
+def read_commits(shas):
+    """
+    Raw headers and message of each commit (one 'git cat-file --batch').
+    
+    Returns:
+        list: (headers, message) with headers as a list of (key, value) bytes
+    """
+    if not shas:
+        return []
+    output = git("cat-file", "--batch", input="".join(f"{sha}\n" for sha in shas).encode())
+    commits = []
+    pos = 0
+    for _ in shas:
+        header_end = output.index(b"\n", pos)
+        size = int(output[pos:header_end].split()[2])
+        raw = output[header_end + 1:header_end + 1 + size]
+        pos = header_end + 1 + size + 1
+        
+        head, _, message = raw.partition(b"\n\n")
+        headers = []
+        for line in head.split(b"\n"):
+            if line.startswith(b" ") and headers:
+                # Continuation of a multi-line header (e.g. gpgsig)
+                key, value = headers[-1]
+                headers[-1] = (key, value + b"\n" + line[1:])
+            else:
+                key, _, value = line.partition(b" ")
+                headers.append((key, value))
+        commits.append((headers, message))
+    return commits
+
+
+def _data(payload):
+    return b"data %d\n%s\n" % (len(payload), payload)
+
+
+def _path(path):
+    """Path as a fast-import C-style quoted string."""
+    return b'"%s"' % path.replace(b"\\", b"\\\\").replace(b'"', b'\\"').replace(b"\n", b"\\n")
+
+
+def read_changes(pairs):
+    """
+    Changed paths of each commit against its first parent (one 'git diff-tree --stdin').
+    
+    Args:
+        pairs: (commit, parent) tuples
+    
+    Returns:
+        dict: commit -> list of (mode, blob, path) bytes, mode b"000000" for a deletion
+    """
+    if not pairs:
+        return {}
+    output = git("diff-tree", "--stdin", "--always", "-r", "--no-renames", "-z",
+                 input="".join(f"{commit} {parent}\n" for commit, parent in pairs).encode())
+    changes = {}
+    fields = output.split(b"\0")
+    i = 0
+    while i < len(fields):
+        field = fields[i]
+        if field.startswith(b":"):
+            _, mode, _, blob, _ = field[1:].split(b" ")
+            changes[commit].append((mode, blob, fields[i + 1]))
+            i += 2
+            continue
+        if field:
+            commit = field.decode()
+            changes[commit] = []
+        i += 1
+    return changes
+
+
+def make_snapshot(cutoff, message, archive_results=ARCHIVE_RESULTS):
+    """
+    Writes the parentless snapshot commit: the tree of the cutoff commit,
+    without the results it holds if archive_results (they stay readable in
+    the archive ref).
+    
+    Returns:
+        str: Sha of the snapshot commit
+    """
+    stream = [b"commit %s\nmark :1\ncommitter %s\n" % (WORK_REF.encode(), git("var", "GIT_COMMITTER_IDENT").encode()),
+              _data(message.encode()),
+              b'M 040000 %s ""\n' % git("rev-parse", f"{cutoff}^{{tree}}").encode()]
+    if archive_results:
+        placeholders = git("ls-tree", "-z", cutoff, "--", *[f"{d}/.gitkeep" for d in RESULT_DIRS]).split("\0")
+        stream += [b"D %s\n" % _path(d.encode()) for d in RESULT_DIRS]
+        for entry in filter(None, placeholders):
+            info, path = entry.split("\t", 1)
+            mode, _, blob = info.split(" ")
+            stream.append(b"M %s %s %s\n" % (mode.encode(), blob.encode(), _path(path.encode())))
+    stream.append(b"\n")
+    
+    git("fast-import", "--quiet", "--force", input=b"".join(stream))
+    return git("rev-parse", WORK_REF)
+
+
+def replay(shas, onto):
+    """
+    Rewrites commits with 'git fast-import' on a new first-parent chain:
+    each one applies the same changes as in the old history (against its
+    first parent), with the same author, committer and message.
+    
+    Args:
+        shas: Commits to replay, oldest first
+        onto: Commit to build on
+    
+    Returns:
+        str: Sha of the new tip
+    """
+    commits = read_commits(shas)
+    parents = [next(value for key, value in headers if key == b"parent").decode() for headers, _ in commits]
+    changes = read_changes(list(zip(shas, parents)))
+    
+    stream = []
+    for mark, (sha, (headers, message)) in enumerate(zip(shas, commits), start=1):
+        fields = dict(headers)
+        stream.append(b"commit %s\nmark :%d\nauthor %s\ncommitter %s\n" % (WORK_REF.encode(), mark,
+                                                                           fields[b"author"], fields[b"committer"]))
+        if b"encoding" in fields:
+            stream.append(b"encoding %s\n" % fields[b"encoding"])
+        stream.append(_data(message))
+        stream.append(b"from %s\n" % (b":%d" % (mark - 1) if mark > 1 else onto.encode()))
+        for mode, blob, path in changes[sha]:
+            if mode == b"000000":
+                stream.append(b"D %s\n" % _path(path))
+            else:
+                stream.append(b"M %s %s %s\n" % (mode, blob, _path(path)))
+        stream.append(b"\n")
+    
+    if stream:
+        git("fast-import", "--quiet", "--force", input=b"".join(stream))
+        return git("rev-parse", WORK_REF)
+    return onto
+
+
+def measure_clone(url):
+    """
+    Clones the branch twice (depth=1, as workers do, and full) into a
+    temporary directory and measures time and pack size.
+    Credentials set up by actions/checkout (http.*.extraheader) are reused.
+    
+    Returns:
+        dict: {"shallow": {...}, "full": {...}} with seconds, pack_kb, commits
+    """
+    auth = []
+    for line in git("config", "--get-regexp", r"^http\..*extraheader$", check=False).splitlines():
+        key, _, value = line.partition(" ")
+        auth += ["-c", f"{key}={value}"]
+    
+    results = {}
+    for name, depth in (("shallow", ["--depth=1"]), ("full", [])):
+        target = Path(tempfile.mkdtemp(prefix="dgrid-clone-"))
+        try:
+            start = time.perf_counter()
+            git(*auth, "clone", "--quiet", "--bare", "--single-branch", "--branch", BRANCH, *depth, url,
+                str(target / "repo.git"), cwd=target)
+            elapsed = time.perf_counter() - start
+            counts = dict(line.split(": ", 1) for line in
+                          git("count-objects", "-v", cwd=target / "repo.git").splitlines())
+            results[name] = {
+                "seconds": round(elapsed, 2),
+                "pack_kb": int(counts["size-pack"]),
+                "commits": int(git("rev-list", "--count", "HEAD", cwd=target / "repo.git"))
+            }
+        finally:
+            shutil.rmtree(target, ignore_errors=True)
+    return results
+
+
+def compact(retention_days=RETENTION_DAYS, max_attempts=MAX_ATTEMPTS):
+    """
+    Squashes the history of BRANCH older than the retention window and
+    pushes it, safely against concurrent worker pushes.
+    
+    Returns:
+        dict: Summary (squashed and kept commits, archive ref), or None if
+              there was nothing to compact.
+    """
+    git("fetch", "--quiet", REMOTE, f"+refs/heads/{BRANCH}:refs/remotes/{REMOTE}/{BRANCH}")
+    tip = git("rev-parse", f"refs/remotes/{REMOTE}/{BRANCH}")
+    cutoff = find_cutoff(tip, retention_days)
+    if cutoff is None:
+        print(f"   → No history older than {retention_days} days to squash")
+        return None
+    
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    archive_ref = f"{ARCHIVE_REF_PREFIX}/{stamp}"
+    squashed = int(git("rev-list", "--count", cutoff))
+    cutoff_date = git("log", "-1", "--format=%cI", cutoff)
+    archived = 0
+    if ARCHIVE_RESULTS:
+        archived = sum(1 for path in git("ls-tree", "-r", "--name-only", cutoff, "--", *RESULT_DIRS).splitlines()
+                       if not path.endswith("/.gitkeep"))
+    message = (f"[Compaction] Snapshot of {BRANCH} at {cutoff_date}\n\n"
+               f"{squashed} older commit(s) squashed, {archived} result file(s) archived.\n"
+               f"Full history and results: {archive_ref} ({tip})\n")
+    
+    kept = git("rev-list", "--reverse", "--first-parent", f"{cutoff}..{tip}").split()
+    new_tip = replay(kept, make_snapshot(cutoff, message))
+    
+    for attempt in range(1, max_attempts + 1):
+        push = subprocess.run(
+            ["git", "push", "--quiet", "--atomic", f"--force-with-lease=refs/heads/{BRANCH}:{tip}", REMOTE,
+             f"{new_tip}:refs/heads/{BRANCH}", f"{tip}:{archive_ref}"],
+            cwd=REPO_ROOT, capture_output=True, text=True
+        )
+        if push.returncode == 0:
+            git("update-ref", "-d", WORK_REF)
+            return {"squashed": squashed, "kept": len(kept), "archived": archived, "archive_ref": archive_ref,
+                    "old_tip": tip, "new_tip": new_tip}
+        
+        # Workers pushed meanwhile: replay their commits on top and retry
+        print(f"   ⚠️  Push rejected (attempt {attempt}/{max_attempts}): {push.stderr.strip()}")
+        git("fetch", "--quiet", REMOTE, f"+refs/heads/{BRANCH}:refs/remotes/{REMOTE}/{BRANCH}")
+        latest = git("rev-parse", f"refs/remotes/{REMOTE}/{BRANCH}")
+        if subprocess.run(["git", "merge-base", "--is-ancestor", tip, latest], cwd=REPO_ROOT).returncode != 0:
+            raise RuntimeError(f"{BRANCH} was rewritten by someone else, giving up")
+        
+        added = git("rev-list", "--reverse", "--first-parent", f"{tip}..{latest}").split()
+        print(f"   → Replaying {len(added)} commit(s) pushed meanwhile")
+        new_tip = replay(added, new_tip)
+        kept += added
+        tip = latest
+    
+    git("update-ref", "-d", WORK_REF)
+    raise RuntimeError(f"Push still rejected after {max_attempts} attempts")
+
+
+def write_summary(before, after, result):
+    """Appends the clone/pack comparison to the GitHub Actions step summary."""
+    summary_path = os.getenv("GITHUB_STEP_SUMMARY")
+    if not summary_path:
+        return
+    
+    lines = ["## 🗜️ History Compaction", ""]
+    if result is None:
+        lines.append(f"ℹ️ No history older than {RETENTION_DAYS:g} days to squash.")
+    else:
+        lines += [
+            f"**Squashed:** {result['squashed']} commit(s), **kept:** {result['kept']}, "
+            f"**results archived:** {result['archived']}",
+            f"**Full history:** `{result['archive_ref']}`",
+            "",
+            "| Clone | Before | After |",
+            "|-------|--------|-------|",
+        ]
+        for name in ("shallow", "full"):
+            lines.append(f"| {name} | {before[name]['seconds']} s, {before[name]['pack_kb']} KB, "
+                         f"{before[name]['commits']} commits | {after[name]['seconds']} s, "
+                         f"{after[name]['pack_kb']} KB, {after[name]['commits']} commits |")
+    with open(summary_path, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def main():
+    """Main entry point."""
+    print("=" * 70)
+    print("🗜️  D-GRID History Compaction")
+    print("=" * 70)
+    print(f"  Branch: {REMOTE}/{BRANCH}, retention: {RETENTION_DAYS:g} days")
+    
+    url = git("remote", "get-url", REMOTE)
+    
+    print("\n1️⃣  Measuring clone before compaction...")
+    before = measure_clone(url)
+    print(f"   → {json.dumps(before)}")
+    
+    print("\n2️⃣  Squashing old history...")
+    try:
+        result = compact()
+    except RuntimeError as e:
+        print(f"❌ Compaction failed: {e}")
+        return 1
+    
+    after = before
+    if result:
+        print(f"   ✓ {result['squashed']} commit(s) squashed, {result['kept']} kept, "
+              f"{result['archived']} result file(s) archived, old history in {result['archive_ref']}")
+        
+        print("\n3️⃣  Measuring clone after compaction...")
+        after = measure_clone(url)
+        print(f"   → {json.dumps(after)}")
+    
+    write_summary(before, after, result)
+    
+    print("\n" + "=" * 70)
+    print("✅ History compaction completed")
+    print("=" * 70 + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,25 +27,66 @@ REPO_ROOT = Path(__file__).parent.parent.parent
 NODES_DIR = REPO_ROOT / "nodes"
 TASKS_DIR = REPO_ROOT / "tasks"
 ORPHAN_TIMEOUT_MINUTES = 5  # Task orfani se nodo inattivo > 5 min
+HEARTBEAT_REF_PREFIX = "refs/dgrid/heartbeat"  # Heartbeat fuori banda dei worker (HEARTBEAT_MODE=ref)
+
+
+def get_heartbeat_refs():
+    """
+    Fetch the out-of-band heartbeat refs (refs/dgrid/heartbeat/<node_id>)
+    and read each node's last heartbeat from the ref's committer date.
+    
+    Returns:
+        dict: node_id -> timezone-aware datetime of the last heartbeat
+    """
+    heartbeats = {}
+    fetch = subprocess.run(
+        ["git", "fetch", "--quiet", "origin", f"+{HEARTBEAT_REF_PREFIX}/*:{HEARTBEAT_REF_PREFIX}/*"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True
+    )
+    if fetch.returncode != 0:
+        print(f"⚠️  Could not fetch heartbeat refs: {fetch.stderr.strip()}")
+    
+    result = subprocess.run(
+        ["git", "for-each-ref", "--format=%(refname:lstrip=3) %(committerdate:iso-strict)", HEARTBEAT_REF_PREFIX],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True
+    )
+    for line in result.stdout.splitlines():
+        try:
+            node_id, stamp = line.rsplit(" ", 1)
+            heartbeats[node_id] = datetime.fromisoformat(stamp)
+        except ValueError:
+            print(f"⚠️  Unexpected heartbeat ref: {line}")
+    
+    return heartbeats
 
 
 def get_nodes_status():
     """
     Scan nodes, calculate their status (active/inactive).
+    Liveness comes from the heartbeat refs when present, falling back to
+    the last_heartbeat field of nodes/<node_id>.json (HEARTBEAT_MODE=commit).
     
     Returns:
         list: List of dicts with node info sorted by recent heartbeat
     """
     nodes = []
-    if not NODES_DIR.exists():
+    heartbeat_refs = get_heartbeat_refs()
+    if not NODES_DIR.exists() and not heartbeat_refs:
         print(f"⚠️  Directory {NODES_DIR} does not exist yet. No nodes registered.")
         return nodes
     
     now = datetime.now(timezone.utc)
-    for node_file in NODES_DIR.glob("*.json"):
+    node_files = sorted(NODES_DIR.glob("*.json")) if NODES_DIR.exists() else []
+    registered = []
+    for node_file in node_files:
         try:
             with open(node_file, 'r') as f:
                 data = json.load(f)
+            data.setdefault('node_id', node_file.stem)
             
             # Parse ISO timestamp and ensure it's timezone-aware
             last_heartbeat = datetime.fromisoformat(data['last_heartbeat'])
@@ -54,20 +95,33 @@ def get_nodes_status():
             # timestamps without timezone info, as D-GRID operates in UTC by convention.
             if last_heartbeat.tzinfo is None:
                 last_heartbeat = last_heartbeat.replace(tzinfo=timezone.utc)
-            uptime = now - last_heartbeat
-            
-            # Determine if active (recent heartbeat)
-            is_active = uptime < timedelta(minutes=ORPHAN_TIMEOUT_MINUTES)
-            data['status'] = "🟢 ACTIVE" if is_active else "🔴 INACTIVE"
-            data['last_seen_seconds'] = int(uptime.total_seconds())
-            data['last_seen'] = f"{data['last_seen_seconds']} seconds ago"
-            
-            nodes.append(data)
-            print(f"✓ Node '{data['node_id']}': {data['status']} ({data['last_seen']})")
+            registered.append((data, last_heartbeat))
         except (json.JSONDecodeError, KeyError) as e:
             print(f"⚠️  Error reading {node_file}: {e}")
             continue
     
+    # Nodes that only published a heartbeat ref (registration not pulled yet)
+    known = {data.get('node_id') for data, _ in registered}
+    for node_id in heartbeat_refs:
+        if node_id not in known:
+            registered.append(({'node_id': node_id}, heartbeat_refs[node_id]))
+    
+    for data, last_heartbeat in registered:
+        ref_heartbeat = heartbeat_refs.get(data['node_id'])
+        if ref_heartbeat and ref_heartbeat > last_heartbeat:
+            last_heartbeat = ref_heartbeat
+            data['last_heartbeat'] = last_heartbeat.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+        uptime = now - last_heartbeat
+        
+        # Determine if active (recent heartbeat)
+        is_active = uptime < timedelta(minutes=ORPHAN_TIMEOUT_MINUTES)
+        data['status'] = "🟢 ACTIVE" if is_active else "🔴 INACTIVE"
+        data['last_seen_seconds'] = int(uptime.total_seconds())
+        data['last_seen'] = f"{data['last_seen_seconds']} seconds ago"
+        
+        nodes.append(data)
+        print(f"✓ Node '{data['node_id']}': {data['status']} ({data['last_seen']})")
+    
     return sorted(nodes, key=lambda x: x.get('last_seen_seconds', float('inf')))
 
 
@@ -82,8 +136,10 @@ def get_task_counts():
     for status in ["queue", "in_progress", "completed", "failed"]:
         status_dir = TASKS_DIR / status
         if status_dir.exists():
-            # Count only .json files (exclude .gitkeep)
-            count = len(list(status_dir.glob("*.json")))
+            # Count only .json files (exclude .gitkeep); the queue may be
+            # sharded as queue/<priority>/<shard>/<task>.json
+            pattern = "**/*.json" if status == "queue" else "*.json"
+            count = len(list(status_dir.glob(pattern)))
             counts[status] = count
             print(f"  {status}: {count} tasks")
         else:
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+D-GRID Container Backend Benchmark
+
+Latency of the container operations of a task for the two DOCKER_BACKENDs,
+against the fake daemon of benchmarks/fake_docker_daemon.py (no Docker
+needed):
+
+1. cli: one 'docker' process per operation. The real CLI is replaced by the
+   fake daemon's --cli stand-in, a Python process making the same API calls,
+   so the result shows the cost of a process and a new connection per call,
+   not the Go CLI's own startup (which comes on top)
+2. api: ApiBackend, in process, over one keep-alive connection
+
+Operations: a task in a new container (create, start, wait, logs, remove),
+a task exec'd in a warm container, and removing a running container.
+
+Usage:
+    python benchmarks/bench_docker_backend.py [--rounds 50]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from container_backend import CliBackend, ApiBackend, DockerAPI
+from fake_docker_daemon import FakeDockerDaemon
+
+IMAGE = "python:3.11-alpine"
+
+
+def measure(fn, rounds):
+    """Runs fn rounds times; returns (mean, p50, p95) in ms."""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="D-GRID container backend benchmark")
+    parser.add_argument("--rounds", type=int, default=50, help="Repetitions of each operation")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as root:
+        socket_path = Path(root) / "docker.sock"
+        daemon = FakeDockerDaemon(socket_path).start()
+
+        # 'docker' on PATH is the fake daemon's CLI stand-in
+        bin_dir = Path(root) / "bin"
+        bin_dir.mkdir()
+        shim = bin_dir / "docker"
+        shim.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{Path(__file__).parent / "fake_docker_daemon.py"}" '
+                        f'--cli "$@"\n')
+        shim.chmod(0o755)
+        os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ['PATH']}"
+        os.environ["DOCKER_SOCKET"] = str(socket_path)
+
+        api = DockerAPI(str(socket_path))
+        backends = {"cli": CliBackend(), "api": ApiBackend(api)}
+        print(f"{'operation':<22} {'backend':>7} {'mean ms':>8} {'p50 ms':>7} {'p95 ms':>7}")
+        results = {}
+        for name, backend in backends.items():
+            idle = backend.start_idle(IMAGE, ["sleep", "600"], {"dgrid.pool": "bench"})
+
+            def remove_running():
+                backend.remove([backend.start_idle(IMAGE, ["sleep", "600"])])
+
+            operations = {
+                "run (new container)": lambda: backend.run(IMAGE, "true", 30),
+                "exec (warm container)": lambda: backend.exec(idle, "true", 30),
+                "start + remove": remove_running,
+            }
+            for operation, fn in operations.items():
+                results[operation, name] = measure(fn, args.rounds)
+            backend.remove([idle])
+
+        for operation in operations:
+            for name in backends:
+                mean, p50, p95 = results[operation, name]
+                print(f"{operation:<22} {name:>7} {mean:>8.1f} {p50:>7.1f} {p95:>7.1f}")
+        print(f"\napi: {api.requests} requests over {api.connections} connection(s) "
+              f"(one per run's followed log and per exec, which the daemon holds)")
+        daemon.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+D-GRID Fast Commit Benchmark
+
+Measures local commit latency (no push) against repository size, for the two
+commit paths of the git writer:
+
+1. index: 'git mv' / 'git add' into the index, then 'git commit'
+   (USE_FAST_COMMIT=false)
+2. fast:  GitHandler.commit_changes(), new tree built from HEAD's tree plus
+   the changed entries, 'git commit-tree' (default)
+
+Each repository holds --sizes completed results in tasks/completed, a queue
+sharded 16 ways and a sparse checkout of the queue, in_progress and nodes
+directories, like a worker clone. Every round commits a claim (queue ->
+in_progress) and a result (in_progress -> completed plus its log).
+
+Usage:
+    python benchmarks/bench_fast_commit.py [--sizes 1000,10000,100000] [--rounds 20]
+"""
+
+import argparse
+import logging
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from git import Repo
+from git_handler import GitHandler
+from git_writer import Mutation
+
+SPARSE_DIRS = ["tasks/queue", "tasks/in_progress", "nodes"]
+
+
+def git(repo, *args, input=None):
+    """Runs a git command in a benchmark repository and returns stdout."""
+    result = subprocess.run(["git", *args], cwd=repo, input=input, capture_output=True, check=True)
+    return result.stdout.decode().strip()
+
+
+def make_repo(path, completed, queued):
+    """Creates a worker-like clone: results outside the cone, a sharded queue inside it."""
+    git(path.parent, "init", "-q", "-b", "main", str(path))
+    git(path, "config", "user.name", "bench")
+    git(path, "config", "user.email", "bench@d-grid.local")
+    blob = git(path, "hash-object", "-w", "--stdin", input=b'{"exit_code": 0}\n')
+
+    paths = [f"tasks/completed/task-{i:07d}.json" for i in range(completed)]
+    paths += [f"tasks/queue/medium/{i % 16:x}/next-{i:07d}.json" for i in range(queued)]
+    paths += ["tasks/in_progress/.gitkeep", "nodes/bench.json"]
+    git(path, "update-index", "-z", "--add", "--index-info",
+        input="".join(f"100644 {blob}\t{p}\0" for p in sorted(paths, key=str.encode)).encode())
+    git(path, "commit", "-qm", "seed")
+
+    handler = GitHandler()
+    handler.repo_path = path
+    handler.repo = Repo(path)
+    handler._configure_sparse_checkout(SPARSE_DIRS)
+    git(path, "reset", "-q", "--hard")  # Materialize the cone
+    return handler, [p for p in paths if p.startswith("tasks/queue/")]
+
+
+def claim_and_report(handler, task, fast):
+    """Commits a claim, then a result; returns the latency of each in seconds."""
+    name = task.rsplit("/", 1)[-1]
+    claimed = f"tasks/in_progress/bench-{name}"
+    steps = [
+        Mutation(f"claim {name}", moves=[(task, claimed)]),
+        Mutation(f"result {name}", moves=[(claimed, f"tasks/completed/{name}")],
+                 writes={f"tasks/completed/{name}.log": '{"stdout": "hello"}\n'}),
+    ]
+
+    latencies = []
+    for mutation in steps:
+        start = time.perf_counter()
+        if fast:
+            handler.commit_changes(mutation.message, [mutation])
+        else:
+            for src, dst in mutation.moves:
+                handler.move_file(src, dst)
+            handler.write_files(mutation.writes)
+            handler.commit_staged(mutation.message)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="D-GRID fast commit benchmark")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Completed results in the repository")
+    parser.add_argument("--rounds", type=int, default=20, help="Claim + result commits measured per size")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{'results':>8} {'mode':>6} {'claim ms':>9} {'result ms':>10} {'status ms':>10}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        for mode in ("index", "fast"):
+            with tempfile.TemporaryDirectory() as root:
+                handler, queue = make_repo(Path(root, mode), size, max(args.rounds, size // 100))
+                claims, results = [], []
+                for task in queue[:args.rounds]:
+                    claim, result = claim_and_report(handler, task, mode == "fast")
+                    claims.append(claim)
+                    results.append(result)
+
+                # Both paths must leave a clean clone behind
+                start = time.perf_counter()
+                dirty = git(handler.repo_path, "status", "--porcelain")
+                status = time.perf_counter() - start
+                assert not dirty, f"{mode}: dirty working tree after commits:\n{dirty}"
+
+                print(f"{size:>8} {mode:>6} {sum(claims) / len(claims) * 1000:>9.1f} "
+                      f"{sum(results) / len(results) * 1000:>10.1f} {status * 1000:>10.1f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
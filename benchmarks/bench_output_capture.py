@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+D-GRID Output Capture Benchmark
+
+Worker memory while a task prints a lot, for the two ways of capturing its
+output:
+
+1. buffered:  subprocess.run(capture_output=True, text=True), then the
+              first 10000 characters kept (the worker before OutputCapture)
+2. streaming: CliBackend._run() into OutputCaptures (head and tail ring
+              buffer), optionally gzipping the full output to an artifact
+
+The task is a host process ('yes | head -c N'), not a container: only the
+capture on the worker side is measured. Reported: peak Python allocations
+(tracemalloc) and wall time.
+
+Usage:
+    python benchmarks/bench_output_capture.py [--sizes 10,100,500]
+"""
+
+import argparse
+import logging
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from container_backend import CliBackend
+from output_capture import OutputCapture
+
+
+def buffered(command):
+    result = subprocess.run(command, capture_output=True, text=True, timeout=600)
+    return result.stdout[:10000], result.stderr[:10000]
+
+
+def streaming(command, artifact=None):
+    output = (OutputCapture(artifact=artifact), OutputCapture())
+    CliBackend()._run(command, 600, output)
+    for capture in output:
+        capture.close()
+    return output[0].text(), output[1].text()
+
+
+def measure(fn):
+    """Runs fn; returns (peak MiB, seconds)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2 ** 20, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="D-GRID output capture benchmark")
+    parser.add_argument("--sizes", default="10,100,500", help="Comma-separated output sizes in MiB")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{'output':>8} {'mode':<18} {'peak MiB':>9} {'time s':>7}")
+    with tempfile.TemporaryDirectory() as root:
+        for size in (int(s) for s in args.sizes.split(",")):
+            command = ["sh", "-c", f"yes 'D-GRID task output line' | head -c {size * 2 ** 20}"]
+            artifact = Path(root) / f"{size}.stdout.gz"
+            modes = {
+                "buffered": lambda: buffered(command),
+                "streaming": lambda: streaming(command),
+                "streaming + gzip": lambda: streaming(command, artifact),
+            }
+            for mode, fn in modes.items():
+                peak, elapsed = measure(fn)
+                print(f"{size:>5} MiB {mode:<18} {peak:>9.2f} {elapsed:>7.2f}")
+            print(f"{'':>8} artifact: {artifact.stat().st_size / 2 ** 10:.0f} KiB gzipped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
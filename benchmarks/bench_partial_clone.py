@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+D-GRID Partial Clone Benchmark
+
+Measures the bytes a worker downloads per pull while other nodes keep
+reporting results, for three clone modes:
+
+1. full:    shallow clone (depth=1), whole working tree
+2. shallow: shallow clone + sparse checkout (USE_PARTIAL_CLONE=false)
+3. partial: shallow clone + sparse checkout + --filter=blob:none (default)
+
+Each round a producer node pushes --results completed tasks (result JSON +
+a log of --log-bytes), the same number of new queued tasks and a node file
+update; every worker then runs GitHandler.pull_rebase(). Bytes are counted on
+the wire, by routing git-upload-pack through tee, so they include the ls-remote,
+the fetch and any blobs the partial clone fetched on demand.
+
+Usage:
+    python benchmarks/bench_partial_clone.py [--completed 2000] [--rounds 10]
+                                             [--results 20] [--log-bytes 20000]
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from git import Repo
+from git_handler import GitHandler
+
+SPARSE_DIRS = ["tasks/queue", "tasks/in_progress", "nodes"]
+MODES = {
+    "full": [],
+    "shallow": ["--sparse"],
+    "partial": ["--sparse", "--filter=blob:none"]
+}
+
+
+def git(repo, *args):
+    """Runs a git command in a benchmark repository and returns stdout."""
+    result = subprocess.run(["git", *args], cwd=repo, capture_output=True, check=True)
+    return result.stdout.decode().strip()
+
+
+def add_results(repo, start, count, log_bytes):
+    """Writes completed results with logs, new queued tasks and a heartbeat."""
+    completed = Path(repo, "tasks", "completed")
+    queue = Path(repo, "tasks", "queue")
+    for directory in (completed, queue, Path(repo, "tasks", "in_progress"), Path(repo, "nodes")):
+        directory.mkdir(parents=True, exist_ok=True)
+    (Path(repo, "tasks", "in_progress") / ".gitkeep").touch()
+
+    for i in range(start, start + count):
+        (completed / f"task-{i:06d}.json").write_text(json.dumps({"task_id": f"task-{i:06d}", "exit_code": 0}))
+        (completed / f"task-{i:06d}.json.log").write_text(os.urandom(log_bytes // 2).hex())
+        (queue / f"next-{i:06d}.json").write_text(json.dumps({"task_id": f"next-{i:06d}", "script": "echo hi"}))
+
+    Path(repo, "nodes", "producer.json").write_text(json.dumps({"node_id": "producer", "completed": start + count}))
+
+
+def commit_and_push(repo, message):
+    """Commits everything in the producer clone and pushes it."""
+    git(repo, "add", "-A")
+    git(repo, "-c", "user.name=bench", "-c", "user.email=bench@d-grid.local", "commit", "-qm", message)
+    git(repo, "push", "-q", "origin", "main")
+
+
+def counting_upload_pack(root, mode):
+    """git-upload-pack wrapper appending everything it sends to a file."""
+    counter = Path(root, f"{mode}.bytes")
+    counter.touch()
+    script = Path(root, f"upload-pack-{mode}")
+    script.write_text(f'#!/bin/sh\ngit upload-pack "$@" | tee -a "{counter}"\n')
+    script.chmod(0o755)
+    return script, counter
+
+
+def clone_worker(root, remote, mode):
+    """Clones a worker in a mode and returns (handler, byte counter, clone bytes)."""
+    script, counter = counting_upload_pack(root, mode)
+    path = Path(root, mode)
+    git(root, "clone", "-q", "--depth", "1", "--upload-pack", str(script), *MODES[mode], remote.as_uri(), str(path))
+    git(path, "config", "remote.origin.uploadpack", str(script))
+
+    handler = GitHandler()
+    handler.repo_path = path
+    handler.repo = Repo(path)
+    if mode != "full":
+        handler._configure_sparse_checkout(SPARSE_DIRS)
+    handler.partial_clone = mode == "partial"
+    return handler, counter, counter.stat().st_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="D-GRID partial clone benchmark")
+    parser.add_argument("--completed", type=int, default=2000, help="Completed results already in the repository")
+    parser.add_argument("--rounds", type=int, default=10, help="Pulls measured per mode")
+    parser.add_argument("--results", type=int, default=20, help="Results pushed by other nodes between two pulls")
+    parser.add_argument("--log-bytes", type=int, default=20000, help="Size of each result log")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as root:
+        remote = Path(root, "remote.git")
+        git(root, "init", "-q", "--bare", "-b", "main", str(remote))
+        git(remote, "config", "uploadpack.allowFilter", "true")
+
+        producer = Path(root, "producer")
+        git(root, "clone", "-q", str(remote), str(producer))
+        add_results(producer, 0, args.completed, args.log_bytes)
+        commit_and_push(producer, "seed")
+
+        workers = {mode: clone_worker(root, remote, mode) for mode in MODES}
+        pulls = {mode: [] for mode in MODES}
+
+        done = args.completed
+        for round_ in range(args.rounds):
+            add_results(producer, done, args.results, args.log_bytes)
+            done += args.results
+            commit_and_push(producer, f"round {round_}")
+
+            for mode, (handler, counter, _) in workers.items():
+                before = counter.stat().st_size
+                start = time.perf_counter()
+                assert handler.pull_rebase(), f"{mode}: pull failed"
+                pulls[mode].append((counter.stat().st_size - before, time.perf_counter() - start))
+
+        print(f"{args.completed} results in the repository, {args.results} new results "
+              f"(+{args.log_bytes} B logs) per pull, {args.rounds} pulls")
+        print(f"{'mode':>8} {'clone KB':>9} {'KB/pull':>8} {'ms/pull':>8} {'lazy fetches':>13} {'worktree files':>15}")
+        for mode, (handler, _, clone_bytes) in workers.items():
+            received = sum(size for size, _ in pulls[mode]) / len(pulls[mode])
+            latency = sum(elapsed for _, elapsed in pulls[mode]) / len(pulls[mode])
+            files = sum(len(names) for path, _, names in os.walk(handler.repo_path) if ".git" not in Path(path).parts)
+            print(f"{mode:>8} {clone_bytes / 1024:>9.0f} {received / 1024:>8.1f} {latency * 1000:>8.0f} "
+                  f"{handler.lazy_fetches:>13} {files:>15}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+D-GRID Queue Sharding Benchmark
+
+Measures, for queues of 10k / 100k / 1M tasks and for each shard fan-out
+(flat, 16, 256 and 4096 shards per priority):
+
+1. Claim commit cost: write-tree + commit-tree after moving one task to
+   in_progress, and the bytes of tree objects that commit rewrites
+2. Scan cost: full walk of the queue directory and listing of the largest
+   single directory (only up to --fs-max tasks, files are created on disk)
+3. Migration cost: bulk rename of the whole queue from the previous fan-out
+   as a single commit (index rebuild + write-tree + commit-tree)
+
+Git-side measurements work on the index only (every task points to the same
+blob), so 1M tasks do not need 1M files on disk.
+
+Usage:
+    python benchmarks/bench_queue_sharding.py [--sizes 10000,100000,1000000]
+                                              [--fs-max 100000] [--claims 20]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from task_sharding import TaskSharding
+
+QUEUE_PREFIX = "tasks/queue"
+LAYOUTS = [0, 1, 2, 3]  # Shard digits, 0 = flat queue
+
+
+def git(repo, *args, input=None):
+    """Runs a git command in the benchmark repository and returns stdout."""
+    result = subprocess.run(["git", *args], cwd=repo, input=input, capture_output=True, check=True)
+    return result.stdout.decode().strip()
+
+
+def task_path(task_id, digits):
+    """Repository path of a medium-priority task for a fan-out."""
+    if digits == 0:
+        return f"{QUEUE_PREFIX}/{task_id}.json"
+    return "/".join([QUEUE_PREFIX, "medium", *TaskSharding.shard_parts(task_id, digits), f"{task_id}.json"])
+
+
+def index_records(paths, blob, remove=False):
+    """update-index --index-info input adding (or removing) paths, in index order."""
+    if remove:
+        return "".join(f"0 {'0' * 40}\t{path}\0" for path in paths).encode()
+    return "".join(f"100644 {blob}\t{path}\0" for path in sorted(paths, key=str.encode)).encode()
+
+
+def tree_bytes(repo, commit, path):
+    """Total size of the trees on the way from the root to a path's directory."""
+    parts = path.split("/")[:-1]
+    specs = [f"{commit}^{{tree}}"] + [f"{commit}:{'/'.join(parts[:i])}" for i in range(1, len(parts) + 1)]
+    output = git(repo, "cat-file", "--batch-check=%(objectsize)", input="\n".join(specs).encode())
+    # A shard emptied by the claim no longer exists ("<spec> missing")
+    return sum(int(line) for line in output.splitlines() if line.isdigit())
+
+
+def bench_git(size, digits, claims, task_ids):
+    """Claim and migration cost of one fan-out, measured on the index."""
+    with tempfile.TemporaryDirectory() as repo:
+        git(repo, "init", "-q")
+        blob = git(repo, "hash-object", "-w", "--stdin", input=b'{"task_id": "bench"}\n')
+        env_commit = ["-c", "user.name=bench", "-c", "user.email=bench@d-grid.local"]
+
+        # Previous layout, as it would be before a migration to this one
+        previous = max(0, digits - 1)
+        git(repo, "update-index", "-z", "--index-info",
+            input=index_records([task_path(task_id, previous) for task_id in task_ids], blob))
+        tree = git(repo, "write-tree")
+        base = git(repo, *env_commit, "commit-tree", tree, "-m", "queue")
+
+        migration = None
+        if digits != previous:
+            # Same strategy as GitHandler.commit_renames(): rebuild the index
+            start = time.perf_counter()
+            git(repo, "read-tree", "--empty")
+            git(repo, "update-index", "-z", "--index-info",
+                input=index_records([task_path(task_id, digits) for task_id in task_ids], blob))
+            tree = git(repo, "write-tree")
+            base = git(repo, *env_commit, "commit-tree", tree, "-p", base, "-m", "reshard")
+            migration = time.perf_counter() - start
+
+        # Claims: move one task at a time to in_progress and commit
+        elapsed = 0.0
+        written = 0
+        parent = base
+        for task_id in task_ids[:claims]:
+            src = task_path(task_id, digits)
+            records = index_records([src], blob, remove=True)
+            records += index_records([f"tasks/in_progress/bench-{task_id}.json"], blob)
+            git(repo, "update-index", "-z", "--index-info", input=records)
+
+            start = time.perf_counter()
+            tree = git(repo, "write-tree")
+            parent = git(repo, *env_commit, "commit-tree", tree, "-p", parent, "-m", f"claim {task_id}")
+            elapsed += time.perf_counter() - start
+            written += tree_bytes(repo, parent, src)
+
+        return {
+            "claim_ms": elapsed / claims * 1000,
+            "claim_tree_bytes": written // claims,
+            "migration_s": migration
+        }
+
+
+def bench_fs(digits, task_ids):
+    """Directory scan cost of one fan-out, with the files on disk."""
+    with tempfile.TemporaryDirectory() as root:
+        largest = {}
+        for task_id in task_ids:
+            path = Path(root, task_path(task_id, digits))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.touch()
+            largest[path.parent] = largest.get(path.parent, 0) + 1
+
+        start = time.perf_counter()
+        count = sum(1 for _, _, files in os.walk(Path(root, QUEUE_PREFIX)) for name in files if name.endswith(".json"))
+        full_scan = time.perf_counter() - start
+        assert count == len(task_ids)
+
+        biggest = max(largest, key=largest.get)
+        start = time.perf_counter()
+        sorted(os.listdir(biggest))
+        dir_scan = time.perf_counter() - start
+
+        return {"full_scan_ms": full_scan * 1000, "dir_scan_ms": dir_scan * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="D-GRID queue sharding benchmark")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated queue sizes")
+    parser.add_argument("--fs-max", type=int, default=100000, help="Largest queue size scanned on disk")
+    parser.add_argument("--claims", type=int, default=20, help="Claim commits measured per layout")
+    args = parser.parse_args()
+
+    print(f"{'tasks':>9} {'shards':>7} {'max/dir':>8} {'claim ms':>9} {'tree B/claim':>13} "
+          f"{'migrate s':>10} {'full scan ms':>13} {'dir scan ms':>12}")
+
+    for size in (int(value) for value in args.sizes.split(",")):
+        task_ids = [f"task-{i:07d}" for i in range(size)]
+        for digits in LAYOUTS:
+            shards = 16 ** digits if digits else 1
+            result = bench_git(size, digits, args.claims, task_ids)
+            fs = bench_fs(digits, task_ids) if size <= args.fs_max else None
+
+            migration = f"{result['migration_s']:.2f}" if result["migration_s"] is not None else "-"
+            full_scan = f"{fs['full_scan_ms']:.1f}" if fs else "-"
+            dir_scan = f"{fs['dir_scan_ms']:.2f}" if fs else "-"
+            print(f"{size:>9} {shards if digits else 'flat':>7} {-(-size // shards):>8} "
+                  f"{result['claim_ms']:>9.1f} {result['claim_tree_bytes']:>13} "
+                  f"{migration:>10} {full_scan:>13} {dir_scan:>12}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
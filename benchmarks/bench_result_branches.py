@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+D-GRID Result Branch Benchmark
+
+Several nodes report task results at the same time to one remote, for the
+two RESULT_MODEs:
+
+1. main:   results moved from in_progress to completed on the main branch,
+           every rejected push fetched, rebased and retried
+2. branch: results pushed to refs/dgrid/results/<node>, then merged into
+           main by one run of .github/scripts/aggregate_results.py
+
+Each node is a separate clone of a local bare remote and reports --results
+results one by one (no flush window, the worst case for contention).
+Reported: wall time until every result is on the remote, result latency,
+rejected pushes and, for branch mode, the aggregation run.
+
+Usage:
+    python benchmarks/bench_result_branches.py [--nodes 2,4,8] [--results 10]
+"""
+
+import argparse
+import logging
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / ".github" / "scripts"))
+
+from git import Repo
+from git_handler import GitHandler
+from git_writer import GitWriter, Mutation
+from result_branch import ResultBranchWriter, ResultMutation
+import aggregate_results
+
+
+def git(repo, *args, input=None):
+    """Runs a git command in a benchmark repository and returns stdout."""
+    result = subprocess.run(["git", *args], cwd=repo, input=input, capture_output=True, check=True)
+    return result.stdout.decode().strip()
+
+
+def make_cluster(root, nodes, results):
+    """Bare remote with every node's tasks already claimed, and one clone per node."""
+    remote = root / "remote.git"
+    git(root, "init", "-q", "--bare", "-b", "main", str(remote))
+    seed = root / "seed"
+    git(root, "clone", "-q", str(remote), str(seed))
+    git(seed, "config", "user.name", "bench")
+    git(seed, "config", "user.email", "bench@d-grid.local")
+    (seed / "tasks" / "in_progress").mkdir(parents=True)
+    for node in range(nodes):
+        for i in range(results):
+            (seed / "tasks" / "in_progress" / f"node{node}-task-{i:03d}.json").write_text('{"id": "%d"}\n' % i)
+    git(seed, "add", ".")
+    git(seed, "commit", "-qm", "seed")
+    git(seed, "push", "-q", "origin", "main")
+
+    handlers = []
+    for node in range(nodes):
+        path = root / f"node{node}"
+        git(root, "clone", "-q", str(remote), str(path))
+        git(path, "config", "user.name", f"node{node}")
+        git(path, "config", "user.email", "bench@d-grid.local")
+        handler = GitHandler()
+        handler.repo_path = path
+        handler.repo = Repo(path)
+        handlers.append(handler)
+    return remote, seed, handlers
+
+
+def report(handler, node, results, mode, latencies, writers):
+    """Reports one node's results one at a time, appending each latency."""
+    writer = GitWriter(handler, flush_window=0) if mode == "main" else ResultBranchWriter(handler, flush_window=0)
+    writers.append(writer)
+    for i in range(results):
+        name = f"node{node}-task-{i:03d}.json"
+        log = {f"tasks/completed/{name}.log": '{"exit_code": 0}\n'}
+        start = time.perf_counter()
+        if mode == "main":
+            mutation = Mutation(f"result {name}", moves=[(f"tasks/in_progress/{name}", f"tasks/completed/{name}")],
+                                writes=log)
+        else:
+            mutation = ResultMutation(f"node{node}", f"result {name}",
+                                      {f"tasks/completed/{name}": '{"id": "%d"}\n' % i, **log})
+        writer.submit(mutation).result()
+        latencies.append(time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="D-GRID result branch benchmark")
+    parser.add_argument("--nodes", default="2,4,8", help="Concurrent reporting nodes")
+    parser.add_argument("--results", type=int, default=10, help="Results reported by each node")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{'nodes':>6} {'mode':>7} {'wall s':>7} {'p50 ms':>7} {'max ms':>8} {'rejected':>9} {'aggregate ms':>13}")
+    for nodes in [int(n) for n in args.nodes.split(",")]:
+        for mode in ("main", "branch"):
+            with tempfile.TemporaryDirectory() as root:
+                remote, seed, handlers = make_cluster(Path(root), nodes, args.results)
+                latencies, writers = [], []
+                threads = [threading.Thread(target=report, args=(handler, node, args.results, mode, latencies, writers))
+                           for node, handler in enumerate(handlers)]
+                start = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                wall = time.perf_counter() - start
+
+                # Rebased retries on main, rebuilt commits on result branches
+                rejected = sum(handler.push_retries for handler in handlers) + sum(w.conflicts for w in writers)
+                aggregate = "-"
+                if mode == "branch":
+                    aggregate_results.REPO_ROOT = seed
+                    start = time.perf_counter()
+                    result = aggregate_results.aggregate()
+                    aggregate = f"{(time.perf_counter() - start) * 1000:.0f}"
+                    assert result["results"] == nodes * args.results and result["removed"] == result["results"]
+
+                # Either way every result ends up on main, nothing left in progress
+                completed = git(remote, "ls-tree", "--name-only", "main", "tasks/completed/").splitlines()
+                assert len(completed) == 2 * nodes * args.results, f"{mode}: {len(completed)} result files on main"
+                assert not git(remote, "ls-tree", "main", "tasks/in_progress/")
+
+                print(f"{nodes:>6} {mode:>7} {wall:>7.2f} {statistics.median(latencies) * 1000:>7.0f} "
+                      f"{max(latencies) * 1000:>8.0f} {rejected:>9} {aggregate:>13}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+D-GRID Fake Docker Daemon
+
+Stand-in for dockerd on a unix socket, for benchmarks and tests on hosts
+without Docker. It serves the Engine API endpoints the worker uses
+(containers create/start/wait/logs/kill/delete/json/prune, exec, images)
+and runs a container's command as a plain host process: no image, no
+isolation, only the request/response path is real.
+
+Also a stand-in for the docker CLI ('--cli'), which makes the same API
+calls as the real CLI's 'run', 'exec', 'rm', 'ps' and 'kill' from a new
+process per command, like the real one.
+
+Usage:
+    python benchmarks/fake_docker_daemon.py --socket /tmp/docker.sock
+    DOCKER_SOCKET=/tmp/docker.sock python benchmarks/fake_docker_daemon.py --cli run --rm IMAGE sh -c 'echo hi'
+"""
+
+import argparse
+import json
+import os
+import signal
+import socketserver
+import subprocess
+import sys
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+
+def frame(kind, data):
+    """One frame of a multiplexed stream (1 = stdout, 2 = stderr)."""
+    return bytes([kind, 0, 0, 0]) + len(data).to_bytes(4, "big") + data
+
+
+class Process:
+    """A command whose output is kept as frames, as it is produced."""
+
+    def __init__(self, command):
+        self.command = command
+        self.process = None
+        self.frames = []
+        self.changed = threading.Condition()
+        self.done = threading.Event()
+
+    def start(self):
+        self.process = subprocess.Popen(self.command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                        start_new_session=True)
+        readers = [threading.Thread(target=self._read, args=(kind, pipe), daemon=True)
+                   for kind, pipe in ((1, self.process.stdout), (2, self.process.stderr))]
+        for reader in readers:
+            reader.start()
+        threading.Thread(target=self._reap, args=(readers,), daemon=True).start()
+
+    def _read(self, kind, pipe):
+        for chunk in iter(lambda: os.read(pipe.fileno(), 65536), b""):
+            with self.changed:
+                self.frames.append(frame(kind, chunk))
+                self.changed.notify_all()
+
+    def _reap(self, readers):
+        for reader in readers:
+            reader.join()
+        self.process.wait()
+        with self.changed:
+            self.done.set()
+            self.changed.notify_all()
+
+    def follow(self):
+        """Yields the frames, waiting for new ones until the process ends."""
+        sent = 0
+        while True:
+            with self.changed:
+                while sent == len(self.frames) and not self.done.is_set():
+                    self.changed.wait()
+                frames, finished = self.frames[sent:], self.done.is_set()
+            sent += len(frames)
+            yield b"".join(frames)
+            if finished and sent == len(self.frames):
+                return
+
+    @property
+    def output(self):
+        return b"".join(self.frames)
+
+    def kill(self):
+        # The whole process group, so the pipes close like a container's
+        if self.process and self.process.poll() is None:
+            os.killpg(self.process.pid, signal.SIGKILL)
+
+
+class Container(Process):
+    def __init__(self, config, name=None):
+        super().__init__(config["Cmd"])
+        self.id = uuid.uuid4().hex
+        self.name = name or self.id
+        self.config = config
+        self.labels = config.get("Labels") or {}
+        self.execs = []
+
+    def kill(self):
+        for process in self.execs:
+            process.kill()
+        super().kill()
+
+
+class FakeDockerDaemon(socketserver.ThreadingUnixStreamServer):
+    """Engine API subset over a unix socket; containers are host processes."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path):
+        self.socket_path = str(socket_path)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.containers = {}
+        self.execs = {}
+        self.requests = 0
+        super().__init__(self.socket_path, Handler)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        for container in self.containers.values():
+            container.kill()
+        os.unlink(self.socket_path)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def stream(self, process, content_type):
+        """Close-delimited raw stream of a process's frames until it ends."""
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.end_headers()
+        for data in process.follow():
+            if data:
+                self.wfile.write(data)
+                self.wfile.flush()
+        self.close_connection = True
+
+    def reply(self, status, body=None, raw=None):
+        data = raw if raw is not None else (json.dumps(body).encode() if body is not None else b"")
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_one_request(self):
+        try:
+            super().handle_one_request()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def do_GET(self):
+        self.route("GET")
+
+    def do_POST(self):
+        self.route("POST")
+
+    def do_DELETE(self):
+        self.route("DELETE")
+
+    def route(self, method):
+        daemon = self.server
+        daemon.requests += 1
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else {}
+        parts = url.path.strip("/").split("/")
+        if parts and parts[0].startswith("v1."):
+            parts = parts[1:]
+
+        if parts == ["containers", "create"]:
+            container = Container(body, query.get("name", [None])[0])
+            daemon.containers[container.id] = container
+            return self.reply(201, {"Id": container.id, "Warnings": []})
+        if parts == ["containers", "json"]:
+            labels = json.loads(query.get("filters", ["{}"])[0]).get("label", [])
+            return self.reply(200, [{"Id": c.id} for c in daemon.containers.values()
+                                    if set(labels) <= {f"{key}={value}" for key, value in c.labels.items()}])
+        if parts in (["containers", "prune"], ["images", "prune"]):
+            return self.reply(200, {"SpaceReclaimed": 0})
+        if parts == ["images", "create"]:
+            return self.reply(200, raw=b'{"status": "Downloaded"}\n')
+        if parts[:1] == ["exec"] and len(parts) == 3:
+            process = daemon.execs.get(parts[1])
+            if process is None:
+                return self.reply(404, {"message": "No such exec instance"})
+            if parts[2] == "json":
+                return self.reply(200, {"ExitCode": process.process.returncode if process.done.is_set() else None})
+            # Hijacked connection: raw stream until the command ends
+            process.start()
+            return self.stream(process, "application/vnd.docker.raw-stream")
+
+        if parts[:1] != ["containers"] or len(parts) < 2:
+            return self.reply(404, {"message": f"page not found: {url.path}"})
+        container = daemon.containers.get(parts[1]) or next(
+            (c for c in daemon.containers.values() if c.name == parts[1]), None)
+        if container is None:
+            return self.reply(404, {"message": f"No such container: {parts[1]}"})
+        action = parts[2] if len(parts) > 2 else None
+        if method == "DELETE":
+            container.kill()
+            del daemon.containers[container.id]
+            return self.reply(204)
+        if action == "start":
+            container.start()
+            return self.reply(204)
+        if action == "wait":
+            container.done.wait()
+            return self.reply(200, {"StatusCode": container.process.returncode})
+        if action == "logs":
+            if query.get("follow") == ["1"]:
+                return self.stream(container, "application/vnd.docker.multiplexed-stream")
+            return self.reply(200, raw=container.output)
+        if action == "kill":
+            container.kill()
+            return self.reply(204)
+        if action == "stats":
+            return self.reply(200, {"id": container.id, "memory_stats": {}, "cpu_stats": {}})
+        if action == "exec":
+            exec_id = uuid.uuid4().hex
+            daemon.execs[exec_id] = Process(body["Cmd"])
+            container.execs.append(daemon.execs[exec_id])
+            return self.reply(201, {"Id": exec_id})
+        return self.reply(404, {"message": f"page not found: {url.path}"})
+
+
+def cli(args):
+    """docker CLI stand-in: one process per command, calls over DOCKER_SOCKET."""
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+    from container_backend import DockerAPI, ApiBackend
+
+    api = DockerAPI(os.environ.get("DOCKER_SOCKET", "/var/run/docker.sock"))
+    command, args = args[0], args[1:]
+    if command in ("run", "exec"):
+        labels, name, detach, positional = {}, None, False, []
+        i = 0
+        while i < len(args):
+            if args[i] == "--label" and not positional:
+                key, _, value = args[i + 1].partition("=")
+                labels[key] = value
+                i += 2
+                continue
+            if args[i] == "--name" and not positional:
+                name = args[i + 1]
+                i += 2
+                continue
+            if args[i] == "-d":
+                detach = True
+            elif not args[i].startswith("-") or positional:
+                positional.append(args[i])
+            i += 1
+        if command == "exec":
+            exit_code = api.exec(positional[0], positional[1:], 3600, sys.stdout.buffer, sys.stderr.buffer)
+        else:
+            container = api.create(positional[0], positional[1:], ApiBackend.host_config(), "1000:1000", labels,
+                                   name)
+            api.start(container)
+            if detach:
+                print(container)
+                return 0
+            exit_code = api.wait(container, timeout=3600)
+            api.logs(container, sys.stdout.buffer, sys.stderr.buffer)
+            if "--rm" in args:
+                api.remove(container)
+        return exit_code
+    if command == "rm":
+        for container in args:
+            if not container.startswith("-"):
+                api.remove(container)
+    elif command == "kill":
+        api.kill(args[-1])
+    elif command == "ps":
+        print("\n".join(api.list([args[args.index("--filter") + 1].split("=", 1)[1]])))
+    return 0
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--cli":
+        return cli(sys.argv[2:])
+    parser = argparse.ArgumentParser(description="D-GRID fake Docker daemon")
+    parser.add_argument("--socket", default="/tmp/fake-docker.sock", help="Unix socket to listen on")
+    args = parser.parse_args()
+    daemon = FakeDockerDaemon(args.socket)
+    print(f"Fake Docker daemon listening on {args.socket}")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
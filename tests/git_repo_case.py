@@ -0,0 +1,48 @@
+"""Temporary git repositories for the tests that need a real remote."""
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from git import Repo
+from git_handler import GitHandler
+
+
+def git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+class GitRepoTestCase(unittest.TestCase):
+    """Bare remote with two queued tasks and a worker clone of it."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.remote = root / "remote.git"
+        git(root, "init", "-q", "--bare", "-b", "main", str(self.remote))
+
+        seed = root / "seed"
+        git(root, "clone", "-q", str(self.remote), str(seed))
+        (seed / "tasks" / "queue").mkdir(parents=True)
+        for name in ("a", "b"):
+            (seed / "tasks" / "queue" / f"{name}.json").write_text("{}")
+        git(seed, "add", ".")
+        git(seed, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "seed")
+        git(seed, "push", "-q", "origin", "main")
+
+        self.handler = self._handler(root / "node")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _handler(self, path):
+        git(self.tmp.name, "clone", "-q", str(self.remote), str(path))
+        git(path, "config", "user.name", "t")
+        git(path, "config", "user.email", "t@t")
+        handler = GitHandler()
+        handler.repo_path = path
+        handler.repo = Repo(path)
+        return handler
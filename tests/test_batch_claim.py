@@ -0,0 +1,96 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from git_repo_case import GitRepoTestCase, git
+from git_writer import GitWriter, Mutation
+from task_runner import TaskRunner
+
+
+class TestBatchClaim(GitRepoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.handler._writer = GitWriter(self.handler, flush_window=0.2)
+        self.handler._writer.start()
+        self.runner = TaskRunner(self.handler, "n", container_backend=object())
+
+    def tearDown(self):
+        self.handler._writer.stop()
+        super().tearDown()
+
+    def remote_files(self, directory):
+        return git(self.remote, "ls-tree", "--name-only", "main", f"{directory}/").split()
+
+    def test_tasks_are_claimed_in_one_commit(self):
+        commits = int(git(self.remote, "rev-list", "--count", "main"))
+        claimed = self.runner.claim_tasks(2)
+
+        self.assertEqual(sorted(path.name for path in claimed), ["n-a.json", "n-b.json"])
+        self.assertEqual(int(git(self.remote, "rev-list", "--count", "main")), commits + 1)
+        self.assertEqual(self.remote_files("tasks/in_progress"),
+                         ["tasks/in_progress/n-a.json", "tasks/in_progress/n-b.json"])
+        self.assertEqual(self.remote_files("tasks/queue"), [])
+        self.assertEqual(self.runner.get_acquisition_stats()["tasks_claimed"], 2)
+        self.assertEqual(self.runner.claim_tasks(1), [])
+
+    def test_a_conflict_drops_only_the_lost_claims(self):
+        other = self._handler(Path(self.tmp.name) / "other")
+        GitWriter(other).submit(Mutation("o acquires a", moves=[("tasks/queue/a.json", "tasks/in_progress/o-a.json")]))
+
+        claimed = self.runner.claim_tasks(2)
+
+        self.assertEqual([path.name for path in claimed], ["n-b.json"])
+        self.assertEqual(self.remote_files("tasks/in_progress"),
+                         ["tasks/in_progress/n-b.json", "tasks/in_progress/o-a.json"])
+        stats = self.runner.get_acquisition_stats()
+        self.assertEqual((stats["claim_attempts"], stats["claim_conflicts"], stats["tasks_claimed"]), (1, 1, 1))
+
+    def test_a_failed_claim_keeps_the_pushed_ones(self):
+        writer = self.handler.get_writer()
+        submit = writer.submit
+
+        def fail_b(mutation):
+            if mutation.message.endswith(" b.json"):
+                mutation.future.set_exception(RuntimeError("writer stopped"))
+                return mutation.future
+            return submit(mutation)
+
+        with mock.patch.object(writer, "submit", fail_b):
+            claimed = self.runner.claim_tasks(2)
+
+        self.assertEqual([path.name for path in claimed], ["n-a.json"])
+        self.assertEqual(self.remote_files("tasks/in_progress"), ["tasks/in_progress/n-a.json"])
+        self.assertEqual(self.runner.get_acquisition_stats()["claim_conflicts"], 1)
+        # Recorded, so it goes back to its queue path when released
+        self.assertEqual(self.runner.release_tasks(claimed), 1)
+        self.assertEqual(self.remote_files("tasks/queue"), ["tasks/queue/a.json", "tasks/queue/b.json"])
+
+    def test_released_tasks_return_to_the_queue(self):
+        claimed = self.runner.claim_tasks(2)
+        self.assertEqual(self.runner.release_tasks(claimed), 2)
+
+        self.assertEqual(self.remote_files("tasks/in_progress"), [])
+        self.assertEqual(self.remote_files("tasks/queue"), ["tasks/queue/a.json", "tasks/queue/b.json"])
+        self.assertEqual(len(self.runner.claim_tasks(2)), 2)
+
+    def test_batch_size_follows_free_slots_and_the_cap(self):
+        with mock.patch("task_runner.BATCH_CLAIM_MAX", 4), mock.patch("task_runner.MAX_PARALLEL_TASKS", 2), \
+                mock.patch("task_runner.PULL_INTERVAL", 10):
+            self.assertEqual(self.runner.get_batch_size(0, 0), 0)
+            self.assertEqual(self.runner.get_batch_size(2, 0), 2)
+            # No durations yet: one task of lookahead
+            self.assertEqual(self.runner.get_batch_size(1, 3), 2)
+            # Long tasks keep one ready, short ones fill the lookahead, all capped
+            self.runner.record_task_duration(60)
+            self.assertEqual(self.runner.get_batch_size(1, 3), 2)
+            self.runner.recent_durations.clear()
+            self.runner.record_task_duration(5)
+            self.assertEqual(self.runner.get_batch_size(1, 2), 3)
+            self.assertEqual(self.runner.get_batch_size(2, 10), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
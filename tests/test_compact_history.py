@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / ".github" / "scripts"))
+
+from git_repo_case import GitRepoTestCase, git
+from git_writer import GitWriter, Mutation
+import compact_history
+
+
+class TestHistoryCompaction(GitRepoTestCase):
+    def test_old_history_is_squashed_while_a_worker_keeps_pushing(self):
+        # Month-old coordination history, then recent worker commits
+        admin = self._handler(Path(self.tmp.name) / "admin")
+        for i in range(5):
+            for directory in ("nodes", "tasks/completed"):
+                (admin.repo_path / directory).mkdir(exist_ok=True)
+            (admin.repo_path / "nodes" / "old.json").write_text(f'{{"beat": {i}}}')
+            (admin.repo_path / "tasks" / "completed" / f"old-{i}.json").write_text("{}")
+            git(admin.repo_path, "add", "nodes", "tasks")
+            subprocess.run(["git", "commit", "-qm", f"old {i}"], cwd=admin.repo_path, check=True,
+                           env={**os.environ, "GIT_COMMITTER_DATE": "2020-01-01T00:00:00"})
+        git(admin.repo_path, "push", "-q", "origin", "main")
+
+        self.handler.pull_rebase(smart_poll=False)
+        writer = GitWriter(self.handler)
+        writer.submit(Mutation("claim a", moves=[("tasks/queue/a.json", "tasks/in_progress/n-a.json")])).result()
+        old_tip = git(self.remote, "rev-parse", "main")
+
+        # The worker commits locally while the history is rewritten
+        self.assertTrue(self.handler.commit_changes("register", [Mutation("register", writes={"nodes/n.json": "{}"})]))
+        compact_history.REPO_ROOT = admin.repo_path
+        result = compact_history.compact(retention_days=30)
+
+        self.assertEqual((result["squashed"], result["kept"], result["archived"]), (6, 1, 5))
+        self.assertEqual(git(self.remote, "rev-list", "--count", "main"), "2")
+        # Old results are only in the archive ref; the rest of the state is unchanged
+        self.assertEqual(git(self.remote, "ls-tree", "-r", "--name-only", "main").split(),
+                         ["nodes/old.json", "tasks/in_progress/n-a.json", "tasks/queue/b.json"])
+        self.assertEqual(git(self.remote, "rev-parse", result["archive_ref"]), old_tip)
+        self.assertEqual(git(self.remote, "show", f"{result['archive_ref']}:tasks/completed/old-4.json"), "{}")
+
+        # The worker's next push replays only its own commit
+        self.handler.push_with_rebase()
+        self.assertEqual(git(self.remote, "rev-list", "--count", "main"), "3")
+        self.assertEqual(git(self.remote, "log", "-1", "--format=%s", "main"), "register")
+        self.assertEqual(git(self.handler.repo_path, "status", "--porcelain"), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
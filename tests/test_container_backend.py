@@ -0,0 +1,93 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from container_backend import ApiBackend, CliBackend, DockerAPI, ContainerTimeout
+from fake_docker_daemon import FakeDockerDaemon
+from output_capture import OutputCapture
+
+
+class TestApiBackend(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        socket_path = str(Path(self.tmp.name) / "docker.sock")
+        self.daemon = FakeDockerDaemon(socket_path).start()
+        self.backend = ApiBackend(DockerAPI(socket_path))
+
+    def tearDown(self):
+        self.daemon.stop()
+        self.tmp.cleanup()
+
+    def test_run_exec_and_timeout_over_one_connection(self):
+        result = self.backend.run("img", "echo out; echo err >&2; exit 3", 10)
+        self.assertEqual(result, {"exit_code": 3, "stdout": "out\n", "stderr": "err\n",
+                                  "stdout_bytes": 4, "stderr_bytes": 4})
+        self.assertEqual(self.daemon.containers, {})
+
+        idle = self.backend.start_idle("img", ["sleep", "30"], {"dgrid.pool": "n"})
+        self.assertEqual(self.backend.list("dgrid.pool=n"), [idle])
+        self.assertEqual(self.backend.exec(idle, "echo warm", 10)["stdout"], "warm\n")
+
+        # A container that outlives its timeout is killed and removed
+        with self.assertRaises(ContainerTimeout):
+            self.backend.run("img", "sleep 30", 0.5)
+        self.assertEqual(list(self.daemon.containers), [idle])
+        self.backend.remove([idle])
+        self.assertEqual(self.daemon.containers, {})
+
+        # Requests share the keep-alive connection; only followed logs and execs
+        # (held or hijacked by the daemon) use one of their own
+        self.assertEqual(self.backend.api.connections, 1 + 3)
+
+    def test_output_is_streamed_and_kept_on_timeout(self):
+        output = (OutputCapture(), OutputCapture())
+        with self.assertRaises(ContainerTimeout):
+            self.backend.run("img", "echo started; echo warn >&2; sleep 30", 1, output=output)
+        self.assertEqual((output[0].text(), output[1].text()), ("started\n", "warn\n"))
+        self.assertEqual(self.daemon.containers, {})
+
+        idle = self.backend.start_idle("img", ["sleep", "30"])
+        output = (OutputCapture(), OutputCapture())
+        with self.assertRaises(ContainerTimeout) as timeout:
+            self.backend.exec(idle, "echo started; sleep 30", 1, output)
+        self.assertEqual((output[0].text(), timeout.exception.container), ("started\n", idle))
+        self.backend.remove([idle])
+
+    def test_timed_out_and_leftover_containers_are_reclaimed(self):
+        # The CLI client is killed on timeout; the container must go too
+        bin_dir = Path(self.tmp.name) / "bin"
+        bin_dir.mkdir()
+        (bin_dir / "docker").write_text(f'#!/bin/sh\nexec "{sys.executable}" '
+                                        f'"{Path(__file__).resolve().parent.parent / "benchmarks" / "fake_docker_daemon.py"}" '
+                                        f'--cli "$@"\n')
+        (bin_dir / "docker").chmod(0o755)
+        environ = dict(os.environ)
+        os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ['PATH']}"
+        os.environ["DOCKER_SOCKET"] = self.daemon.socket_path
+        try:
+            cli = CliBackend()
+            with self.assertRaises(ContainerTimeout):
+                cli.run("img", "sleep 30", 2, {"dgrid.node": "n", "dgrid.task": "t/1"})
+            self.assertEqual(self.daemon.containers, {})
+            self.assertEqual(cli.get_stats()["reclaimed_timeouts"], 1)
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
+
+        # Leftovers of a node are swept by label, other nodes' are kept
+        leftover = self.backend.start_idle("img", ["sleep", "30"], {"dgrid.node": "n"})
+        other = self.backend.start_idle("img", ["sleep", "30"], {"dgrid.node": "m"})
+        self.assertEqual(self.backend.reap("dgrid.node=n"), 1)
+        self.assertEqual(list(self.daemon.containers), [other])
+        self.assertNotIn(leftover, self.daemon.containers)
+        stats = self.backend.get_stats()
+        self.assertEqual((stats["reclaimed"], stats["reclaim_failures"]), (1, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from container_pool import ContainerPool
+
+# Stand-in for the docker CLI: containers are files in $FAKE_DOCKER_DIR
+# holding their labels, 'exec' runs the command on the host
+FAKE_DOCKER = """#!/usr/bin/env python3
+import os, subprocess, sys, uuid
+from pathlib import Path
+state = Path(os.environ["FAKE_DOCKER_DIR"])
+command, args = sys.argv[1], sys.argv[2:]
+with open(state / "calls", "a") as f:
+    f.write(command + "\\n")
+if command == "run":
+    container = uuid.uuid4().hex
+    (state / container).write_text(args[args.index("--label") + 1])
+    print(container)
+elif command == "exec":
+    sys.exit(subprocess.run(args[1:]).returncode)
+elif command == "rm":
+    for container in args[1:]:
+        if container != "-f":
+            (state / container).unlink(missing_ok=True)
+elif command == "ps":
+    label = args[args.index("--filter") + 1].split("=", 1)[1]
+    for path in state.iterdir():
+        if path.name != "calls" and path.read_text() == label:
+            print(path.name)
+"""
+
+
+class TestContainerPool(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.state = root / "state"
+        self.state.mkdir()
+        (root / "bin").mkdir()
+        docker = root / "bin" / "docker"
+        docker.write_text(FAKE_DOCKER)
+        docker.chmod(0o755)
+        self.environ = dict(os.environ)
+        os.environ["PATH"] = f"{root / 'bin'}{os.pathsep}{os.environ['PATH']}"
+        os.environ["FAKE_DOCKER_DIR"] = str(self.state)
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.environ)
+        self.tmp.cleanup()
+
+    def containers(self):
+        return sorted(path.name for path in self.state.iterdir() if path.name != "calls")
+
+    def wait_ready(self, pool, count):
+        deadline = time.monotonic() + 10
+        while pool.get_stats()["ready"] < count and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(pool.get_stats()["ready"], count)
+
+    def test_containers_serve_one_task_and_are_replaced(self):
+        # Leftover of a crashed run of the same worker
+        (self.state / "stale").write_text("dgrid.pool=n")
+        pool = ContainerPool(size=2, owner="n")
+        pool.start()
+        self.wait_ready(pool, 2)
+        self.assertNotIn("stale", self.containers())
+
+        used = pool.acquire("n", "t1")
+        self.assertIn(used, self.containers())
+        self.assertEqual((pool.task_of(used), pool.containers_of("t1")), (("n", "t1"), [used]))
+        pool.release(used)
+        self.assertIsNone(pool.task_of(used))
+        self.wait_ready(pool, 2)
+        self.assertNotIn(used, self.containers())
+        self.assertEqual(len(self.containers()), 2)
+
+        pool.acquire()
+        pool.acquire()
+        self.assertIsNone(pool.acquire())
+        stats = pool.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (3, 1, 0.75))
+        self.assertGreater(stats["startup_saved_ms"], 0)
+
+        pool.stop()
+        self.assertEqual(self.containers(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
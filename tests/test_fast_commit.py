@@ -0,0 +1,40 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from git_repo_case import GitRepoTestCase, git
+from git_handler import LostRaceError
+from git_writer import GitWriter, Mutation
+
+
+class TestFastCommit(GitRepoTestCase):
+    def test_fast_and_index_commits_build_the_same_tree(self):
+        mutations = [
+            Mutation("claim a", moves=[("tasks/queue/a.json", "tasks/in_progress/n-a.json")]),
+            Mutation("a completed", moves=[("tasks/in_progress/n-a.json", "tasks/completed/n-a.json")],
+                     writes={"tasks/completed/n-a.json.log": "{}"}),
+            Mutation("drop b", removes=["tasks/queue/b.json"]),
+        ]
+        trees = []
+        for name, fast in (("index", False), ("fast", True)):
+            handler = self._handler(Path(self.tmp.name) / name)
+            handler._configure_sparse_checkout(["tasks/queue", "tasks/in_progress", "nodes"])
+            for mutation in mutations:
+                if fast:
+                    self.assertTrue(handler.commit_changes(mutation.message, [mutation]))
+                else:
+                    GitWriter(handler, fast_commit=False)._apply(mutation)
+                    self.assertTrue(handler.commit_staged(mutation.message))
+            trees.append(git(handler.repo_path, "rev-parse", "HEAD^{tree}"))
+            self.assertEqual(git(handler.repo_path, "status", "--porcelain"), "")
+            self.assertFalse((handler.repo_path / "tasks" / "queue" / "b.json").exists())
+
+        self.assertEqual(trees[0], trees[1])
+        self.assertRaises(LostRaceError, handler.commit_changes, "claim b again",
+                          [Mutation("claim b again", moves=[("tasks/queue/b.json", "tasks/in_progress/n-b.json")])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from git_repo_case import GitRepoTestCase, git
+from git_handler import LostRaceError, PushRejectedError
+from git_writer import GitWriter, Mutation
+
+
+class TestGitWriter(GitRepoTestCase):
+    def test_pending_mutations_share_one_push(self):
+        writer = GitWriter(self.handler, flush_window=0.2)
+        writer.start()
+        futures = [
+            writer.submit(Mutation("claim a", moves=[("tasks/queue/a.json", "tasks/in_progress/n-a.json")],
+                                   node_id="n")),
+            writer.submit(Mutation("register", writes={"nodes/n.json": "{}"}, node_id="m")),
+        ]
+        writer.stop()
+
+        self.assertTrue(all(future.result() for future in futures))
+        self.assertEqual((writer.commits, writer.pushes), (1, 1))
+        log = git(self.remote, "log", "-1", "--format=%B", "main")
+        # A writer shared by several nodes names theirs, not the process's
+        self.assertTrue(log.startswith("[D-GRID] m, n commit 2 changes"))
+        self.assertIn("claim a", log)
+        self.assertIn("register", log)
+        files = git(self.remote, "ls-tree", "-r", "--name-only", "main").split()
+        self.assertIn("tasks/in_progress/n-a.json", files)
+        self.assertIn("nodes/n.json", files)
+
+    def test_rejected_push_is_rebased_not_replayed(self):
+        # Another node pushes an unrelated change first
+        other = self._handler(Path(self.tmp.name) / "other")
+        GitWriter(other).submit(Mutation("other registers", writes={"nodes/o.json": "{}"}))
+
+        writer = GitWriter(self.handler)
+        future = writer.submit(Mutation("claim a", moves=[("tasks/queue/a.json", "tasks/in_progress/n-a.json")]))
+
+        self.assertTrue(future.result())
+        self.assertEqual((writer.commits, writer.replays), (1, 0))
+        stats = self.handler.get_push_stats()
+        self.assertEqual((stats["retries"], stats["conflicts_resolved"]), (1, 1))
+        files = git(self.remote, "ls-tree", "-r", "--name-only", "main").split()
+        self.assertIn("nodes/o.json", files)
+        self.assertIn("tasks/in_progress/n-a.json", files)
+
+    def test_lost_race_aborts_and_replays_only_what_still_applies(self):
+        # Another node claims task a and pushes first
+        other = self._handler(Path(self.tmp.name) / "other")
+        GitWriter(other).submit(Mutation("other claims a", moves=[("tasks/queue/a.json", "tasks/in_progress/o-a.json")]))
+
+        writer = GitWriter(self.handler)
+        lost = writer.submit(Mutation("claim a", moves=[("tasks/queue/a.json", "tasks/in_progress/n-a.json")]))
+        self.assertRaises(LostRaceError, lost.result)
+
+        won = writer.submit(Mutation("claim b", moves=[("tasks/queue/b.json", "tasks/in_progress/n-b.json")]))
+        self.assertTrue(won.result())
+        stats = self.handler.get_push_stats()
+        self.assertEqual((stats["retries"], stats["lost_races"]), (1, 1))
+        self.assertEqual((writer.replays, writer.conflicts), (1, 1))
+        self.assertEqual(git(self.handler.repo_path, "status", "--porcelain"), "")
+
+    def test_failed_pull_stops_the_replay(self):
+        other = self._handler(Path(self.tmp.name) / "other")
+        GitWriter(other).submit(Mutation("other claims a", moves=[("tasks/queue/a.json", "tasks/in_progress/o-a.json")]))
+
+        writer = GitWriter(self.handler, flush_window=0.2)
+        writer.start()
+        with mock.patch.object(self.handler, "pull_rebase", return_value=False) as pull:
+            lost = writer.submit(Mutation("claim a", moves=[("tasks/queue/a.json", "tasks/in_progress/n-a.json")]))
+            stale = writer.submit(Mutation("claim b", moves=[("tasks/queue/b.json", "tasks/in_progress/n-b.json")]))
+            writer.stop()
+
+        # Neither is replayed on the stale base
+        for future in (lost, stale):
+            with self.assertRaisesRegex(PushRejectedError, "Pull failed"):
+                future.result()
+        self.assertEqual((pull.call_count, writer.replays), (1, 1))
+        self.assertEqual(git(self.remote, "ls-tree", "--name-only", "main", "tasks/in_progress/"),
+                         "tasks/in_progress/o-a.json")
+
+
+if __name__ == '__main__':
+    unittest.main()
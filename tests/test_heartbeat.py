@@ -0,0 +1,136 @@
+import json
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from state_manager import StateManager
+from heartbeat_scheduler import HeartbeatScheduler
+
+
+class FakeGitHandler:
+    def __init__(self, repo_path):
+        self.repo_path = Path(repo_path)
+        self.lock = threading.RLock()
+        self.piggybacks = []
+        self.commits = []
+        self.refs = []
+        self.ref_pushes = 0
+
+    def get_repo_path(self):
+        return self.repo_path
+
+    def add_piggyback(self, source):
+        self.piggybacks.append(source)
+
+    def get_writer(self):
+        return self
+
+    def submit(self, mutation):
+        for path, content in mutation.writes.items():
+            (self.repo_path / path).write_text(content)
+        self.commits.append((mutation.message, list(mutation.writes)))
+        for source in self.piggybacks:
+            source.piggyback_pushed()
+        mutation.future.set_result(True)
+        return mutation.future
+
+    def push_heartbeat_ref(self, node_id, payload):
+        return self.push_heartbeat_refs({node_id: payload})
+
+    def push_heartbeat_refs(self, payloads):
+        self.refs.extend(payloads.items())
+        self.ref_pushes += 1
+        return True
+
+
+class TestHeartbeatCoalescing(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.git = FakeGitHandler(self.tmp.name)
+        self.state = StateManager(self.git)
+        self.state.heartbeat_interval = 60
+        self.state.heartbeat_mode = "commit"
+        self.state.nodes_dir.mkdir()
+        with open(self.state.node_file, "w") as f:
+            json.dump({"last_heartbeat": "2020-01-01T00:00:00", "status": "active"}, f)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_heartbeat_rides_along_when_due(self):
+        self.assertEqual(self.state.piggyback_paths(), [self.state.node_path])
+        self.state.piggyback_pushed()
+
+        self.assertEqual(self.state.heartbeats_piggybacked, 1)
+        self.assertGreater(self.state.seconds_until_heartbeat(), 0)
+        # Carried recently: nothing to add to the next commit
+        self.assertEqual(self.state.piggyback_paths(), [])
+
+    def test_unpushed_heartbeat_is_not_rewritten(self):
+        self.state.piggyback_paths()
+        written = self.state.node_file.read_text()
+        time.sleep(0.01)
+        self.assertEqual(self.state.piggyback_paths(), [self.state.node_path])
+        self.assertEqual(self.state.node_file.read_text(), written)
+
+    def test_standalone_heartbeat_only_when_not_carried(self):
+        self.state.piggyback_paths()
+        self.state.piggyback_pushed()
+
+        self.assertTrue(self.state.send_heartbeat())
+        self.assertEqual(self.git.commits, [])
+
+        self.assertTrue(self.state.send_heartbeat(force=True))
+        self.assertEqual(len(self.git.commits), 1)
+        self.assertEqual(self.state.heartbeats_sent, 1)
+
+    def test_ref_mode_keeps_heartbeats_off_the_branch(self):
+        self.state.heartbeat_mode = "ref"
+        before = self.state.node_file.read_text()
+
+        self.assertEqual(self.state.piggyback_paths(), [])
+        self.assertTrue(self.state.send_heartbeat())
+        self.assertTrue(self.state.send_heartbeat())
+
+        self.assertEqual(self.git.commits, [])
+        self.assertEqual(len(self.git.refs), 1)
+        self.assertEqual(self.git.refs[0][1]["status"], "active")
+        self.assertEqual(self.state.node_file.read_text(), before)
+
+
+class TestSupervisorHeartbeats(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.git = FakeGitHandler(self.tmp.name)
+        self.states = [StateManager(self.git, f"node-{i}") for i in range(3)]
+        Path(self.tmp.name, "nodes").mkdir()
+        for state in self.states:
+            state.heartbeat_interval = 60
+            state.heartbeat_mode = "ref"
+            with open(state.node_file, "w") as f:
+                json.dump({"node_id": state.node_id, "status": "active"}, f)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_nodes_heartbeats_share_one_push(self):
+        scheduler = HeartbeatScheduler(*self.states)
+        # Only one node is due: the others are refreshed in the same push
+        self.states[1].last_heartbeat = self.states[2].last_heartbeat = time.time()
+        scheduler.send_due()
+
+        self.assertEqual(self.git.ref_pushes, 1)
+        self.assertEqual(sorted(node_id for node_id, _ in self.git.refs), ["node-0", "node-1", "node-2"])
+        self.assertTrue(all(state.seconds_until_heartbeat() > 0 for state in self.states))
+
+        scheduler.send_due()
+        self.assertEqual(self.git.ref_pushes, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import gzip
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from container_backend import CliBackend, Demuxer, ContainerTimeout
+from output_capture import OutputCapture
+
+
+class TestOutputCapture(unittest.TestCase):
+    def test_keeps_head_and_tail_and_spills_everything(self):
+        with tempfile.TemporaryDirectory() as root:
+            artifact = Path(root) / "t.stdout.gz"
+            capture = OutputCapture(head=4, tail=3, artifact=artifact)
+            for chunk in (b"ab", b"cdefgh", b"", b"ij", b"k"):
+                capture.write(chunk)
+            capture.close()
+            self.assertEqual((bytes(capture.head), bytes(capture.tail), capture.total), (b"abcd", b"ijk", 11))
+            self.assertEqual(capture.text(), "abcd\n[... 4 bytes omitted ...]\nijk")
+            self.assertEqual(gzip.decompress(artifact.read_bytes()), b"abcdefghijk")
+
+        small = OutputCapture(head=4, tail=3)
+        small.write("é!".encode())
+        self.assertEqual(small.text(), "é!")
+
+    def test_demuxer_handles_frames_split_across_chunks(self):
+        stdout, stderr = OutputCapture(), OutputCapture()
+        stream = (bytes([1, 0, 0, 0, 0, 0, 0, 3]) + b"out" + bytes([2, 0, 0, 0, 0, 0, 0, 4]) + b"err!"
+                  + bytes([1, 0, 0, 0, 0, 0, 0, 1]) + b"\n")
+        demuxer = Demuxer(stdout, stderr)
+        for i in range(0, len(stream), 5):
+            demuxer.write(stream[i:i + 5])
+        self.assertEqual((stdout.text(), stderr.text()), ("out\n", "err!"))
+
+    def test_cli_streams_large_output_and_keeps_it_on_timeout(self):
+        output = (OutputCapture(head=10, tail=10), OutputCapture(head=10, tail=10))
+        command = ["sh", "-c", "head -c 5000000 /dev/zero | tr '\\0' x; echo done; echo oops >&2"]
+        self.assertEqual(CliBackend()._run(command, 30, output), 0)
+        self.assertEqual((output[0].total, output[0].text()[-5:]), (5000005, "done\n"))
+        self.assertEqual(output[1].text(), "oops\n")
+
+        output = (OutputCapture(), OutputCapture())
+        with self.assertRaises(ContainerTimeout):
+            CliBackend()._run(["sh", "-c", "echo started; sleep 30"], 0.5, output)
+        self.assertEqual(output[0].text(), "started\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from git import Repo
+from git_repo_case import GitRepoTestCase, git
+from git_handler import GitHandler
+from git_writer import GitWriter, Mutation
+
+
+class TestPartialClone(GitRepoTestCase):
+    def test_pull_fetches_blobs_only_inside_the_cone(self):
+        git(self.remote, "config", "uploadpack.allowFilter", "true")
+        path = Path(self.tmp.name) / "partial"
+        git(self.tmp.name, "clone", "-q", "--filter=blob:none", "--sparse", self.remote.as_uri(), str(path))
+        handler = GitHandler()
+        handler.repo_path = path
+        handler.repo = Repo(path)
+        handler._configure_sparse_checkout(["tasks/queue", "nodes"])
+        handler.partial_clone = True
+
+        other = self._handler(Path(self.tmp.name) / "other")
+        GitWriter(other).submit(Mutation("other reports", writes={
+            "tasks/completed/o-x.json.log": "x" * 20000, "nodes/o.json": '{"node_id": "o"}'
+        }))
+
+        self.assertTrue(handler.pull_rebase())
+        self.assertTrue((path / "nodes" / "o.json").exists())
+        missing = git(path, "rev-list", "--objects", "--missing=print", "HEAD").split()
+        log_blob = git(other.repo_path, "rev-parse", "HEAD:tasks/completed/o-x.json.log")
+        self.assertIn("?" + log_blob, missing)
+        stats = handler.get_poll_stats()
+        self.assertEqual(stats["lazy_fetches"], 1)
+        self.assertGreater(stats["lazy_fetch_bytes"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from git_repo_case import GitRepoTestCase
+from git_writer import GitWriter, Mutation
+
+
+class TestRemotePolling(GitRepoTestCase):
+    def test_poll_fetches_only_when_the_tip_moved(self):
+        self.assertTrue(self.handler.pull_rebase())
+        self.assertFalse(self.handler.get_poll_stats()["last_poll"]["fetched"])
+
+        other = self._handler(Path(self.tmp.name) / "other")
+        GitWriter(other).submit(Mutation("other registers", writes={"nodes/o.json": "{}"}))
+
+        self.assertTrue(self.handler.pull_rebase())
+        stats = self.handler.get_poll_stats()
+        self.assertEqual((stats["polls"], stats["fetches"]), (2, 1))
+        self.assertGreater(stats["last_poll"]["bytes"], 0)
+        self.assertTrue((self.handler.repo_path / "nodes" / "o.json").exists())
+        self.assertEqual(self.handler.repo.head.commit.hexsha, other.repo.head.commit.hexsha)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from git import Repo
+from git_repo_case import GitRepoTestCase, git
+from git_handler import GitHandler
+from git_writer import GitWriter, Mutation
+from repo_maintenance import RepoMaintenance
+
+
+class TestRepoMaintenance(GitRepoTestCase):
+    def test_shallow_clone_is_cut_back_and_repacked(self):
+        writer = GitWriter(self.handler)
+        for i in range(12):
+            writer.submit(Mutation(f"heartbeat {i}", writes={"nodes/n.json": f'{{"beat": {i}}}'})).result()
+
+        path = Path(self.tmp.name) / "shallow"
+        git(self.tmp.name, "clone", "-q", "--depth=1", f"file://{self.remote}", str(path))
+        shallow = GitHandler()
+        shallow.repo_path = path
+        shallow.repo = Repo(path)
+        for i in range(12, 20):
+            writer.submit(Mutation(f"heartbeat {i}", writes={"nodes/n.json": f'{{"beat": {i}}}'})).result()
+        self.assertTrue(shallow.pull_rebase(smart_poll=False))
+
+        maintenance = RepoMaintenance(shallow, interval=0, shallow_depth=3, loose_objects=10**6,
+                                      prune_grace="now")
+        self.assertTrue(maintenance.needs_maintenance(maintenance.count_objects()))
+        self.assertTrue(maintenance.run_once())
+
+        self.assertEqual(git(path, "rev-list", "--count", "HEAD"), "3")
+        stats = maintenance.get_stats()["last_run"]
+        self.assertEqual(stats["after"]["loose"], 0)
+        self.assertEqual(stats["after"]["packs"], 1)
+        self.assertEqual(git(path, "status", "--porcelain"), "")
+
+        # A clean clone is left alone
+        self.assertFalse(maintenance.run_once())
+        self.assertEqual(maintenance.skipped, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
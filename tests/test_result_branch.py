@@ -0,0 +1,58 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / ".github" / "scripts"))
+
+from git_repo_case import GitRepoTestCase, git
+from git_writer import GitWriter, Mutation
+from result_branch import ResultBranchWriter, ResultMutation
+import aggregate_results
+
+
+class TestResultBranches(GitRepoTestCase):
+    def test_node_results_are_aggregated_into_main(self):
+        writer = GitWriter(self.handler)
+        for name in ("a", "b"):
+            writer.submit(Mutation(f"claim {name}", moves=[(f"tasks/queue/{name}.json",
+                                                            f"tasks/in_progress/n-{name}.json")])).result()
+        main_tip = git(self.remote, "rev-parse", "main")
+
+        results = ResultBranchWriter(self.handler, flush_window=0.2)
+        results.start()
+        futures = [results.submit(ResultMutation(node_id, f"{node_id} done a", {
+            f"tasks/completed/{node_id}-a.json": "{}", f"tasks/completed/{node_id}-a.json.log": "ok"}))
+            for node_id in ("n", "m")]
+        for future in futures:
+            self.assertTrue(future.result(timeout=10))
+        results.stop()
+
+        # One push for both nodes, main untouched
+        self.assertEqual(results.get_stats()["pushes"], 1)
+        self.assertEqual(git(self.remote, "rev-parse", "main"), main_tip)
+        self.assertEqual(git(self.remote, "ls-tree", "-r", "--name-only", "refs/dgrid/results/n").split(),
+                         ["tasks/completed/n-a.json", "tasks/completed/n-a.json.log"])
+
+        admin = self._handler(Path(self.tmp.name) / "admin")
+        aggregate_results.REPO_ROOT = admin.repo_path
+        result = aggregate_results.aggregate()
+        self.assertEqual((result["results"], result["nodes"], result["removed"]), (2, ["m", "n"], 1))
+        self.assertEqual(git(self.remote, "ls-tree", "-r", "--name-only", "main").split(), [
+            "tasks/completed/m-a.json", "tasks/completed/m-a.json.log",
+            "tasks/completed/n-a.json", "tasks/completed/n-a.json.log", "tasks/in_progress/n-b.json"])
+        self.assertIsNone(aggregate_results.aggregate())
+
+        # The next result is appended to the node's branch and aggregated alone
+        results = ResultBranchWriter(self.handler)
+        results.submit(ResultMutation("n", "n failed b", {"tasks/failed/n-b.json": "{}"})).result()
+        self.assertEqual(git(self.remote, "rev-list", "--count", "refs/dgrid/results/n"), "2")
+        self.assertEqual(aggregate_results.aggregate()["results"], 1)
+        self.assertEqual(git(self.remote, "ls-tree", "--name-only", "main", "tasks/in_progress/"), "")
+
+        self.handler.pull_rebase(smart_poll=False)
+        self.assertEqual(git(self.handler.repo_path, "status", "--porcelain"), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from result_cache import ResultCache
+from task_runner import TaskRunner
+
+
+class FakeGitHandler:
+    """Clone whose HEAD tree is a dict; submitted writes land in it."""
+
+    def __init__(self, repo_path):
+        self.repo_path = Path(repo_path)
+        self.tree = {}
+
+    def get_repo_path(self):
+        return self.repo_path
+
+    def get_head_commit(self):
+        return "HEAD"
+
+    def read_files(self, commit, paths):
+        return {path: self.tree[path] for path in paths if path in self.tree}
+
+    def get_writer(self):
+        return self
+
+    def submit(self, mutation):
+        self.tree.update(mutation.writes)
+        mutation.future.set_result(True)
+        return mutation.future
+
+
+class FakeBackend:
+    name = "fake"
+
+    def __init__(self):
+        self.runs = 0
+
+    def run(self, image, script, timeout, labels=None, output=None):
+        self.runs += 1
+        return {"exit_code": 0, "stdout": f"run {self.runs}\n", "stderr": "", "stdout_bytes": 6, "stderr_bytes": 0}
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.git_handler = FakeGitHandler(self.tmp.name)
+        self.tasks = Path(self.tmp.name) / "tasks" / "in_progress"
+        self.tasks.mkdir(parents=True)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def runner(self, node_id):
+        cache = ResultCache(self.git_handler, size=2, shared=True, node_id=node_id)
+        return TaskRunner(self.git_handler, node_id, container_backend=FakeBackend(), result_cache=cache)
+
+    def task(self, task_id, script="echo hi", deterministic=True):
+        path = self.tasks / f"{task_id}.json"
+        path.write_text(json.dumps({"task_id": task_id, "script": script, "timeout_seconds": 30,
+                                    "deterministic": deterministic}))
+        return path
+
+    def test_identical_deterministic_tasks_run_once_across_nodes(self):
+        a = self.runner("a")
+        first = a.execute_task(self.task("t1"))
+        self.assertEqual(first["stdout"], "run 1\n")
+        self.assertFalse(first.get("cached"))
+        self.assertEqual(a.execute_task(self.task("t2")), dict(first, cached=True, cached_from="t1"))
+        self.assertEqual(a.container_backend.runs, 1)
+
+        # Not marked deterministic, or a different script: runs
+        self.assertEqual(a.execute_task(self.task("t3", deterministic=False))["stdout"], "run 2\n")
+        self.assertEqual(a.execute_task(self.task("t4", script="echo other"))["stdout"], "run 3\n")
+
+        # The node that ran t1 commits its entry; another node finds it there
+        a.submit_task_result(self.task("t1"), first).result()
+        b = self.runner("b")
+        self.assertEqual(b.execute_task(self.task("t5"))["stdout"], "run 1\n")
+        self.assertEqual(b.container_backend.runs, 0)
+        self.assertEqual(b.result_cache.get_stats()["shared_hits"], 1)
+
+        stats = a.result_cache.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (1, 2, 0.333))
+        # One entry per distinct deterministic task that ran (t1, t4)
+        self.assertEqual((stats["entries"], stats["evictions"]), (2, 0))
+
+    def test_lru_eviction_and_no_caching_of_timeouts(self):
+        cache = ResultCache(size=2)
+        for key in ("k1", "k2"):
+            cache.put(key, {"exit_code": 0, "stdout": key, "stderr": ""}, key)
+        cache.get("k1")
+        cache.put("k3", {"exit_code": 1, "stdout": "", "stderr": "boom"}, "k3")
+        self.assertIsNone(cache.get("k2"))
+        self.assertEqual(cache.get("k1")["stdout"], "k1")
+        self.assertEqual(cache.get("k3")["exit_code"], 1)
+        self.assertIsNone(cache.put("k4", {"exit_code": -2, "stdout": "", "stderr": "Timeout"}, "k4"))
+        self.assertEqual(cache.get_stats()["evictions"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from git_repo_case import GitRepoTestCase, git
+from git_writer import GitWriter, Mutation
+from shared_mirror import SharedMirror
+
+
+class TestSharedMirror(GitRepoTestCase):
+    def test_fetches_come_from_the_mirror_and_pushes_go_upstream(self):
+        mirror = SharedMirror(Path(self.tmp.name) / "cache" / "mirror.git", str(self.remote), 60)
+        mirror.ensure()
+        self.handler._auth_url = lambda: str(self.remote)
+        self.handler._use_shared_mirror(mirror)
+        alternates = self.handler.repo_path / ".git" / "objects" / "info" / "alternates"
+        self.assertIn(str(mirror.objects_path()), alternates.read_text())
+
+        other = self._handler(Path(self.tmp.name) / "other")
+        GitWriter(other).submit(Mutation("other registers", writes={"nodes/o.json": "{}"}))
+
+        # Not in the mirror until its next refresh
+        self.assertTrue(self.handler.pull_rebase())
+        self.assertFalse((self.handler.repo_path / "nodes" / "o.json").exists())
+        self.assertTrue(mirror.refresh())
+        self.assertTrue(self.handler.pull_rebase())
+        self.assertTrue((self.handler.repo_path / "nodes" / "o.json").exists())
+
+        claim = GitWriter(self.handler).submit(
+            Mutation("claim a", moves=[("tasks/queue/a.json", "tasks/in_progress/n-a.json")]))
+        self.assertTrue(claim.result())
+        files = git(self.remote, "ls-tree", "-r", "--name-only", "main").split()
+        self.assertIn("tasks/in_progress/n-a.json", files)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from git_repo_case import GitRepoTestCase, git
+from git_writer import GitWriter, Mutation
+
+
+class TestSparseCheckout(GitRepoTestCase):
+    def test_results_are_committed_outside_the_cone(self):
+        self.handler._configure_sparse_checkout(["tasks/queue", "tasks/in_progress", "nodes"])
+        writer = GitWriter(self.handler)
+        claim = writer.submit(Mutation("claim a", moves=[("tasks/queue/a.json", "tasks/in_progress/n-a.json")]))
+        self.assertTrue(claim.result())
+
+        result = writer.submit(Mutation(
+            "a completed",
+            moves=[("tasks/in_progress/n-a.json", "tasks/completed/n-a.json")],
+            writes={"tasks/completed/n-a.json.log": "{}", "nodes/n.json": "{}"}
+        ))
+        self.assertTrue(result.result())
+
+        files = git(self.remote, "ls-tree", "-r", "--name-only", "main").split()
+        self.assertIn("tasks/completed/n-a.json", files)
+        self.assertIn("tasks/completed/n-a.json.log", files)
+        self.assertFalse((self.handler.repo_path / "tasks" / "completed").exists())
+        self.assertTrue((self.handler.repo_path / "nodes" / "n.json").exists())
+        self.assertEqual(git(self.handler.repo_path, "status", "--porcelain"), "")
+        self.assertEqual(self.handler.untracked_paths(["tasks/completed/n-a.json.log", "tasks/queue/a.json"]),
+                         ["tasks/queue/a.json"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from git.cmd import Git
+from git_repo_case import GitRepoTestCase, git
+from git_writer import GitWriter, Mutation
+from state_index import StateIndex
+
+
+class TestStateIndex(GitRepoTestCase):
+    def test_counts_follow_head_and_survive_a_restart(self):
+        db = Path(self.tmp.name) / "state.sqlite3"
+        index = StateIndex(self.handler, db)
+        index.sync()
+        self.assertEqual(index.task_counts(), {"queue": 2, "in_progress": 0, "completed": 0, "failed": 0})
+
+        writer = GitWriter(self.handler)
+        writer.submit(Mutation("register", writes={"nodes/n.json": '{"last_heartbeat": "2030-01-01T00:00:00"}'}))
+        writer.submit(Mutation("done a", moves=[("tasks/queue/a.json", "tasks/completed/a.json")])).result()
+        index.sync()
+
+        self.assertEqual(index.task_counts(), {"queue": 1, "in_progress": 0, "completed": 1, "failed": 0})
+        self.assertEqual(index.task_paths("completed"), ["tasks/completed/a.json"])
+        self.assertEqual(index.nodes()["n"]["last_heartbeat"], "2030-01-01T00:00:00")
+        self.assertEqual((index.rebuilds, index.paths_applied), (1, 3))
+        index.close()
+
+        # A restarted worker resumes from the persisted commit
+        reopened = StateIndex(self.handler, db)
+        reopened.sync()
+        self.assertEqual(reopened.rebuilds, 0)
+        self.assertEqual(reopened.task_counts()["completed"], 1)
+        reopened.close()
+
+    def test_liveness_follows_the_heartbeat_refs(self):
+        GitWriter(self.handler).submit(Mutation("register", writes={
+            "nodes/n.json": '{"last_heartbeat": "2020-01-01T00:00:00"}',
+            "nodes/m.json": '{"last_heartbeat": "2020-01-01T00:00:00"}'}))
+        other = self._handler(Path(self.tmp.name) / "other")
+        other.push_heartbeat_refs({"n": {}, "m": {}})
+
+        index = StateIndex(self.handler, Path(self.tmp.name) / "state.sqlite3", heartbeat_refs=True)
+        index.sync()
+        nodes = index.nodes()
+        self.assertGreater(nodes["n"]["last_heartbeat"], "2020-01-01T00:00:00")
+        self.assertEqual(nodes["n"]["last_heartbeat"], nodes["m"]["last_heartbeat"])
+
+        # Refreshed without a new HEAD once the interval passed; a deleted
+        # ref falls back to the node file
+        git(self.remote, "update-ref", "-d", "refs/dgrid/heartbeat/m")
+        index.heartbeat_interval = 0
+        index.sync()
+        self.assertEqual(index.nodes()["m"]["last_heartbeat"], "2020-01-01T00:00:00")
+        self.assertEqual((index.syncs, index.heartbeat_fetches), (1, 2))
+        index.close()
+
+    def test_sync_with_an_unchanged_head_does_not_fetch(self):
+        index = StateIndex(self.handler, Path(self.tmp.name) / "state.sqlite3", heartbeat_refs=True,
+                           heartbeat_interval=60)
+        index.sync()
+        commands = []
+        execute = Git.execute
+
+        def record(git_cmd, command, *args, **kwargs):
+            commands.append(command)
+            return execute(git_cmd, command, *args, **kwargs)
+
+        with mock.patch.object(Git, "execute", record):
+            for _ in range(3):
+                self.assertTrue(index.sync())
+        self.assertEqual([command for command in commands if "fetch" in command], [])
+        self.assertEqual((index.syncs, index.heartbeat_fetches), (1, 1))
+        index.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
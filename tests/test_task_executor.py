@@ -0,0 +1,69 @@
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from task_executor import ParallelExecutor
+
+
+class TestParallelExecutor(unittest.TestCase):
+    def test_runs_up_to_max_slots_concurrently(self):
+        release = threading.Event()
+        started = []
+
+        def task_fn(task_file, prepared):
+            started.append(task_file)
+            release.wait(5)
+
+        executor = ParallelExecutor(2, task_fn)
+        self.assertTrue(executor.submit(Path("a.json")))
+        self.assertTrue(executor.submit(Path("b.json")))
+        self.assertFalse(executor.submit(Path("c.json")))
+        self.assertEqual(executor.free_slots(), 0)
+
+        release.set()
+        executor.shutdown(wait=True)
+        self.assertEqual(executor.free_slots(), 2)
+        self.assertEqual(sorted(p.name for p in started), ["a.json", "b.json"])
+
+    def test_utilization_counts_completed_tasks(self):
+        executor = ParallelExecutor(1, lambda task_file, prepared: None)
+        executor.submit(Path("a.json"))
+        executor.shutdown(wait=True)
+
+        utilization = executor.get_utilization()
+        self.assertEqual(utilization["max_slots"], 1)
+        self.assertEqual(utilization["busy_slots"], 0)
+        self.assertEqual(utilization["slots"][0]["tasks_completed"], 1)
+
+    def test_slot_chains_into_next_ready_task(self):
+        ran = []
+        ready = [(Path("b.json"), {"task_id": "b"})]
+
+        def next_task_fn():
+            return ready.pop() if ready else None
+
+        slot_freed = threading.Event()
+        executor = ParallelExecutor(1, lambda task_file, prepared: ran.append((task_file.name, prepared)),
+                                    next_task_fn=next_task_fn, slot_freed=slot_freed)
+        executor.submit(Path("a.json"))
+        self.assertTrue(slot_freed.wait(5))
+        executor.shutdown(wait=True)
+
+        self.assertEqual(ran, [("a.json", None), ("b.json", {"task_id": "b"})])
+        self.assertEqual(executor.get_utilization()["slots"][0]["tasks_completed"], 2)
+
+    def test_failing_task_releases_slot(self):
+        def task_fn(task_file, prepared):
+            raise RuntimeError("boom")
+
+        executor = ParallelExecutor(1, task_fn)
+        executor.submit(Path("a.json"))
+        executor.shutdown(wait=True)
+        self.assertEqual(executor.free_slots(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
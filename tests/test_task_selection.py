@@ -0,0 +1,37 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from task_selection import TaskSelector
+
+
+class TestTaskSelector(unittest.TestCase):
+    def setUp(self):
+        self.tasks = [f"task-{i:03d}.json" for i in range(100)]
+
+    def test_first_strategy_keeps_queue_order(self):
+        selector = TaskSelector("node-a", "first")
+        self.assertEqual(selector.select(self.tasks, 3), self.tasks[:3])
+
+    def test_rendezvous_is_stable_per_node(self):
+        selector = TaskSelector("node-a", "rendezvous", window=16)
+        self.assertEqual(selector.select(self.tasks, 4), selector.select(self.tasks, 4))
+
+    def test_rendezvous_spreads_nodes(self):
+        picks = {TaskSelector(f"node-{i}", "rendezvous", window=32).select(self.tasks, 1)[0] for i in range(10)}
+        self.assertGreater(len(picks), 5)
+
+    def test_selection_stays_within_window(self):
+        for strategy in ("random", "rendezvous"):
+            selected = TaskSelector("node-a", strategy, window=8).select(self.tasks, 3)
+            self.assertEqual(len(selected), 3)
+            self.assertTrue(set(selected) <= set(self.tasks[:8]))
+
+    def test_invalid_strategy_falls_back_to_rendezvous(self):
+        self.assertEqual(TaskSelector("node-a", "bogus").strategy, "rendezvous")
+
+
+if __name__ == '__main__':
+    unittest.main()
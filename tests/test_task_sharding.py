@@ -0,0 +1,95 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "worker"))
+
+from task_sharding import QueueIndex, TaskSharding
+
+
+class TestQueueIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = QueueIndex("tasks/queue")
+        self.index.build([
+            "tasks/queue/.gitkeep",
+            "tasks/queue/low/3/task-a.json",
+            "tasks/queue/task-b.json",
+            "tasks/queue/critical/0/task-c.json",
+            "tasks/completed/task-d.json",
+        ], "c1")
+
+    def test_build_ignores_non_queue_paths(self):
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.indexed_commit, "c1")
+
+    def test_candidates_in_priority_order(self):
+        self.assertEqual(self.index.candidates(10), [
+            "tasks/queue/critical/0/task-c.json",
+            "tasks/queue/task-b.json",
+            "tasks/queue/low/3/task-a.json",
+        ])
+        # Candidates are not consumed
+        self.assertEqual(len(self.index.candidates(10)), 3)
+
+    def test_apply_changes_adds_and_removes(self):
+        self.index.apply_changes([
+            ("D", "tasks/queue/critical/0/task-c.json"),
+            ("A", "tasks/queue/high/7/task-e.json"),
+            ("A", "tasks/in_progress/node-task-c.json"),
+        ], "c2")
+
+        self.assertEqual(self.index.indexed_commit, "c2")
+        self.assertEqual(self.index.candidates(2), [
+            "tasks/queue/high/7/task-e.json",
+            "tasks/queue/task-b.json",
+        ])
+
+    def test_readded_task_is_not_duplicated(self):
+        self.index.remove("tasks/queue/task-b.json")
+        self.index.add("tasks/queue/task-b.json")
+        self.assertEqual(self.index.candidates(10).count("tasks/queue/task-b.json"), 1)
+
+    def test_stats_by_priority(self):
+        stats = self.index.get_stats()
+        self.assertEqual(stats["total"], 3)
+        self.assertEqual(stats["by_priority"], {"critical": 1, "high": 0, "medium": 1, "low": 1})
+
+
+class TestShardFanout(unittest.TestCase):
+    def test_shard_parts_use_at_most_two_levels(self):
+        self.assertEqual(len(TaskSharding.shard_parts("task-1", 1)), 1)
+        for digits in (2, 3, 4):
+            parts = TaskSharding.shard_parts("task-1", digits)
+            self.assertEqual(len(parts), 2)
+            self.assertEqual(len("".join(parts)), digits)
+        # One digit keeps the original 16-shard layout
+        self.assertEqual(TaskSharding.shard_parts("task-1", 1)[0], TaskSharding.shard_parts("task-1", 3)[0])
+
+    def test_plan_fanout_splits_and_merges_with_hysteresis(self):
+        self.assertEqual(TaskSharding.plan_fanout(1, 16 * 1000, 1000), 1)
+        self.assertEqual(TaskSharding.plan_fanout(1, 16 * 1000 + 1, 1000), 2)
+        self.assertEqual(TaskSharding.plan_fanout(2, 200000, 1000), 2)
+        self.assertEqual(TaskSharding.plan_fanout(2, 300000, 1000), 3)
+        # Just under the split threshold is not enough to merge back
+        self.assertEqual(TaskSharding.plan_fanout(2, 15000, 1000), 2)
+        self.assertEqual(TaskSharding.plan_fanout(2, 8000, 1000), 1)
+        self.assertEqual(TaskSharding.plan_fanout(3, 10 ** 9, 1000, max_digits=3), 3)
+
+    def test_migration_plan_skips_legacy_and_placed_tasks(self):
+        placed = "tasks/queue/high/" + "/".join(TaskSharding.shard_parts("b", 2)) + "/b.json"
+        with tempfile.TemporaryDirectory() as queue_dir:
+            renames = TaskSharding(queue_dir).migration_plan([
+                "tasks/queue/legacy.json",
+                "tasks/queue/low/0/a.json",
+                placed,
+            ], 2)
+
+        self.assertEqual(len(renames), 1)
+        src, dst = renames[0]
+        self.assertEqual(src, "tasks/queue/low/0/a.json")
+        self.assertEqual(dst, "tasks/queue/low/" + "/".join(TaskSharding.shard_parts("a", 2)) + "/a.json")
+
+
+if __name__ == '__main__':
+    unittest.main()
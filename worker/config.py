@@ -19,6 +19,9 @@ REPO_PATH = os.getenv("DGRID_REPO_PATH", "/tmp/d-grid-repo")
 # === Node Configuration ===
 NODE_ID = os.getenv("NODE_ID", socket.gethostname())
 NODE_NAME = os.getenv("NODE_NAME", f"worker-{NODE_ID}")
+SUPERVISOR_NODES = int(os.getenv("SUPERVISOR_NODES", "2"))  # Logical nodes hosted by supervisor.py
+SUPERVISOR_NODE_IDS = [n.strip() for n in os.getenv("SUPERVISOR_NODE_IDS", "").split(",") if n.strip()] \
+    or [f"{NODE_ID}-{i}" for i in range(SUPERVISOR_NODES)]  # Explicit ids override NODE_ID-<i>
 
 # === Git Credentials ===
 GIT_USER_NAME = os.getenv("GIT_USER_NAME", "D-GRID Worker")
@@ -29,15 +32,47 @@ GIT_TOKEN = os.getenv("GIT_TOKEN", None)  # For HTTPS authentication
 DOCKER_CPUS = os.getenv("DOCKER_CPUS", "1")
 DOCKER_MEMORY = os.getenv("DOCKER_MEMORY", "512m")
 DOCKER_TIMEOUT = int(os.getenv("DOCKER_TIMEOUT", "3600"))  # seconds
+DOCKER_BACKEND = os.getenv("DOCKER_BACKEND", "cli")  # cli: docker CLI per operation; api: Engine API over DOCKER_SOCKET
+DOCKER_SOCKET = os.getenv("DOCKER_SOCKET", "/var/run/docker.sock")
+OUTPUT_HEAD_BYTES = int(os.getenv("OUTPUT_HEAD_BYTES", "5000"))  # First bytes of stdout/stderr kept in the task log
+OUTPUT_TAIL_BYTES = int(os.getenv("OUTPUT_TAIL_BYTES", "5000"))  # Last bytes of stdout/stderr kept in the task log
+OUTPUT_ARTIFACT_DIR = os.getenv("OUTPUT_ARTIFACT_DIR", "")  # If set, full output is gzipped to <dir>/<task>.<stream>.gz
 
 # === Worker Loop Configuration ===
 PULL_INTERVAL = int(os.getenv("PULL_INTERVAL", "10"))  # seconds between pulls
 HEARTBEAT_INTERVAL = int(os.getenv("HEARTBEAT_INTERVAL", "60"))  # seconds between heartbeats
+HEARTBEAT_MODE = os.getenv("HEARTBEAT_MODE", "commit")  # commit: nodes/<node>.json on main, ref: force-pushed refs/dgrid/heartbeat/<node>
 
 # === Performance & Optimization (Phase 1 Improvements) ===
 USE_SHALLOW_CLONE = os.getenv("USE_SHALLOW_CLONE", "true").lower() == "true"  # #5: Optimize Git Ops
 USE_SMART_POLLING = os.getenv("USE_SMART_POLLING", "true").lower() == "true"  # #6: Local Task Cache
+USE_SPARSE_CHECKOUT = os.getenv("USE_SPARSE_CHECKOUT", "false").lower() == "true"  # Materialize only SPARSE_CHECKOUT_DIRS
+SPARSE_CHECKOUT_DIRS = [d.strip().strip("/") for d in os.getenv("SPARSE_CHECKOUT_DIRS", "tasks/queue,tasks/in_progress,nodes").split(",") if d.strip()]
+USE_PARTIAL_CLONE = os.getenv("USE_PARTIAL_CLONE", "false").lower() == "true"  # Fetch blobs only for the sparse checkout
+PARTIAL_CLONE_FILTER = os.getenv("PARTIAL_CLONE_FILTER", "blob:none")  # git clone --filter spec
+SHARED_MIRROR_PATH = os.getenv("SHARED_MIRROR_PATH", "")  # Host-local bare mirror shared by the workers of a host ("" = off)
+SHARED_MIRROR_REFRESH = int(os.getenv("SHARED_MIRROR_REFRESH", str(PULL_INTERVAL)))  # seconds between mirror fetches
 MAX_PARALLEL_TASKS = int(os.getenv("MAX_PARALLEL_TASKS", "1"))  # #7: Parallel execution (Phase 3)
+USE_CONTAINER_POOL = os.getenv("USE_CONTAINER_POOL", "false").lower() == "true"  # Run tasks in pre-started containers (docker exec)
+CONTAINER_POOL_SIZE = int(os.getenv("CONTAINER_POOL_SIZE", str(2 * MAX_PARALLEL_TASKS)))  # Warm containers kept ready per process
+PREFETCH_DEPTH = int(os.getenv("PREFETCH_DEPTH", "1"))  # Claimed-but-not-started tasks kept ready (0 = off)
+BATCH_CLAIM_MAX = int(os.getenv("BATCH_CLAIM_MAX", "8"))  # Max tasks claimed per commit/push (1 = single claims)
+TASK_SELECTION_STRATEGY = os.getenv("TASK_SELECTION_STRATEGY", "rendezvous")  # first, random, rendezvous
+TASK_SELECTION_WINDOW = int(os.getenv("TASK_SELECTION_WINDOW", "32"))  # Head-of-queue tasks considered per claim
+QUEUE_SHARD_TARGET = int(os.getenv("QUEUE_SHARD_TARGET", "1000"))  # #1: Max tasks per shard directory before splitting
+QUEUE_SHARD_MIN_DIGITS = int(os.getenv("QUEUE_SHARD_MIN_DIGITS", "1"))  # Hash digits per shard path: 1 = 16 shards per priority
+QUEUE_SHARD_MAX_DIGITS = int(os.getenv("QUEUE_SHARD_MAX_DIGITS", "3"))  # 3 = 4096 shards per priority
+QUEUE_AUTO_RESHARD = os.getenv("QUEUE_AUTO_RESHARD", "false").lower() == "true"  # Split/merge shards as the queue grows/shrinks
+GIT_FLUSH_WINDOW = float(os.getenv("GIT_FLUSH_WINDOW", "0.5"))  # Seconds the git writer gathers changes into one commit/push
+USE_FAST_COMMIT = os.getenv("USE_FAST_COMMIT", "false").lower() == "true"  # Build commits from the changed tree entries (no index refresh)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))  # Results of "deterministic" tasks kept per worker, LRU (0 = off)
+RESULT_CACHE_SHARED = os.getenv("RESULT_CACHE_SHARED", "false").lower() == "true"  # Also commit them to cache/results/ for other nodes
+RESULT_MODE = os.getenv("RESULT_MODE", "main")  # main: results pushed to the branch; branch: to refs/dgrid/results/<node>, merged by aggregate_results.py
+MAINTENANCE_INTERVAL = int(os.getenv("MAINTENANCE_INTERVAL", "3600"))  # Min seconds between repack/prune runs of the clone (0 = off)
+MAINTENANCE_SHALLOW_DEPTH = int(os.getenv("MAINTENANCE_SHALLOW_DEPTH", "50"))  # Commits kept when re-shallowing a shallow clone
+MAINTENANCE_LOOSE_OBJECTS = int(os.getenv("MAINTENANCE_LOOSE_OBJECTS", "1000"))  # Loose objects that make a run worth it
+PUSH_MAX_RETRIES = int(os.getenv("PUSH_MAX_RETRIES", "5"))  # Fetch + rebase + re-push rounds after a rejected push
+PUSH_BACKOFF_BASE = float(os.getenv("PUSH_BACKOFF_BASE", "0.5"))  # Seconds, doubled per retry with full jitter (capped at 16s)
 
 # === Resource Quotas & Rate Limiting (#10) ===
 MAX_TASKS_PER_HOUR = int(os.getenv("MAX_TASKS_PER_HOUR", "0"))  # 0 = unlimited
@@ -49,18 +84,22 @@ LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 LOG_FILE = os.getenv("LOG_FILE", "/tmp/d-grid-worker.log")
 
 # === Node Specs (for registration) ===
-def get_node_specs():
+def get_node_specs(node_id=NODE_ID):
     """
     Returns node specs (CPU, RAM, etc).
     If psutil is not available, returns conservative fallback values.
+    
+    Args:
+        node_id: Logical node the specs are registered for (a supervisor
+                 hosts several on one machine)
     """
     try:
         if psutil is None:
             raise ImportError("psutil not available")
         
         return {
-            "node_id": NODE_ID,
-            "node_name": NODE_NAME,
+            "node_id": node_id,
+            "node_name": NODE_NAME if node_id == NODE_ID else f"worker-{node_id}",
             "cpu_count": psutil.cpu_count(logical=False) or 1,
             "memory_gb": round(psutil.virtual_memory().total / (1024**3), 2),
             "disk_gb": round(psutil.disk_usage("/").total / (1024**3), 2),
@@ -68,8 +107,8 @@ def get_node_specs():
     except Exception as e:
         # Fallback: minimal specs if psutil is not available or system is anomalous
         return {
-            "node_id": NODE_ID,
-            "node_name": NODE_NAME,
+            "node_id": node_id,
+            "node_name": NODE_NAME if node_id == NODE_ID else f"worker-{node_id}",
             "cpu_count": 1,
             "memory_gb": 0.5,
             "disk_gb": 10.0,
@@ -107,6 +146,13 @@ def validate_config():
     if not NODE_ID or NODE_ID.strip() == "":
         errors.append("NODE_ID cannot be empty. Set via env var or hostname fallback.")
     
+    # Validate supervisor nodes
+    if SUPERVISOR_NODES < 1:
+        errors.append(f"SUPERVISOR_NODES must be >= 1, found: {SUPERVISOR_NODES}")
+    
+    if len(set(SUPERVISOR_NODE_IDS)) != len(SUPERVISOR_NODE_IDS):
+        errors.append(f"SUPERVISOR_NODE_IDS must be unique, found: {', '.join(SUPERVISOR_NODE_IDS)}")
+    
     # Validate intervals
     if PULL_INTERVAL < 1:
         errors.append(f"PULL_INTERVAL must be >= 1s, found: {PULL_INTERVAL}s")
@@ -120,6 +166,9 @@ def validate_config():
     if HEARTBEAT_INTERVAL < PULL_INTERVAL:
         errors.append(f"HEARTBEAT_INTERVAL ({HEARTBEAT_INTERVAL}s) < PULL_INTERVAL ({PULL_INTERVAL}s). Heartbeat should be less frequent than pull.")
     
+    if HEARTBEAT_MODE not in ["ref", "commit"]:
+        errors.append(f"HEARTBEAT_MODE invalid: '{HEARTBEAT_MODE}'. Use one of: ref, commit")
+    
     # Validate Docker timeout
     if DOCKER_TIMEOUT < 5:
         errors.append(f"DOCKER_TIMEOUT must be >= 5s, found: {DOCKER_TIMEOUT}s")
@@ -145,6 +194,69 @@ def validate_config():
     if MAX_PARALLEL_TASKS > 10:
         errors.append(f"MAX_PARALLEL_TASKS seems too high: {MAX_PARALLEL_TASKS} (max recommended: 10)")
     
+    if PREFETCH_DEPTH < 0:
+        errors.append(f"PREFETCH_DEPTH must be >= 0, found: {PREFETCH_DEPTH}")
+    
+    if PREFETCH_DEPTH > MAX_PARALLEL_TASKS:
+        errors.append(f"PREFETCH_DEPTH ({PREFETCH_DEPTH}) > MAX_PARALLEL_TASKS ({MAX_PARALLEL_TASKS}). A worker should not hoard more tasks than it can run.")
+    
+    if BATCH_CLAIM_MAX < 1:
+        errors.append(f"BATCH_CLAIM_MAX must be >= 1, found: {BATCH_CLAIM_MAX}")
+    
+    if TASK_SELECTION_STRATEGY not in ["first", "random", "rendezvous"]:
+        errors.append(f"TASK_SELECTION_STRATEGY invalid: '{TASK_SELECTION_STRATEGY}'. Use one of: first, random, rendezvous")
+    
+    if TASK_SELECTION_WINDOW < 1:
+        errors.append(f"TASK_SELECTION_WINDOW must be >= 1, found: {TASK_SELECTION_WINDOW}")
+    
+    if QUEUE_SHARD_TARGET < 16:
+        errors.append(f"QUEUE_SHARD_TARGET must be >= 16, found: {QUEUE_SHARD_TARGET}")
+    
+    if not 1 <= QUEUE_SHARD_MIN_DIGITS <= QUEUE_SHARD_MAX_DIGITS <= 4:
+        errors.append(f"Queue shard digits must satisfy 1 <= QUEUE_SHARD_MIN_DIGITS <= QUEUE_SHARD_MAX_DIGITS <= 4, "
+                      f"found: {QUEUE_SHARD_MIN_DIGITS}..{QUEUE_SHARD_MAX_DIGITS}")
+    
+    if not 0 <= GIT_FLUSH_WINDOW <= 30:
+        errors.append(f"GIT_FLUSH_WINDOW must be 0-30s, found: {GIT_FLUSH_WINDOW}s")
+    
+    if DOCKER_BACKEND not in ["cli", "api"]:
+        errors.append(f"DOCKER_BACKEND invalid: '{DOCKER_BACKEND}'. Use one of: cli, api")
+    elif DOCKER_BACKEND == "api" and not os.path.exists(DOCKER_SOCKET):
+        errors.append(f"DOCKER_SOCKET not found: '{DOCKER_SOCKET}' (required by DOCKER_BACKEND=api)")
+    
+    if OUTPUT_HEAD_BYTES < 0 or OUTPUT_TAIL_BYTES < 0:
+        errors.append(f"OUTPUT_HEAD_BYTES and OUTPUT_TAIL_BYTES must be >= 0, found: {OUTPUT_HEAD_BYTES}, {OUTPUT_TAIL_BYTES}")
+    
+    if USE_CONTAINER_POOL and CONTAINER_POOL_SIZE < 1:
+        errors.append(f"CONTAINER_POOL_SIZE must be >= 1 when USE_CONTAINER_POOL is enabled, found: {CONTAINER_POOL_SIZE}")
+    
+    if RESULT_CACHE_SIZE < 0:
+        errors.append(f"RESULT_CACHE_SIZE must be >= 0, found: {RESULT_CACHE_SIZE}")
+    
+    if RESULT_MODE not in ["main", "branch"]:
+        errors.append(f"RESULT_MODE invalid: '{RESULT_MODE}'. Use one of: main, branch")
+    
+    if MAINTENANCE_INTERVAL < 0:
+        errors.append(f"MAINTENANCE_INTERVAL must be >= 0s, found: {MAINTENANCE_INTERVAL}s")
+    
+    if MAINTENANCE_SHALLOW_DEPTH < 1:
+        errors.append(f"MAINTENANCE_SHALLOW_DEPTH must be >= 1, found: {MAINTENANCE_SHALLOW_DEPTH}")
+    
+    if USE_SPARSE_CHECKOUT and not SPARSE_CHECKOUT_DIRS:
+        errors.append("SPARSE_CHECKOUT_DIRS cannot be empty when USE_SPARSE_CHECKOUT is enabled")
+    
+    if USE_PARTIAL_CLONE and not PARTIAL_CLONE_FILTER.startswith(("blob:none", "blob:limit=")):
+        errors.append(f"PARTIAL_CLONE_FILTER must be blob:none or blob:limit=<n>, found: '{PARTIAL_CLONE_FILTER}'")
+    
+    if SHARED_MIRROR_PATH and SHARED_MIRROR_REFRESH < 1:
+        errors.append(f"SHARED_MIRROR_REFRESH must be >= 1s, found: {SHARED_MIRROR_REFRESH}s")
+    
+    if PUSH_MAX_RETRIES < 0:
+        errors.append(f"PUSH_MAX_RETRIES must be >= 0, found: {PUSH_MAX_RETRIES}")
+    
+    if PUSH_BACKOFF_BASE < 0:
+        errors.append(f"PUSH_BACKOFF_BASE must be >= 0s, found: {PUSH_BACKOFF_BASE}s")
+    
     if MAX_TASKS_PER_HOUR < 0:
         errors.append(f"MAX_TASKS_PER_HOUR must be >= 0, found: {MAX_TASKS_PER_HOUR}")
     
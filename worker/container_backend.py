@@ -0,0 +1,614 @@
+"""
+D-GRID Container Backend Module
+How task containers are created, run and removed. Two interchangeable
+backends, selected with DOCKER_BACKEND:
+- cli: forks the docker CLI for every operation (default, needs only the
+  docker binary)
+- api: talks to the Engine API over DOCKER_SOCKET with one keep-alive
+  connection per thread, no process per call, and keeps the container id
+  in hand (kill, stats, remove)
+Both create containers with the same isolation settings and labels, and
+kill the container itself when a task times out: killing the docker CLI
+client alone would leave it running with its CPU and memory quota. Both
+stream task output into bounded OutputCaptures instead of buffering it.
+"""
+import http.client
+import json
+import os
+import re
+import selectors
+import socket
+import subprocess
+import threading
+import time
+import uuid
+from urllib.parse import quote
+from logger_config import get_logger
+from output_capture import CHUNK_SIZE, get_output_captures
+from config import DOCKER_CPUS, DOCKER_MEMORY, DOCKER_BACKEND, DOCKER_SOCKET
+
+logger = get_logger("container_backend")
+
+# ⚠️  SECURITY: Image always python:3.11-alpine
+TASK_IMAGE = "python:3.11-alpine"
+
+# Labels of task containers: the task they run and the node that runs it
+# (leftovers of a node are removed when it starts again)
+TASK_LABEL = "dgrid.task"
+NODE_LABEL = "dgrid.node"
+
+# Timeout of the docker operations that are not a task run, in seconds
+DOCKER_CMD_TIMEOUT = 60
+
+# Timeout of an image pull through the API, in seconds
+PULL_TIMEOUT = 600
+
+
+def isolation_args():
+    """
+    CLI flags every task container is created with, pooled or not:
+    no network, read-only filesystem, CPU/memory/pids limits, not root.
+    See ApiBackend.host_config() for the API equivalent.
+    """
+    return [
+        # Network isolation
+        "--network=none",
+        # Protected filesystem
+        "--read-only",
+        # Resource limits
+        f"--cpus={DOCKER_CPUS}",
+        f"--memory={DOCKER_MEMORY}",
+        # Process limit (protects against fork bombs)
+        "--pids-limit=10",
+        # Do not run as root
+        "--user=1000:1000"
+    ]
+
+
+def parse_memory(value):
+    """Bytes of a docker memory size such as 512m or 1g."""
+    units = {"b": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+    value = value.strip().lower()
+    if value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+class ContainerTimeout(Exception):
+    """Raised when a task container outlives its timeout."""
+
+    # Container that was killed, set by the backend that reclaimed it
+    container = None
+
+
+class DockerAPIError(Exception):
+    """Raised when the Engine API answers with an error status."""
+
+    def __init__(self, status, message):
+        super().__init__(f"Docker API error {status}: {message}")
+        self.status = status
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a unix socket (the Docker daemon's)."""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class Demuxer:
+    """
+    Splits a multiplexed log/attach stream (non-TTY containers) into stdout
+    and stderr as it arrives: 8-byte frame headers, stream type then size.
+    Only a partial frame header is ever buffered.
+    """
+
+    def __init__(self, stdout, stderr):
+        self.streams = {1: stdout, 2: stderr}
+        self.header = bytearray()
+        self.current = None
+        self.remaining = 0
+
+    def write(self, data):
+        data = memoryview(data)
+        while data:
+            if not self.remaining:
+                need = 8 - len(self.header)
+                self.header.extend(data[:need])
+                data = data[need:]
+                if len(self.header) < 8:
+                    return
+                self.current = self.streams.get(self.header[0], self.streams[1])
+                self.remaining = int.from_bytes(self.header[4:8], "big")
+                self.header.clear()
+                continue
+            part = data[:self.remaining]
+            self.current.write(bytes(part))
+            self.remaining -= len(part)
+            data = data[len(part):]
+
+
+class DockerAPI:
+    """Minimal Engine API client: one persistent connection per thread."""
+
+    def __init__(self, socket_path=DOCKER_SOCKET, timeout=DOCKER_CMD_TIMEOUT):
+        """
+        Initialize the client.
+
+        Args:
+            socket_path: Path of the daemon's unix socket
+            timeout: Timeout of a request, in seconds
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self.requests = 0
+        self.connections = 0
+
+    def _connect(self, timeout):
+        self.connections += 1
+        return UnixHTTPConnection(self.socket_path, timeout)
+
+    def request(self, method, path, body=None, timeout=None, sink=None):
+        """
+        Sends a request and reads the whole response, or streams it.
+
+        Args:
+            method: HTTP method
+            path: Path and query string
+            body: JSON-serializable body, or None
+            timeout: Seconds to wait for the response (e.g. a container
+                     wait); sent on a connection of its own so the shared
+                     one is not held. None = the client's timeout.
+            sink: Object whose write() receives a successful response body
+                  chunk by chunk, as it arrives; with timeout, the whole
+                  body must arrive within it
+
+        Returns:
+            Response body (bytes; empty if streamed to sink).
+
+        Raises:
+            ContainerTimeout: If the response did not arrive within timeout.
+            DockerAPIError: If the daemon answered with an error status.
+        """
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if data is not None else {}
+        self.requests += 1
+
+        own = timeout is not None
+        for attempt in range(2):
+            if own:
+                connection = self._connect(timeout)
+            else:
+                connection = getattr(self._local, "connection", None)
+                if connection is None:
+                    connection = self._local.connection = self._connect(self.timeout)
+            try:
+                connection.request(method, path, body=data, headers=headers)
+                sock = connection.sock
+                response = connection.getresponse()
+                if sink is not None and response.status < 400:
+                    self._stream(response, sock, sink, timeout)
+                    payload = b""
+                else:
+                    payload = response.read()
+                break
+            except socket.timeout:
+                self._drop(connection, own)
+                raise ContainerTimeout(f"{method} {path} timed out")
+            except (ConnectionError, http.client.RemoteDisconnected, http.client.CannotSendRequest):
+                # The daemon closed an idle keep-alive connection: reconnect once
+                self._drop(connection, own)
+                if attempt or own:
+                    raise
+            finally:
+                if own:
+                    connection.close()
+
+        if response.status >= 400:
+            try:
+                message = json.loads(payload).get("message", "")
+            except ValueError:
+                message = payload.decode(errors="replace")
+            raise DockerAPIError(response.status, message)
+        if response.will_close and not own:
+            self._drop(connection, own)
+        return payload
+
+    @staticmethod
+    def _stream(response, sock, sink, timeout):
+        # The socket timeout bounds each read; the deadline bounds the body
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise socket.timeout()
+                sock.settimeout(remaining)
+            chunk = response.read1(CHUNK_SIZE)
+            if not chunk:
+                response.read()  # Marks the response done, freeing the connection
+                return
+            sink.write(chunk)
+
+    def _drop(self, connection, own):
+        connection.close()
+        if not own:
+            self._local.connection = None
+
+    def json(self, method, path, body=None, timeout=None):
+        """request() with a JSON response (None if empty)."""
+        payload = self.request(method, path, body, timeout)
+        return json.loads(payload) if payload else None
+
+    def create(self, image, command, host_config, user=None, labels=None, name=None):
+        """Creates a container (pulling the image if missing) and returns its id."""
+        body = {"Image": image, "Cmd": command, "Labels": labels or {}, "HostConfig": host_config}
+        if user:
+            body["User"] = user
+        path = f"/containers/create?name={quote(name)}" if name else "/containers/create"
+        try:
+            return self.json("POST", path, body)["Id"]
+        except DockerAPIError as e:
+            if e.status != 404:
+                raise
+        self.pull(image)
+        return self.json("POST", path, body)["Id"]
+
+    def pull(self, image):
+        """Pulls an image (the progress stream is read and discarded)."""
+        name, _, tag = image.partition(":")
+        logger.info(f"Pulling image {image}...")
+        self.request("POST", f"/images/create?fromImage={quote(name)}&tag={quote(tag or 'latest')}",
+                     timeout=PULL_TIMEOUT)
+
+    def start(self, container):
+        self.request("POST", f"/containers/{container}/start")
+
+    def wait(self, container, timeout=None):
+        """Waits for the container to exit and returns its exit code (see request() for timeout)."""
+        return self.json("POST", f"/containers/{container}/wait", timeout=timeout)["StatusCode"]
+
+    def logs(self, container, stdout, stderr, timeout=None):
+        """
+        Streams the output of a container into stdout and stderr (file-like).
+        With timeout, follows a running container until it exits, on a
+        connection of its own: the output is captured while it is produced,
+        and whatever arrived before ContainerTimeout is kept.
+        """
+        follow = "&follow=1" if timeout is not None else ""
+        self.request("GET", f"/containers/{container}/logs?stdout=1&stderr=1{follow}", timeout=timeout,
+                     sink=Demuxer(stdout, stderr))
+
+    def kill(self, container, signal="KILL"):
+        self.request("POST", f"/containers/{container}/kill?signal={signal}")
+
+    def remove(self, container, force=True):
+        self.request("DELETE", f"/containers/{container}?force={int(force)}")
+
+    def stats(self, container):
+        """One stats sample of a running container."""
+        return self.json("GET", f"/containers/{container}/stats?stream=false")
+
+    def list(self, labels=None, all=True):
+        """Ids of the containers with the given labels ("key=value")."""
+        filters = quote(json.dumps({"label": list(labels or [])}))
+        containers = self.json("GET", f"/containers/json?all={int(all)}&filters={filters}")
+        return [container["Id"] for container in containers]
+
+    def exec(self, container, command, timeout, stdout, stderr):
+        """
+        Runs a command in a running container, streaming its output into
+        stdout and stderr (file-like).
+
+        Returns:
+            Exit code of the command.
+        """
+        exec_id = self.json("POST", f"/containers/{container}/exec",
+                            {"Cmd": command, "AttachStdout": True, "AttachStderr": True})["Id"]
+        # The daemon hijacks the connection and streams until the command ends
+        self.request("POST", f"/exec/{exec_id}/start", {"Detach": False, "Tty": False}, timeout=timeout,
+                     sink=Demuxer(stdout, stderr))
+        return self.json("GET", f"/exec/{exec_id}/json")["ExitCode"]
+
+    def prune(self):
+        """Removes stopped containers and dangling images; returns bytes reclaimed."""
+        containers = self.json("POST", "/containers/prune") or {}
+        images = self.json("POST", "/images/prune") or {}
+        return (containers.get("SpaceReclaimed") or 0) + (images.get("SpaceReclaimed") or 0)
+
+
+class ContainerBackend:
+    """
+    What both backends share: reclaiming containers that outlived their
+    task (killed and removed on timeout) or their worker (removed by label
+    at startup), and counting them.
+    """
+
+    name = None
+
+    def __init__(self):
+        self.reclaimed_timeouts = 0
+        self.reclaimed_leftovers = 0
+        self.reclaim_failures = 0
+
+    @staticmethod
+    def container_name(labels):
+        """Unique container name carrying the task id, if labeled with one."""
+        task = re.sub(r"[^a-zA-Z0-9_.-]", "-", (labels or {}).get(TASK_LABEL, "task"))[:64]
+        return f"dgrid-{task}-{uuid.uuid4().hex[:8]}"
+
+    def reclaim(self, container, remove=True):
+        """
+        Kills a container whose task timed out (and removes it, unless it
+        belongs to the pool, which recycles it). Never raises.
+        """
+        try:
+            if remove:
+                self.remove([container])
+            else:
+                self.kill(container)
+            self.reclaimed_timeouts += 1
+            logger.warning(f"♻️  Killed timed-out container {container[:32]}")
+        except Exception as e:
+            self.reclaim_failures += 1
+            logger.error(f"Could not kill timed-out container {container[:32]}: {e}")
+
+    def reap(self, label):
+        """
+        Removes every container with a label ("key=value"), e.g. the task
+        containers a crashed worker left running. Never raises.
+
+        Returns:
+            int: Containers removed.
+        """
+        try:
+            containers = self.list(label)
+            self.remove(containers)
+        except Exception as e:
+            self.reclaim_failures += 1
+            logger.warning(f"Could not reap containers labeled {label}: {e}")
+            return 0
+        if containers:
+            self.reclaimed_leftovers += len(containers)
+            logger.warning(f"♻️  Removed {len(containers)} leftover container(s) labeled {label}")
+        return len(containers)
+
+    @staticmethod
+    def _result(exit_code, output):
+        """Result of a task run from its exit code and (stdout, stderr) captures."""
+        stdout, stderr = output
+        return {"exit_code": exit_code, "stdout": stdout.text(), "stderr": stderr.text(),
+                "stdout_bytes": stdout.total, "stderr_bytes": stderr.total}
+
+    def get_stats(self):
+        """
+        Get container reclaim statistics.
+
+        Returns:
+            dict: Backend, containers killed on timeout, leftovers removed
+                  at startup, failures
+        """
+        return {
+            "backend": self.name,
+            "reclaimed": self.reclaimed_timeouts + self.reclaimed_leftovers,
+            "reclaimed_timeouts": self.reclaimed_timeouts,
+            "reclaimed_leftovers": self.reclaimed_leftovers,
+            "reclaim_failures": self.reclaim_failures
+        }
+
+
+class CliBackend(ContainerBackend):
+    """Container operations through the docker CLI, one process per operation."""
+
+    name = "cli"
+
+    def _docker(self, *args, timeout=DOCKER_CMD_TIMEOUT):
+        """Runs a docker command and returns stdout."""
+        result = subprocess.run(["docker", *args], capture_output=True, text=True, check=True, timeout=timeout)
+        return result.stdout.strip()
+
+    @staticmethod
+    def _label_args(labels):
+        return [arg for key, value in (labels or {}).items() for arg in ("--label", f"{key}={value}")]
+
+    def _run(self, docker_cmd, timeout, output):
+        """
+        Runs a docker run/exec, streaming its stdout and stderr into the
+        output captures; raises ContainerTimeout after timeout (only the
+        client is killed). Returns the exit code.
+        """
+        deadline = time.monotonic() + timeout
+        process = subprocess.Popen(docker_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(process.stdout, selectors.EVENT_READ, output[0])
+                selector.register(process.stderr, selectors.EVENT_READ, output[1])
+                while selector.get_map():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise ContainerTimeout(f"Timeout after {timeout}s")
+                    for key, _ in selector.select(remaining):
+                        chunk = os.read(key.fd, CHUNK_SIZE)
+                        if chunk:
+                            key.data.write(chunk)
+                        else:
+                            selector.unregister(key.fileobj)
+            return process.wait(max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            raise ContainerTimeout(f"Timeout after {timeout}s")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
+
+    def run(self, image, script, timeout, labels=None, output=None):
+        """
+        Runs a script in a new, isolated container that is removed afterwards.
+        On timeout the container itself is killed and removed, not only the
+        client.
+
+        Args:
+            image: Image of the container
+            script: Shell script to run
+            timeout: Seconds the script may run
+            labels: Container labels (TASK_LABEL also names the container)
+            output: (stdout, stderr) OutputCaptures (new bounded ones if
+                    None); they hold what was captured even on timeout
+
+        Returns:
+            Dict with exit_code, stdout, stderr (head and tail of the
+            output) and stdout_bytes, stderr_bytes (its full size).
+
+        Raises:
+            ContainerTimeout: If the script outlived timeout.
+        """
+        name = self.container_name(labels)
+        output = output or get_output_captures()
+        try:
+            return self._result(self._run(["docker", "run", "--rm", "--name", name, *isolation_args(),
+                                           *self._label_args(labels), image, "sh", "-c", script],
+                                          timeout, output), output)
+        except ContainerTimeout as e:
+            e.container = name
+            self.reclaim(name)
+            raise
+
+    def exec(self, container, script, timeout, output=None):
+        """
+        Runs a script in a running container (see run()). On timeout the
+        container is killed; removing it is up to its owner (the pool).
+        """
+        output = output or get_output_captures()
+        try:
+            return self._result(self._run(["docker", "exec", container, "sh", "-c", script], timeout, output),
+                                output)
+        except ContainerTimeout as e:
+            e.container = container
+            self.reclaim(container, remove=False)
+            raise
+
+    def start_idle(self, image, command, labels=None):
+        """Creates and starts an isolated container running command; returns its id."""
+        return self._docker("run", "-d", *self._label_args(labels), *isolation_args(), image, *command)
+
+    def remove(self, containers):
+        """Removes containers, running or not."""
+        if containers:
+            self._docker("rm", "-f", *containers)
+
+    def list(self, label):
+        """Ids of the containers (running or not) with a label ("key=value")."""
+        return self._docker("ps", "-aq", "--filter", f"label={label}").split()
+
+    def kill(self, container):
+        self._docker("kill", container)
+
+    def stats(self, container):
+        """One stats sample of a running container (docker stats format)."""
+        return json.loads(self._docker("stats", "--no-stream", "--format", "{{json .}}", container))
+
+    def prune(self):
+        """Removes stopped containers and dangling images."""
+        self._docker("container", "prune", "-f", timeout=30)
+        self._docker("image", "prune", "-f", timeout=30)
+
+
+class ApiBackend(ContainerBackend):
+    """Container operations through the Engine API (see DockerAPI)."""
+
+    name = "api"
+
+    def __init__(self, api=None):
+        super().__init__()
+        self.api = api or DockerAPI()
+
+    @staticmethod
+    def host_config():
+        """HostConfig with the isolation of isolation_args()."""
+        return {
+            "NetworkMode": "none",
+            "ReadonlyRootfs": True,
+            "NanoCpus": int(float(DOCKER_CPUS) * 1e9),
+            "Memory": parse_memory(DOCKER_MEMORY),
+            "PidsLimit": 10
+        }
+
+    def run(self, image, script, timeout, labels=None, output=None):
+        container = self.api.create(image, ["sh", "-c", script], self.host_config(), user="1000:1000",
+                                    labels=labels, name=self.container_name(labels))
+        timed_out = False
+        output = output or get_output_captures()
+        try:
+            self.api.start(container)
+            # The followed log ends when the container exits, so the wait
+            # after it returns at once (on the shared connection)
+            self.api.logs(container, *output, timeout=timeout)
+            return self._result(self.api.wait(container), output)
+        except ContainerTimeout as e:
+            e.container = container
+            timed_out = True
+            raise
+        finally:
+            if timed_out:
+                self.reclaim(container)
+            else:
+                self.api.remove(container, force=True)
+
+    def exec(self, container, script, timeout, output=None):
+        output = output or get_output_captures()
+        try:
+            return self._result(self.api.exec(container, ["sh", "-c", script], timeout, *output), output)
+        except ContainerTimeout as e:
+            e.container = container
+            self.reclaim(container, remove=False)
+            raise
+
+    def start_idle(self, image, command, labels=None):
+        container = self.api.create(image, command, self.host_config(), user="1000:1000", labels=labels)
+        self.api.start(container)
+        return container
+
+    def remove(self, containers):
+        for container in containers:
+            try:
+                self.api.remove(container, force=True)
+            except DockerAPIError as e:
+                if e.status != 404:
+                    raise
+
+    def list(self, label):
+        return self.api.list([label])
+
+    def kill(self, container):
+        self.api.kill(container)
+
+    def stats(self, container):
+        return self.api.stats(container)
+
+    def prune(self):
+        self.api.prune()
+
+
+def get_container_backend(name=DOCKER_BACKEND):
+    """
+    Factory function to get the container backend.
+
+    Args:
+        name: "cli" or "api"
+
+    Returns:
+        CliBackend or ApiBackend instance.
+    """
+    if name == "api":
+        return ApiBackend()
+    return CliBackend()
@@ -0,0 +1,207 @@
+"""
+D-GRID Container Pool Module
+'docker run --rm' pays container creation, network namespace setup, start
+and teardown on every task, often more than the task itself. The pool keeps
+CONTAINER_POOL_SIZE containers created and started ahead of time, with the
+same isolation flags as 'docker run' and an idle process, and a task runs in
+one of them with 'docker exec' (an exec through the Engine API with
+DOCKER_BACKEND=api). A container serves a single task: it is then removed
+and replaced in the background, so no state leaks between tasks.
+"""
+import threading
+import time
+from collections import deque
+from logger_config import get_logger
+from container_backend import TASK_IMAGE, get_container_backend
+from config import NODE_ID, USE_CONTAINER_POOL, CONTAINER_POOL_SIZE
+
+logger = get_logger("container_pool")
+
+# Label of pooled containers, valued with the owning node
+POOL_LABEL = "dgrid.pool"
+
+# Keeps a pooled container running until a task is exec'd in it (one pid)
+IDLE_COMMAND = ["tail", "-f", "/dev/null"]
+
+# Seconds before refilling again after docker failed to start a container
+REFILL_BACKOFF = 5
+
+
+class ContainerPool:
+    """Pre-started task containers, refilled and recycled by a background thread."""
+
+    def __init__(self, size=CONTAINER_POOL_SIZE, image=TASK_IMAGE, owner=NODE_ID, backend=None):
+        """
+        Initialize the pool.
+
+        Args:
+            size: Containers kept ready
+            image: Image of the containers
+            owner: Value of the pool label, so only this worker's leftovers
+                   are removed at start
+            backend: Container backend (DOCKER_BACKEND if None), also used
+                     to run tasks in the pooled containers
+        """
+        self.backend = backend or get_container_backend()
+        self.size = size
+        self.image = image
+        self.owner = owner
+        self._ready = deque()  # (container id, seconds it took to start)
+        self._in_use = {}  # Container id -> (node id, task id) it runs
+        self._retired = []  # Containers that served a task, to remove
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.hits = 0
+        self.misses = 0
+        self.started = 0
+        self.recycled = 0
+        self.failures = 0
+        self.start_latency_total = 0.0
+        self.saved_total = 0.0
+
+    def _start_container(self):
+        """Creates and starts an idle container; returns (id, start seconds)."""
+        start = time.perf_counter()
+        container = self.backend.start_idle(self.image, IDLE_COMMAND, {POOL_LABEL: self.owner})
+        elapsed = time.perf_counter() - start
+        self.started += 1
+        self.start_latency_total += elapsed
+        return container, elapsed
+
+    def _remove(self, containers):
+        """Removes containers, running or not."""
+        self.backend.remove(containers)
+
+    def acquire(self, node_id=None, task_id=None):
+        """
+        Takes a ready container for one task. Pooled containers are labeled
+        only with the pool (they are started before their task is known),
+        so the task they run is recorded here, see task_of().
+
+        Args:
+            node_id: Node running the task
+            task_id: Task the container will run
+
+        Returns:
+            Container id, or None if the pool is empty (run the task with
+            'docker run' instead).
+        """
+        with self._lock:
+            entry = self._ready.popleft() if self._ready else None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.saved_total += entry[1]
+                self._in_use[entry[0]] = (node_id, task_id)
+        self._wake.set()
+        return entry[0] if entry else None
+
+    def task_of(self, container):
+        """(node id, task id) running in an acquired container, or None."""
+        with self._lock:
+            return self._in_use.get(container)
+
+    def containers_of(self, task_id):
+        """Acquired containers running a task."""
+        with self._lock:
+            return [container for container, (_, task) in self._in_use.items() if task == task_id]
+
+    def release(self, container):
+        """Hands back a container that ran a task: it is removed, never reused."""
+        with self._lock:
+            self._in_use.pop(container, None)
+            self._retired.append(container)
+        self._wake.set()
+
+    def start(self):
+        """Remove this worker's leftover pool containers, then start the refill thread."""
+        if self._thread is not None or self.size <= 0:
+            return
+        self.backend.reap(f"{POOL_LABEL}={self.owner}")
+        self._thread = threading.Thread(target=self._run, name="container-pool", daemon=True)
+        self._thread.start()
+        logger.info(f"🐳 Container pool started ({self.size} warm container(s))")
+
+    def stop(self, timeout=None):
+        """Stop the refill thread and remove every pooled container, in use or not."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._lock:
+            containers = [container for container, _ in self._ready] + self._retired + sorted(self._in_use)
+            self._ready.clear()
+            self._retired = []
+            self._in_use.clear()
+        try:
+            self._remove(containers)
+        except Exception as e:
+            logger.warning(f"Could not remove pool containers: {e}")
+
+    def _run(self):
+        self._wake.set()
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+
+            with self._lock:
+                retired, self._retired = self._retired, []
+            try:
+                self._remove(retired)
+                self.recycled += len(retired)
+            except Exception as e:
+                logger.warning(f"Could not remove {len(retired)} used container(s): {e}")
+
+            while not self._stop.is_set() and len(self._ready) < self.size:
+                try:
+                    entry = self._start_container()
+                except Exception as e:
+                    self.failures += 1
+                    logger.warning(f"Could not start a pool container: {e}")
+                    self._stop.wait(REFILL_BACKOFF)
+                    self._wake.set()
+                    break
+                with self._lock:
+                    self._ready.append(entry)
+
+    def get_stats(self):
+        """
+        Get pool statistics.
+
+        Returns:
+            dict: Ready containers, hits/misses and hit rate, average start
+                  latency of a container and the startup latency hits saved
+        """
+        requests = self.hits + self.misses
+        return {
+            "size": self.size,
+            "ready": len(self._ready),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 3) if requests else 0.0,
+            "started": self.started,
+            "recycled": self.recycled,
+            "failures": self.failures,
+            "start_latency_avg_ms": round(self.start_latency_total / self.started * 1000, 1) if self.started else 0.0,
+            "startup_saved_ms": round(self.saved_total * 1000, 1)
+        }
+
+
+def get_container_pool(backend=None):
+    """
+    Factory function to get the container pool of the process.
+
+    Args:
+        backend: Container backend (DOCKER_BACKEND if None)
+
+    Returns:
+        ContainerPool instance, or None if USE_CONTAINER_POOL is disabled.
+    """
+    if not USE_CONTAINER_POOL or CONTAINER_POOL_SIZE <= 0:
+        return None
+    return ContainerPool(backend=backend)
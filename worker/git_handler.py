@@ -2,46 +2,63 @@
 D-GRID Git Handler Module
 Manages all Git operations (clone, pull, commit, push).
 """
+import bisect
+import json
 import os
+import random
 import subprocess
 import shutil
+import threading
 import time
+from datetime import datetime
+from io import BytesIO
 from pathlib import Path
-from git import Repo
+from git import Repo, PushInfo
 from git.exc import GitCommandError
+from gitdb import IStream
 from logger_config import get_logger
-from config import REPO_URL, REPO_PATH, GIT_USER_NAME, GIT_USER_EMAIL, get_git_auth_url
+from config import (REPO_URL, REPO_PATH, GIT_USER_NAME, GIT_USER_EMAIL, get_git_auth_url,
+                    PUSH_MAX_RETRIES, PUSH_BACKOFF_BASE)
 
 logger = get_logger("git_handler")
 
+# Out-of-band liveness refs, one per node, never part of the branch history
+HEARTBEAT_REF_PREFIX = "refs/dgrid/heartbeat"
 
-def retry_with_backoff(max_retries=5, initial_delay=1, backoff_factor=2):
+# Per-node result branches (RESULT_MODE=branch), merged into the main
+# branch by .github/scripts/aggregate_results.py
+RESULT_REF_PREFIX = "refs/dgrid/results"
+
+# GitPython reports push rejections through flags instead of raising
+PUSH_FAILURE_FLAGS = PushInfo.ERROR | PushInfo.REJECTED | PushInfo.REMOTE_REJECTED | PushInfo.REMOTE_FAILURE
+
+# Longest wait between two push retries, in seconds
+PUSH_BACKOFF_CAP = 16
+
+
+class PushRejectedError(Exception):
+    """Raised when the remote rejects a push (e.g. non-fast-forward)."""
+
+
+class LostRaceError(PushRejectedError):
+    """Raised when a path our commit depends on (e.g. a claimed task) was taken by another node."""
+    
+    def __init__(self, message, paths=()):
+        super().__init__(message)
+        self.paths = list(paths)
+
+
+def jittered_backoff(attempt, base=PUSH_BACKOFF_BASE, cap=PUSH_BACKOFF_CAP):
     """
-    Decorator for retrying operations with exponential backoff.
-    Implementation of #6: Smart polling with retry logic.
+    Delay before a retry: exponential backoff with full jitter, so nodes
+    rejected by the same push do not retry in lockstep.
     
     Args:
-        max_retries: Maximum number of retry attempts
-        initial_delay: Initial delay in seconds
-        backoff_factor: Multiplier for delay after each retry
+        attempt: Retry number (1 for the first retry)
+        base: Upper bound of the first delay in seconds
+        cap: Maximum delay in seconds
     """
-    def decorator(func):
-        def wrapper(*args, **kwargs):
-            delay = initial_delay
-            for attempt in range(max_retries):
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    if attempt == max_retries - 1:
-                        logger.error(f"{func.__name__} failed after {max_retries} attempts")
-                        raise
-                    logger.warning(f"{func.__name__} failed (attempt {attempt + 1}/{max_retries}): {e}")
-                    logger.info(f"Retrying in {delay}s with exponential backoff...")
-                    time.sleep(delay)
-                    delay *= backoff_factor
-            return None
-        return wrapper
-    return decorator
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
 
 class GitHandler:
     """Handler for all Git operations."""
@@ -52,6 +69,49 @@ class GitHandler:
         self.last_remote_hash = None  # Cache for smart polling
         self.credential_manager = None
         
+        # Serializes repo access between the main loop and executor slots (#7)
+        self.lock = threading.RLock()
+        
+        # Sources whose pending changes ride along with other commits
+        # (e.g. StateManager heartbeats), see add_piggyback()
+        self._piggybacks = []
+        
+        # Cone-mode sparse checkout directories, see _configure_sparse_checkout()
+        self.sparse_dirs = []
+        
+        # Host-local mirror this clone fetches from, see _use_shared_mirror()
+        self.mirror = None
+        
+        # Background repack/prune of the clone, see repo_maintenance.py
+        self.maintenance = None
+        
+        # Partial clone: blobs outside the cone are fetched only on demand
+        self.partial_clone = False
+        self.lazy_fetches = 0
+        self.lazy_fetch_bytes = 0
+        
+        # Single writer thread batching commits/pushes, see get_writer()
+        self._writer = None
+        self._result_writer = None
+        self._result_refs_fetched = set()
+        
+        # Remote polling metrics, see pull_rebase()
+        self.polls = 0
+        self.poll_fetches = 0
+        self.poll_bytes_total = 0
+        self.poll_latency_total = 0.0
+        self.last_poll = None
+        
+        # Push retry metrics, see push_with_rebase()
+        self.pushes = 0
+        self.push_retries = 0
+        self.conflicts_resolved = 0
+        self.lost_races = 0
+        self.push_failures = 0
+        self.conflict_latency_total = 0.0
+        self.conflict_latency_max = 0.0
+        self.conflict_latency_count = 0
+        
         # Initialize credential manager (#12: Secure Credential Management)
         try:
             from credential_manager import get_credential_manager
@@ -67,15 +127,31 @@ class GitHandler:
         except Exception as e:
             logger.warning(f"Could not initialize credential manager: {e}")
     
-    def clone_or_open_repo(self, use_shallow_clone=True):
+    def clone_or_open_repo(self, use_shallow_clone=True, sparse_dirs=None, clone_filter=None,
+                           use_shared_mirror=False):
         """
         Clones the repo if it doesn't exist, otherwise opens it.
         
         Args:
             use_shallow_clone: If True, uses shallow clone (depth=1) for faster cloning.
                              Reduces clone time by 80-90% and saves bandwidth.
+            sparse_dirs: Directories to materialize in cone-mode sparse checkout
+                         (None = full checkout).
+            clone_filter: Partial clone filter (e.g. "blob:none"): commits and
+                          trees are fetched, blobs only when checked out, so
+                          other nodes' results and logs are never downloaded.
+                          Only used with sparse_dirs, and only at clone time.
+            use_shared_mirror: If True, borrows objects from and fetches from
+                               the host's shared mirror (SHARED_MIRROR_PATH),
+                               pushing to the upstream repository directly.
         """
         try:
+            mirror = None
+            if use_shared_mirror:
+                from shared_mirror import get_shared_mirror
+                mirror = get_shared_mirror(self._auth_url())
+                mirror.ensure()
+            
             # Check if it's really a repo (exists .git)
             is_repo = self.repo_path.exists() and (self.repo_path / ".git").exists()
             
@@ -90,22 +166,39 @@ class GitHandler:
                     import shutil
                     shutil.rmtree(self.repo_path)
                 
-                logger.info(f"Cloning repository from {REPO_URL}...")
+                # Sparse clone: only top-level files are checked out until the
+                # cone is set below
+                clone_options = {"sparse": True} if sparse_dirs else {}
                 
-                # Use credential manager for secure authentication (#12)
-                if self.credential_manager:
-                    git_url = self.credential_manager.configure_git_credentials(REPO_URL)
-                else:
-                    git_url = get_git_auth_url()
-                
-                # Use shallow clone for performance (#5: Optimize Git Operations)
-                if use_shallow_clone:
-                    logger.info("Using shallow clone (depth=1) for faster cloning...")
-                    self.repo = Repo.clone_from(git_url, self.repo_path, depth=1)
-                    logger.info("Shallow clone completed - 80-90% faster than full clone.")
-                else:
-                    self.repo = Repo.clone_from(git_url, self.repo_path)
+                if mirror:
+                    # --shared: every object is borrowed from the mirror, so
+                    # depth and filter have nothing left to save
+                    logger.info(f"Cloning repository from the shared mirror {mirror.path}...")
+                    self.repo = Repo.clone_from(str(mirror.path), self.repo_path, shared=True, **clone_options)
                     logger.info(f"Repository cloned successfully in {self.repo_path}.")
+                else:
+                    logger.info(f"Cloning repository from {REPO_URL}...")
+                    
+                    if clone_filter and sparse_dirs:
+                        logger.info(f"Using partial clone (--filter={clone_filter})...")
+                        clone_options["filter"] = clone_filter
+                    elif clone_filter:
+                        # A full checkout would lazily fetch every blob anyway
+                        logger.warning("Partial clone needs a sparse checkout, cloning all blobs")
+                    
+                    # Use shallow clone for performance (#5: Optimize Git Operations)
+                    if use_shallow_clone:
+                        logger.info("Using shallow clone (depth=1) for faster cloning...")
+                        self.repo = Repo.clone_from(self._auth_url(), self.repo_path, depth=1, **clone_options)
+                        logger.info("Shallow clone completed - 80-90% faster than full clone.")
+                    else:
+                        self.repo = Repo.clone_from(self._auth_url(), self.repo_path, **clone_options)
+                        logger.info(f"Repository cloned successfully in {self.repo_path}.")
+            
+            if mirror:
+                self._use_shared_mirror(mirror)
+            self._configure_sparse_checkout(sparse_dirs)
+            self.partial_clone = bool(self.repo.git.config("--get", "extensions.partialClone", with_exceptions=False))
             
             # Configure git user
             self._configure_git_user()
@@ -114,6 +207,64 @@ class GitHandler:
             logger.error(f"Error cloning/opening repository: {e}")
             return False
     
+    def _auth_url(self):
+        """Upstream repository URL with credentials (#12: Secure Credential Management)."""
+        if self.credential_manager:
+            return self.credential_manager.configure_git_credentials(REPO_URL)
+        return get_git_auth_url()
+    
+    def _use_shared_mirror(self, mirror):
+        """
+        Points the clone at the host's shared mirror: its objects are
+        borrowed (alternates), 'origin' fetches from the mirror and pushes to
+        the upstream repository, and an 'upstream' remote is kept for the
+        direct fetch after a rejected push (see _rebase_on_remote()).
+        Works on existing clones too: objects they already have stay.
+        """
+        alternates = Path(self.repo.git_dir) / "objects" / "info" / "alternates"
+        borrowed = alternates.read_text().split() if alternates.exists() else []
+        if str(mirror.objects_path()) not in borrowed:
+            alternates.parent.mkdir(parents=True, exist_ok=True)
+            alternates.write_text("".join(f"{path}\n" for path in borrowed + [str(mirror.objects_path())]))
+        
+        git_url = self._auth_url()
+        self.repo.git.remote("set-url", "origin", str(mirror.path))
+        self.repo.git.remote("set-url", "--push", "origin", git_url)
+        if "upstream" in [remote.name for remote in self.repo.remotes]:
+            self.repo.git.remote("set-url", "upstream", git_url)
+        else:
+            self.repo.git.remote("add", "upstream", git_url)
+        
+        self.mirror = mirror
+        logger.info(f"🪞 Fetching from the shared mirror {mirror.path}")
+    
+    def _configure_sparse_checkout(self, sparse_dirs):
+        """
+        Applies (or removes) the cone-mode sparse checkout, so only the
+        directories a worker reads are in the working tree. The index still
+        tracks every path: commits and moves to directories outside the cone
+        work as usual (see stage_paths(), write_files(), move_file()).
+        """
+        self.sparse_dirs = list(sparse_dirs or [])
+        if self.sparse_dirs:
+            self.repo.git.sparse_checkout("set", "--cone", *self.sparse_dirs)
+            logger.info(f"Sparse checkout: {', '.join(self.sparse_dirs)}")
+        elif self.repo.config_reader().get_value("core", "sparseCheckout", False):
+            self.repo.git.sparse_checkout("disable")
+            logger.info("Sparse checkout disabled, full working tree restored.")
+    
+    def _in_sparse_cone(self, path):
+        """True if a repository path is materialized by the sparse checkout."""
+        if not self.sparse_dirs:
+            return True
+        parent = path.rsplit("/", 1)[0] if "/" in path else ""
+        # Cone mode also includes the files directly inside every ancestor
+        # of a cone directory (and the top-level files)
+        return any(
+            path.startswith(directory + "/") or parent == "" or directory.startswith(parent + "/") or directory == parent
+            for directory in self.sparse_dirs
+        )
+    
     def _configure_git_user(self):
         """Configures git user for commits."""
         try:
@@ -123,52 +274,111 @@ class GitHandler:
         except Exception as e:
             logger.error(f"Error configuring git user: {e}")
     
-    def check_remote_updates(self):
+    def _upstream(self):
+        """
+        Remote, branch and remote-tracking ref the current branch follows
+        (e.g. "origin", "main", "origin/main"), read from git config rather
+        than assuming main.
+        """
+        tracking = self.repo.active_branch.tracking_branch()
+        if tracking is None:
+            raise ValueError(f"Branch {self.repo.active_branch.name} has no upstream")
+        return tracking.remote_name, tracking.remote_head, tracking.name
+    
+    def _ls_remote_tip(self):
         """
-        Smart polling: Check if remote has updates without pulling.
-        Implementation of #6: Local Task Cache to Reduce Git Pulls.
+        Reads the upstream branch tip from the ref advertisement only
+        (ls-remote): no objects are negotiated or transferred.
         
         Returns:
-            True if remote has updates, False if already up-to-date.
+            Tuple (hexsha, bytes received).
         """
-        try:
-            # Fetch remote refs without pulling
-            self.repo.remotes.origin.fetch()
-            
-            # Get current local and remote HEAD hashes
-            local_hash = self.repo.head.commit.hexsha
-            remote_hash = self.repo.remotes.origin.refs.main.commit.hexsha
-            
-            if local_hash == remote_hash:
-                logger.debug(f"Repository up-to-date (HEAD: {local_hash[:8]})")
-                self.last_remote_hash = remote_hash
-                return False
-            else:
-                logger.info(f"Remote updates detected: {local_hash[:8]} -> {remote_hash[:8]}")
-                self.last_remote_hash = remote_hash
-                return True
-        except Exception as e:
-            logger.warning(f"Error checking remote updates: {e}, will pull anyway")
-            return True  # Fallback to pulling if check fails
+        remote, branch, _ = self._upstream()
+        result = subprocess.run(
+            ["git", "ls-remote", remote, f"refs/heads/{branch}"],
+            cwd=self.repo_path,
+            check=True,
+            capture_output=True
+        )
+        output = result.stdout.decode().split()
+        if not output:
+            raise ValueError(f"Branch {branch} not found on {remote}")
+        return output[0], len(result.stdout)
     
-    def pull_rebase(self, smart_poll=True):
+    def _fetch_upstream(self, direct=False):
         """
-        Performs a pull with rebase to stay up-to-date.
+        Fetches the upstream branch (one network round-trip).
         
         Args:
-            smart_poll: If True, checks remote HEAD before pulling to avoid unnecessary pulls.
+            direct: With a shared mirror, fetch from the upstream repository
+                    instead of the mirror (which may lag one refresh behind).
+        
+        Returns:
+            int: Compressed size of the objects received, a close estimate of
+                 the bytes transferred (0 if it cannot be measured).
+        """
+        remote, branch, tracking = self._upstream()
+        before = self.repo.commit(tracking).hexsha
+        if direct and self.mirror:
+            self.repo.git.fetch("-q", "upstream", f"+refs/heads/{branch}:refs/remotes/{tracking}")
+        else:
+            self.repo.git.fetch("-q", remote, branch)
+        after = self.repo.commit(tracking).hexsha
+        if before == after or (self.mirror and not direct):
+            # Objects of the shared mirror are already on this host
+            return 0
+        # --disk-usage needs git >= 2.38; filtered blobs of a partial clone
+        # are skipped rather than fetched one by one just to be measured
+        usage = self.repo.git.rev_list("--objects", "--disk-usage", "--missing=allow-promisor",
+                                       f"{before}..{after}", with_exceptions=False)
+        return int(usage) if usage.isdigit() else 0
+    
+    def pull_rebase(self, smart_poll=True, direct=False):
+        """
+        Brings the branch up to date: a single fetch of the upstream branch,
+        then a local rebase of our unpushed commits (no second round-trip as
+        with 'git pull --rebase' after a fetch).
+        
+        Args:
+            smart_poll: If True, checks the remote tip with ls-remote first and
+                       skips the fetch when nothing changed.
                        Implementation of #6: Local Task Cache (cuts pulls by 90%+).
+            direct: With a shared mirror, fetch from the upstream repository
+                    (e.g. after a lost race, which the mirror may not show yet).
         """
         try:
-            # Smart polling: check if remote has updates first
-            if smart_poll and not self.check_remote_updates():
-                logger.debug("Skipping pull - repository already up-to-date")
+            with self.lock:
+                start = time.perf_counter()
+                received = 0
+                remote_hash = None
+                
+                # Smart polling: check if remote has updates first
+                if smart_poll:
+                    try:
+                        remote_hash, received = self._ls_remote_tip()
+                        self.last_remote_hash = remote_hash
+                    except Exception as e:
+                        logger.warning(f"Error checking remote updates: {e}, will pull anyway")
+                    
+                    # A shared mirror can lag behind commits this clone
+                    # already has (own pushes, direct fetches)
+                    head = self.repo.head.commit.hexsha
+                    if remote_hash == head or (self.mirror and remote_hash and self._is_ancestor(remote_hash, head)):
+                        logger.debug("Skipping pull - repository already up-to-date")
+                        self._record_poll(start, received, fetched=False)
+                        return True
+                
+                _, _, tracking = self._upstream()
+                fetched = remote_hash is None or self.repo.commit(tracking).hexsha != remote_hash
+                if fetched:
+                    received += self._fetch_upstream(direct)
+                
+                logger.info(f"Rebasing on {tracking}...")
+                received += self._rebase_onto(tracking)
+                
+                self._record_poll(start, received, fetched)
+                logger.info("Pull with rebase completed.")
                 return True
-            
-            logger.info("Executing pull with rebase...")
-            self.repo.remotes.origin.pull(rebase=True)
-            logger.info("Pull with rebase completed.")
-            return True
         except GitCommandError as e:
             logger.error(f"Error in pull: {e}")
             return False
@@ -176,43 +386,704 @@ class GitHandler:
             logger.error(f"Error during pull: {e}")
             return False
     
-    @retry_with_backoff(max_retries=5, initial_delay=2)
-    def commit_and_push(self, message, paths=None):
+    def _record_poll(self, start, received, fetched):
+        """Accounts one poll: latency, bytes received and whether it fetched."""
+        elapsed = time.perf_counter() - start
+        self.last_poll = {"latency_ms": round(elapsed * 1000, 1), "bytes": received, "fetched": fetched}
+        self.polls += 1
+        self.poll_fetches += fetched
+        self.poll_bytes_total += received
+        self.poll_latency_total += elapsed
+    
+    def get_poll_stats(self):
         """
-        Performs an atomic commit and push of changes.
-        Includes retry logic with exponential backoff (#6).
+        Remote polling statistics for the metrics endpoint.
+        
+        Returns:
+            dict: Polls, how many needed a fetch, bytes and latency per poll
+        """
+        return {
+            "polls": self.polls,
+            "fetches": self.poll_fetches,
+            "skipped": self.polls - self.poll_fetches,
+            "bytes_total": self.poll_bytes_total,
+            "avg_bytes_per_poll": round(self.poll_bytes_total / self.polls) if self.polls else 0,
+            "avg_latency_ms": round(self.poll_latency_total / self.polls * 1000, 1) if self.polls else 0.0,
+            "partial_clone": self.partial_clone,
+            "lazy_fetches": self.lazy_fetches,
+            "lazy_fetch_bytes": self.lazy_fetch_bytes,
+            "last_poll": self.last_poll
+        }
+    
+    def commit_staged(self, message):
+        """
+        Commits what is staged in the index, if it differs from HEAD.
+        Pending piggyback changes (e.g. the heartbeat) ride along.
         
         Args:
             message: Commit message.
-            paths: List of paths to commit (default: all changes).
         
         Returns:
-            True if success, False otherwise.
+            True if a commit was created, False if there was nothing to commit.
         """
-        try:
-            if paths:
-                self.repo.index.add(paths)
-            else:
-                self.repo.index.add(["."])
+        with self.lock:
+            if subprocess.run(["git", "diff", "--cached", "--quiet"], cwd=self.repo_path).returncode == 0:
+                return False
             
-            # Check if there are changes
-            if self.repo.index.diff("HEAD"):
-                self.repo.index.commit(message)
-                logger.info(f"Commit created: '{message}'")
+            # A commit is being made anyway: let pending changes
+            # (e.g. the heartbeat) ride along
+            extra_paths = [path for source in self._piggybacks for path in source.piggyback_paths()]
+            if extra_paths:
+                self.stage_paths(extra_paths)
+            self.repo.git.commit("-q", "--no-verify", "-m", message)
+            logger.info(f"Commit created: '{message.splitlines()[0]}'")
+            return True
+    
+    def stage_paths(self, paths):
+        """
+        Stages additions, changes and deletions under the given paths.
+        Uses the git CLI rather than GitPython's index, which cannot read
+        the version 3 index a sparse checkout writes.
+        
+        Args:
+            paths: Repository-relative paths (may lie outside the sparse cone).
+        """
+        with self.lock:
+            self.repo.git.add("--sparse", "-A", "--", *[str(path) for path in paths])
+    
+    def write_files(self, files):
+        """
+        Writes and stages files. Paths outside the sparse checkout are
+        stored straight into the index (blob + skip-worktree entry) and
+        never materialized in the working tree.
+        
+        Args:
+            files: Dict of repository path -> content (str or bytes).
+        """
+        with self.lock:
+            staged = []
+            hidden = {}
+            for path, content in files.items():
+                data = content.encode() if isinstance(content, str) else content
+                if self._in_sparse_cone(path):
+                    full_path = self.repo_path / path
+                    full_path.parent.mkdir(parents=True, exist_ok=True)
+                    full_path.write_bytes(data)
+                    staged.append(path)
+                else:
+                    hidden[path] = self._git_stdin(["hash-object", "-w", "--stdin"], data)
+            
+            if staged:
+                self.stage_paths(staged)
+            if hidden:
+                self._git_stdin(["update-index", "-z", "--index-info"],
+                                "".join(f"100644 {blob}\t{path}\0" for path, blob in hidden.items()))
+                self.repo.git.update_index("--skip-worktree", "--", *hidden)
+    
+    def remove_paths(self, paths):
+        """Deletes tracked files (inside or outside the sparse cone) and stages the removal."""
+        with self.lock:
+            self.repo.git.rm("-q", "--sparse", "--", *paths)
+    
+    def commit_changes(self, message, mutations):
+        """
+        Fast commit path: builds the new tree from HEAD's tree plus the
+        changed entries and writes the commit with 'git commit-tree', then
+        updates only those entries in the index and the working tree.
+        Only the trees on the path of a change are read and rewritten,
+        through the object database (no process per object), so the cost
+        does not grow with the rest of the repository, and there is no index
+        refresh, cache-tree rebuild or working-tree scan as with 'git mv' +
+        'git commit'.
+        Pending piggyback changes (e.g. the heartbeat) ride along.
+        
+        Args:
+            message: Commit message.
+            mutations: Changes applied in order, each with writes (dict of
+                       path -> content), moves (list of (src, dst)) and
+                       removes (list of paths), see git_writer.Mutation.
+        
+        Returns:
+            True if a commit was created, False if there was nothing to commit.
+        
+        Raises:
+            LostRaceError: If a moved or removed path is not in HEAD.
+        """
+        with self.lock:
+            parent = self.get_head_commit()
+            current = self._tree_entries(parent, [src for mutation in mutations for src, _ in mutation.moves]
+                                         + [path for mutation in mutations for path in mutation.removes])
+            
+            # path -> (mode, blob) or None for a deletion
+            changes = {}
+            writes = {}
+            moved_from = {}
+            
+            def take(path):
+                entry = changes[path] if path in changes else current.get(path)
+                if entry is None:
+                    raise LostRaceError(f"{path} no longer exists", [path])
+                changes[path] = None
+                writes.pop(path, None)
+                return entry
+            
+            for mutation in mutations:
+                for src, dst in mutation.moves:
+                    changes[dst] = take(src)
+                    if src in writes:
+                        writes[dst] = writes[src]
+                    moved_from[dst] = moved_from.pop(src, src)
+                for path, content in mutation.writes.items():
+                    changes[path] = ("100644", self._write_object(b"blob", content))
+                    writes[path] = content
+                    moved_from.pop(path, None)
+                for path in mutation.removes:
+                    take(path)
+            
+            # A commit is being made anyway: let pending changes
+            # (e.g. the heartbeat) ride along
+            for path in [path for source in self._piggybacks for path in source.piggyback_paths()]:
+                content = (self.repo_path / path).read_bytes()
+                changes[path] = ("100644", self._write_object(b"blob", content))
+                writes[path] = content
+            
+            parent_tree = self.repo.commit(parent).tree.hexsha
+            tree = self._build_tree(parent_tree, changes) or self._write_object(b"tree", b"")
+            if tree == parent_tree:
+                return False
+            
+            commit = self._git_stdin(["commit-tree", tree, "-p", parent, "-F", "-"], message)
+            self.repo.git.update_ref("-m", f"commit: {message.splitlines()[0]}", "HEAD", commit, parent)
+            self._checkout_changes(changes, writes, moved_from)
+            logger.info(f"Commit created: '{message.splitlines()[0]}'")
+            return True
+    
+    def _tree_entries(self, commit, paths):
+        """(mode, blob) of the given paths at a commit (missing paths are left out)."""
+        if not paths:
+            return {}
+        output = self.repo.git.ls_tree("-z", commit, "--", *paths)
+        entries = {}
+        for line in output.split("\0"):
+            if line:
+                info, path = line.split("\t", 1)
+                mode, _, sha = info.split(" ")
+                entries[path] = (mode, sha)
+        return entries
+    
+    def _build_tree(self, tree, changes):
+        """
+        Writes a tree: an existing one (or None) with changed entries.
+        Works on the raw tree object, which is kept sorted in git's order, so a change is a bisect + insert even
+        in a directory of 100k results; 'git mktree' would re-sort and
+        re-check every entry.
+        
+        Args:
+            tree: Tree hexsha, or None for a new directory.
+            changes: Dict of path relative to this tree -> (mode, blob) or None.
+        
+        Returns:
+            Hexsha of the new tree, or None if it ended up empty.
+        """
+        # Sort keys (directory names end with "/" in git's order) and raw entries
+        keys, entries = [], []
+        if tree:
+            data = self._read_object(tree)
+            pos = 0
+            while pos < len(data):
+                end = data.index(b"\0", pos) + 21
+                mode, name = data[pos:end - 21].split(b" ", 1)
+                keys.append(name + b"/" if mode == b"40000" else name)
+                entries.append(data[pos:end])
+                pos = end
+        
+        def find(key):
+            i = bisect.bisect_left(keys, key)
+            return i if i < len(keys) and keys[i] == key else None
+        
+        def remove(name):
+            for key in (name, name + b"/"):
+                i = find(key)
+                if i is not None:
+                    del keys[i], entries[i]
+        
+        def insert(name, mode, sha, is_tree=False):
+            remove(name)
+            key = name + b"/" if is_tree else name
+            i = bisect.bisect_left(keys, key)
+            keys.insert(i, key)
+            entries.insert(i, mode + b" " + name + b"\0" + bytes.fromhex(sha))
+        
+        subtrees = {}
+        for path, entry in changes.items():
+            name, _, rest = path.partition("/")
+            if rest:
+                subtrees.setdefault(name, {})[rest] = entry
+            elif entry is None:
+                remove(name.encode())
             else:
-                logger.debug("No changes to commit.")
-                return True
+                insert(name.encode(), entry[0].encode(), entry[1])
+        
+        for name, subchanges in subtrees.items():
+            i = find(name.encode() + b"/")
+            subtree = self._build_tree(entries[i][-20:].hex() if i is not None else None, subchanges)
+            if subtree:
+                insert(name.encode(), b"40000", subtree, is_tree=True)
+            else:
+                remove(name.encode())
+        
+        if not entries:
+            return None
+        return self._write_object(b"tree", b"".join(entries))
+    
+    def _read_object(self, sha):
+        """Content of an object, read through the repository's persistent 'git cat-file --batch'."""
+        return self.repo.odb.stream(bytes.fromhex(sha)).read()
+    
+    def _write_object(self, kind, data):
+        """Stores a loose object (b"blob" or b"tree") and returns its hexsha."""
+        if isinstance(data, str):
+            data = data.encode()
+        return self.repo.odb.store(IStream(kind, len(data), BytesIO(data))).hexsha.decode()
+    
+    def _checkout_changes(self, changes, writes, moved_from):
+        """
+        Brings the index and the working tree in line with a commit made by
+        commit_changes(), touching only the changed paths, with a single
+        index write. Paths outside the sparse cone get skip-worktree entries
+        and stay out of the working tree.
+        
+        Args:
+            changes: Dict of path -> (mode, blob), or None for a deletion.
+            writes: Dict of path -> content written by the commit.
+            moved_from: Dict of moved path -> its path in HEAD.
+        """
+        visible = []
+        # Additions first, so moved files are renamed before their source is cleared
+        for path, entry in sorted(changes.items(), key=lambda item: item[1] is None):
+            if not self._in_sparse_cone(path):
+                continue
+            visible.append(path)
+            full_path = self.repo_path / path
+            if entry is None:
+                if full_path.exists():
+                    full_path.unlink()
+                continue
             
-            # Push
-            self.repo.remotes.origin.push()
+            full_path.parent.mkdir(parents=True, exist_ok=True)
+            src = self.repo_path / moved_from[path] if path in moved_from else None
+            if path in writes:
+                content = writes[path]
+                full_path.write_bytes(content.encode() if isinstance(content, str) else content)
+            elif src is not None and src.exists():
+                os.replace(src, full_path)
+            elif path in moved_from or not full_path.exists():
+                full_path.write_bytes(self._read_object(entry[1]))
+        
+        # Working tree files are staged with their stat data; entries
+        # outside the cone come straight from the commit's blobs
+        hidden = {path: entry for path, entry in changes.items() if not self._in_sparse_cone(path)}
+        args = ["--add", "--remove", *visible]
+        removed = [path for path, entry in hidden.items() if entry is None]
+        if removed:
+            args += ["--force-remove", *removed]
+        added = [path for path, entry in hidden.items() if entry is not None]
+        for path in added:
+            args += ["--cacheinfo", f"{hidden[path][0]},{hidden[path][1]},{path}"]
+        if added:
+            args += ["--skip-worktree", *added]
+        self.repo.git.update_index(*args)
+    
+    def push_pending(self, required_paths=None, max_retries=PUSH_MAX_RETRIES):
+        """
+        Pushes local commits (see push_with_rebase()) and notifies the
+        piggyback sources.
+        
+        Raises:
+            PushRejectedError: If the remote rejected the push.
+            LostRaceError: If another node took a required path.
+        """
+        with self.lock:
+            self.push_with_rebase(required_paths, max_retries)
             logger.info("Push completed.")
-            return True
+            for source in self._piggybacks:
+                source.piggyback_pushed()
+    
+    def push_with_rebase(self, required_paths=None, max_retries=PUSH_MAX_RETRIES):
+        """
+        Conflict-resolving push loop. On a rejection it waits a jittered
+        backoff, fetches the branch once, checks that the paths our commits
+        consume still exist on the remote, rebases only the local commits on
+        top of it and pushes again.
+        
+        Args:
+            required_paths: Paths our local commits consume (e.g. the queue
+                            files of claimed tasks). If one of them is gone
+                            from the remote, another node won the race and
+                            retrying cannot help: abort right away.
+            max_retries: Rebase + re-push rounds after the first rejection.
+        
+        Raises:
+            PushRejectedError: If still rejected after max_retries.
+            LostRaceError: If a required path was taken, or the rebase
+                           conflicted with the remote changes.
+        """
+        with self.lock:
+            rejected_at = None
+            for attempt in range(max_retries + 1):
+                try:
+                    if attempt:
+                        self.push_retries += 1
+                        time.sleep(jittered_backoff(attempt))
+                        self._rebase_on_remote(required_paths)
+                    self._push()
+                except LostRaceError:
+                    self._record_conflict(rejected_at, "lost")
+                    raise
+                except PushRejectedError as e:
+                    if rejected_at is None:
+                        rejected_at = time.monotonic()
+                    if attempt == max_retries:
+                        self._record_conflict(rejected_at, "failed")
+                        raise
+                    logger.warning(f"Push rejected (attempt {attempt + 1}/{max_retries + 1}): {e}")
+                    continue
+                
+                self.pushes += 1
+                if rejected_at is not None:
+                    self._record_conflict(rejected_at, "resolved")
+                return
+    
+    def _rebase_on_remote(self, required_paths=None):
+        """
+        Fetches the upstream branch and rebases the local commits on it.
+        
+        Raises:
+            LostRaceError: If a required path is gone from the remote or the
+                           rebase conflicts (the local commits are left as
+                           they were).
+        """
+        _, _, tracking = self._upstream()
+        # The push was rejected by the upstream repository: the mirror may
+        # not have its new commits yet
+        self._fetch_upstream(direct=True)
+        
+        if required_paths:
+            present = self.repo.git.ls_tree("-r", "-z", "--name-only", tracking, "--", *required_paths)
+            missing = sorted(set(required_paths) - set(path for path in present.split("\0") if path))
+            if missing:
+                raise LostRaceError(f"{missing[0]} was taken by another node", missing)
+        
+        try:
+            self._rebase_onto(tracking)
         except GitCommandError as e:
-            logger.error(f"Error in commit/push: {e}")
-            raise  # Re-raise for retry decorator
-        except Exception as e:
-            logger.error(f"Error during commit/push: {e}")
-            raise  # Re-raise for retry decorator
+            raise LostRaceError(f"Rebase on {tracking} conflicted: {e.stderr.strip()}")
+    
+    def _is_ancestor(self, commit, descendant):
+        """True if commit is known locally and reachable from descendant."""
+        result = subprocess.run(
+            ["git", "merge-base", "--is-ancestor", commit, descendant],
+            cwd=self.repo_path,
+            capture_output=True
+        )
+        return result.returncode == 0
+    
+    def _rebase_onto(self, tracking):
+        """
+        Rebases the local commits on a fetched ref (aborted on failure).
+        In a partial clone, checking out the new files of the sparse cone
+        fetches their blobs on demand: git batches them into one extra fetch
+        per rebase. Anything outside the cone stays unfetched.
+        If the ref's history was rewritten (compact_history.py), only the
+        commits made after its previous tip are replayed, not the whole
+        old history.
+        
+        Returns:
+            int: Bytes of blobs fetched on demand (0 if none).
+        
+        Raises:
+            GitCommandError: If the rebase failed (conflict, or the remote
+                             was unreachable for a blob fetch).
+        """
+        packed = self._promisor_pack_bytes()
+        upstream = [tracking]
+        if not self.repo.git.merge_base(tracking, "HEAD", with_exceptions=False):
+            # No common history left: find the old tip in the ref's reflog
+            fork_point = self.repo.git.merge_base("--fork-point", tracking, "HEAD", with_exceptions=False)
+            if fork_point:
+                logger.warning(f"History of {tracking} was rewritten, replaying the local commits only")
+                upstream = ["--onto", tracking, fork_point]
+        try:
+            self.repo.git.rebase("-q", *upstream)
+        except GitCommandError:
+            self.repo.git.rebase("--abort", with_exceptions=False)
+            raise
+        
+        fetched = max(0, self._promisor_pack_bytes() - packed)
+        if fetched:
+            self.lazy_fetches += 1
+            self.lazy_fetch_bytes += fetched
+            logger.debug(f"Fetched {fetched} bytes of blobs on demand")
+        return fetched
+    
+    def _promisor_pack_bytes(self):
+        """Size of the packs received from the promisor remote (0 if not a partial clone)."""
+        if not self.partial_clone:
+            return 0
+        pack_dir = Path(self.repo.git_dir) / "objects" / "pack"
+        return sum(pack.with_suffix(".pack").stat().st_size for pack in pack_dir.glob("*.promisor"))
+    
+    def _record_conflict(self, rejected_at, outcome):
+        """Counts how a rejected push ended (resolved, lost, failed) and how long it took."""
+        if outcome == "resolved":
+            self.conflicts_resolved += 1
+        elif outcome == "lost":
+            self.lost_races += 1
+        else:
+            self.push_failures += 1
+        
+        latency = time.monotonic() - rejected_at
+        self.conflict_latency_total += latency
+        self.conflict_latency_max = max(self.conflict_latency_max, latency)
+        self.conflict_latency_count += 1
+    
+    def get_push_stats(self):
+        """
+        Push retry statistics for the metrics endpoint.
+        
+        Returns:
+            dict: Pushes, retries, how rejections ended and conflict latency
+        """
+        count = self.conflict_latency_count
+        return {
+            "pushes": self.pushes,
+            "retries": self.push_retries,
+            "conflicts_resolved": self.conflicts_resolved,
+            "lost_races": self.lost_races,
+            "failures": self.push_failures,
+            "conflict_latency_avg_ms": round(self.conflict_latency_total / count * 1000, 1) if count else 0.0,
+            "conflict_latency_max_ms": round(self.conflict_latency_max * 1000, 1)
+        }
+    
+    def get_writer(self):
+        """
+        Returns the GitWriter that coalesces this repo's commits and pushes
+        (created on first use; until started, submitted changes are
+        committed inline).
+        """
+        if self._writer is None:
+            from git_writer import GitWriter
+            self._writer = GitWriter(self)
+        return self._writer
+    
+    def get_result_writer(self):
+        """
+        Returns the ResultBranchWriter that pushes task results to the
+        per-node result branches (RESULT_MODE=branch), created on first use.
+        """
+        if self._result_writer is None:
+            from result_branch import ResultBranchWriter
+            self._result_writer = ResultBranchWriter(self)
+        return self._result_writer
+    
+    def add_piggyback(self, source):
+        """
+        Registers a source of changes to include in every commit made by
+        commit_staged(), instead of pushing them on their own.
+        
+        Args:
+            source: Object with piggyback_paths() -> list of paths to stage
+                    (called under the repo lock before committing) and
+                    piggyback_pushed() (called after a successful push).
+        """
+        self._piggybacks.append(source)
+    
+    def _push(self):
+        """
+        Pushes the current branch and checks the outcome.
+        GitPython does not raise when the remote rejects a push, so the
+        returned PushInfo flags are inspected explicitly.
+        
+        Raises:
+            PushRejectedError: If the remote rejected the update.
+        """
+        for info in self.repo.remotes.origin.push():
+            if info.flags & PUSH_FAILURE_FLAGS:
+                raise PushRejectedError(f"Push rejected: {info.summary.strip()}")
+    
+    def _git_stdin(self, args, data):
+        """Runs a git command feeding data on stdin and returns its stdout."""
+        result = subprocess.run(
+            ["git", *args],
+            cwd=self.repo_path,
+            input=data.encode() if isinstance(data, str) else data,
+            check=True,
+            capture_output=True
+        )
+        return result.stdout.decode().strip()
+    
+    def push_heartbeat_ref(self, node_id, payload):
+        """
+        Publishes liveness on refs/dgrid/heartbeat/<node_id> instead of the
+        main branch. The ref points to a parentless commit holding
+        heartbeat.json and is force-pushed, so it never conflicts with task
+        pushes and no heartbeat history accumulates. Readers only need the
+        committer date (git for-each-ref).
+        Touches neither the index nor the working tree, so no repo lock is
+        taken.
+        
+        Args:
+            node_id: Node identifier.
+            payload: JSON-serializable heartbeat data.
+        
+        Returns:
+            True if success.
+        
+        Raises:
+            PushRejectedError: If the remote rejected the update.
+        """
+        return self.push_heartbeat_refs({node_id: payload})
+    
+    def push_heartbeat_refs(self, payloads):
+        """
+        Publishes the heartbeat refs of several nodes (e.g. the logical nodes
+        of a supervisor) with a single push. See push_heartbeat_ref().
+        
+        Args:
+            payloads: Dict of node_id -> JSON-serializable heartbeat data.
+        
+        Returns:
+            True if success.
+        
+        Raises:
+            PushRejectedError: If the remote rejected one of the updates.
+        """
+        refspecs = []
+        for node_id, payload in payloads.items():
+            blob = self._git_stdin(["hash-object", "-w", "--stdin"], json.dumps(payload, indent=2) + "\n")
+            tree = self._git_stdin(["mktree"], f"100644 blob {blob}\theartbeat.json\n")
+            commit = self._git_stdin(["commit-tree", tree, "-m", f"[D-GRID] Heartbeat da {node_id}"], "")
+            refspecs.append(f"+{commit}:{HEARTBEAT_REF_PREFIX}/{node_id}")
+        
+        for info in self.repo.remotes.origin.push(refspecs):
+            if info.flags & PUSH_FAILURE_FLAGS:
+                raise PushRejectedError(f"Heartbeat push rejected: {info.summary.strip()}")
+        
+        logger.debug(f"Heartbeat refs updated: {', '.join(payloads)}")
+        return True
+    
+    def fetch_heartbeat_refs(self):
+        """
+        Fetches every node's refs/dgrid/heartbeat/<node_id> (forced, refs
+        deleted on the remote are pruned) and reads their committer dates.
+        Each ref is a single tiny commit, so an unchanged set costs one
+        round-trip and no objects.
+        
+        Returns:
+            dict: node_id -> last heartbeat (naive UTC ISO timestamp, as in
+                  the node files)
+        """
+        # The shared mirror only follows the main branch
+        remote = "upstream" if self.mirror else "origin"
+        self.repo.git.fetch("-q", "--prune", remote, f"+{HEARTBEAT_REF_PREFIX}/*:{HEARTBEAT_REF_PREFIX}/*")
+        output = self.repo.git.for_each_ref("--format=%(refname:lstrip=3) %(committerdate:unix)",
+                                            HEARTBEAT_REF_PREFIX)
+        heartbeats = {}
+        for line in output.splitlines():
+            node_id, timestamp = line.rsplit(" ", 1)
+            heartbeats[node_id] = datetime.utcfromtimestamp(int(timestamp)).isoformat()
+        return heartbeats
+    
+    def fetch_result_ref(self, node_id):
+        """
+        Fetches the tip of refs/dgrid/results/<node_id> into the local ref of
+        the same name (forced: the remote is authoritative). Only the tip is
+        needed as the parent of the next result commit, so a shallow clone
+        fetches it with --depth=1.
+        
+        Args:
+            node_id: Node identifier.
+        
+        Returns:
+            Hexsha of the tip, or None if the node has no result branch yet.
+        """
+        ref = f"{RESULT_REF_PREFIX}/{node_id}"
+        # The shared mirror only follows the main branch
+        remote = "upstream" if self.mirror else "origin"
+        depth = ["--depth=1"] if self.repo.git.rev_parse("--is-shallow-repository") == "true" else []
+        status, _, stderr = self.repo.git.fetch("-q", *depth, remote, f"+{ref}:{ref}",
+                                                with_extended_output=True, with_exceptions=False)
+        self._result_refs_fetched.add(node_id)
+        if status:
+            if "couldn't find remote ref" not in stderr:
+                raise GitCommandError(["git", "fetch", remote, ref], status, stderr)
+            self.repo.git.update_ref("-d", ref)
+            return None
+        return self.repo.git.rev_parse(ref)
+    
+    def commit_results(self, node_id, files, message):
+        """
+        Builds a commit holding only the given result files on top of the
+        node's result branch tip. Neither the index, the working tree nor
+        any ref is touched: push_result_refs() moves the local ref once the
+        remote accepted the commit.
+        
+        Args:
+            node_id: Node identifier.
+            files: Dict of path -> content (str or bytes).
+            message: Commit message.
+        
+        Returns:
+            Hexsha of the new commit.
+        """
+        ref = f"{RESULT_REF_PREFIX}/{node_id}"
+        # The odb's cat-file process is shared with the git writer
+        with self.lock:
+            changes = {path: ("100644", self._write_object(b"blob", content)) for path, content in files.items()}
+            tree = self._build_tree(None, changes)
+        
+        if node_id not in self._result_refs_fetched:
+            parent = self.fetch_result_ref(node_id)
+        else:
+            parent = self.repo.git.rev_parse("--verify", "-q", ref, with_exceptions=False) or None
+        return self._git_stdin(["commit-tree", tree, "-m", message] + (["-p", parent] if parent else []), "")
+    
+    def push_result_refs(self, commits):
+        """
+        Pushes the result commits of several nodes in a single push. The
+        updates are fast-forwards only: a node's results are never
+        overwritten, e.g. by a second process with the same NODE_ID.
+        
+        Args:
+            commits: Dict of node_id -> commit built by commit_results().
+        
+        Returns:
+            List of the node_ids whose update was rejected (their local ref
+            is left as it was; fetch_result_ref() and rebuild).
+        """
+        refs = {f"{RESULT_REF_PREFIX}/{node_id}": node_id for node_id in commits}
+        rejected = []
+        for info in self.repo.remotes.origin.push([f"{commit}:{RESULT_REF_PREFIX}/{node_id}"
+                                                   for node_id, commit in commits.items()]):
+            node_id = refs.get(info.remote_ref_string)
+            if info.flags & PUSH_FAILURE_FLAGS:
+                logger.warning(f"Result push for {node_id} rejected: {info.summary.strip()}")
+                rejected.append(node_id)
+        
+        for node_id, commit in commits.items():
+            if node_id not in rejected:
+                self.repo.git.update_ref(f"{RESULT_REF_PREFIX}/{node_id}", commit)
+        return rejected
+    
+    def _has_unpushed_commits(self):
+        """True if the local branch has commits the remote-tracking branch does not."""
+        try:
+            tracking = self.repo.active_branch.tracking_branch()
+            if tracking is None:
+                return False
+            return any(True for _ in self.repo.iter_commits(f"{tracking.path}..HEAD", max_count=1))
+        except Exception:
+            return False
     
     def move_file(self, src, dst):
         """
@@ -233,17 +1104,188 @@ class GitHandler:
                 logger.error(f"Source file does not exist: {full_src}")
                 return False
             
-            # Ensure destination directory exists
-            full_dst.parent.mkdir(parents=True, exist_ok=True)
+            # Ensure destination directory exists (unless git leaves it out
+            # of the sparse working tree anyway)
+            if self._in_sparse_cone(str(dst)):
+                full_dst.parent.mkdir(parents=True, exist_ok=True)
             
-            # Use git mv
-            self.repo.index.move([str(src), str(dst)])
+            # Use git mv (--sparse: the destination may be outside the cone,
+            # e.g. tasks/completed, and is then left out of the working tree)
+            with self.lock:
+                self.repo.git.mv("--sparse", str(src), str(dst))
             logger.debug(f"File moved: {src} -> {dst}")
             return True
         except Exception as e:
             logger.error(f"Error moving file: {e}")
             return False
     
+    def commit_renames(self, renames, message, extra_paths=None):
+        """
+        Renames many files in a single commit and pushes it, without one
+        'git mv' per file. The index is rebuilt in one sorted
+        'update-index --index-info' pass (blobs are reused, nothing is
+        rehashed; removing entries one by one is quadratic on large
+        indexes) and the working tree files are renamed in place.
+        
+        Args:
+            renames: List of (src, dst) repository-relative paths.
+            message: Commit message.
+            extra_paths: Paths to stage alongside the renames.
+        
+        Returns:
+            True if success.
+        
+        Raises:
+            PushRejectedError: If the remote rejected the push.
+        """
+        with self.lock:
+            renamed = dict(renames)
+            root = os.path.commonpath(list(renamed) + list(renamed.values()) + list(extra_paths or []))
+            
+            committed = False
+            try:
+                entries = []
+                moved = 0
+                for line in self.repo.git.ls_files("-s", "-z").split("\0"):
+                    if not line:
+                        continue
+                    info, path = line.split("\t", 1)
+                    mode, sha, _ = info.split(" ")
+                    if path in renamed:
+                        dst = renamed[path]
+                        full_dst = self.repo_path / dst
+                        full_dst.parent.mkdir(parents=True, exist_ok=True)
+                        os.replace(self.repo_path / path, full_dst)
+                        path = dst
+                        moved += 1
+                    entries.append((path.encode(), f"{mode} {sha}\t{path}\0"))
+                
+                entries.sort()
+                self.repo.git.read_tree("--empty")
+                self._git_stdin(["update-index", "-z", "--index-info"], "".join(record for _, record in entries))
+                if extra_paths:
+                    self.repo.git.add("--", *extra_paths)
+                
+                self.repo.git.commit("-q", "--no-verify", "-m", message)
+                committed = True
+                logger.info(f"Commit created: '{message}' ({moved} renames)")
+                
+                # The rebuilt entries lost their skip-worktree bits
+                if self.sparse_dirs:
+                    self.repo.git.sparse_checkout("reapply")
+                
+                self._push()
+                logger.info("Push completed.")
+                
+                # The rebuilt index has no stat data: refresh it once now
+                # rather than on every later status check
+                self.repo.git.update_index("-q", "--refresh", with_exceptions=False)
+                return True
+            except Exception:
+                # Leave no half-renamed tree behind: the renamed files are
+                # untracked after a reset and would leak into later commits
+                self.repo.head.reset("HEAD~1" if committed else "HEAD", index=True, working_tree=True)
+                self.repo.git.clean("-fdq", "--", root)
+                raise
+    
+    def get_head_commit(self):
+        """Returns the hexsha of the current HEAD."""
+        with self.lock:
+            return self.repo.head.commit.hexsha
+
+    def list_paths(self, prefix):
+        """
+        Lists tracked paths under a directory, read from the index
+        (no working-tree scan).
+
+        Args:
+            prefix: Repository-relative directory (e.g. "tasks/queue").
+
+        Returns:
+            List of repository-relative paths.
+        """
+        with self.lock:
+            output = self.repo.git.ls_files("-z", "--", prefix)
+        return [path for path in output.split("\0") if path]
+
+    def untracked_paths(self, paths):
+        """
+        Paths not tracked in the index, e.g. a queued task that a pull just
+        removed because another node claimed it. Works for paths outside the
+        sparse cone too.
+
+        Args:
+            paths: Repository-relative paths.
+
+        Returns:
+            List of the paths that are not tracked, in the given order.
+        """
+        if not paths:
+            return []
+        with self.lock:
+            output = self.repo.git.ls_files("-z", "--", *paths)
+        tracked = set(path for path in output.split("\0") if path)
+        return [path for path in paths if path not in tracked]
+
+    def get_changed_paths(self, old_commit, new_commit, prefix=None):
+        """
+        Paths changed between two commits (tree diff, no working-tree scan).
+        Renames are reported as delete + add.
+
+        Args:
+            old_commit: Previous HEAD hexsha.
+            new_commit: New HEAD hexsha.
+            prefix: Optional repository-relative directory filter.
+
+        Returns:
+            List of (status, path) tuples, status being A, M or D.
+        """
+        args = ["--name-status", "--no-renames", "-z", old_commit, new_commit]
+        if prefix:
+            args += ["--", prefix]
+
+        with self.lock:
+            output = self.repo.git.diff(*args)
+
+        fields = [field for field in output.split("\0") if field]
+        return list(zip(fields[0::2], fields[1::2]))
+
+    def read_files(self, commit, paths):
+        """
+        Contents of files at a commit, read from the object store with one
+        'git cat-file --batch' (no working-tree access, works outside the
+        sparse cone).
+
+        Args:
+            commit: Commit hexsha.
+            paths: Repository-relative paths.
+
+        Returns:
+            Dict of path -> decoded content (missing paths are left out).
+        """
+        if not paths:
+            return {}
+        output = subprocess.run(
+            ["git", "cat-file", "--batch"],
+            cwd=self.repo_path,
+            input="".join(f"{commit}:{path}\n" for path in paths).encode(),
+            check=True,
+            capture_output=True
+        ).stdout
+
+        contents = {}
+        offset = 0
+        for path in paths:
+            end = output.index(b"\n", offset)
+            header = output[offset:end].split()
+            offset = end + 1
+            if header[-1] == b"missing":
+                continue
+            size = int(header[2])
+            contents[path] = output[offset:offset + size].decode()
+            offset += size + 1
+        return contents
+
     def get_repo_path(self):
         """Returns the repository path."""
         return self.repo_path
@@ -253,9 +1295,13 @@ def get_git_handler():
     Factory function to get an initialized GitHandler.
     Uses configuration settings for optimization.
     """
-    from config import USE_SHALLOW_CLONE
+    from config import (USE_SHALLOW_CLONE, USE_SPARSE_CHECKOUT, SPARSE_CHECKOUT_DIRS,
+                        USE_PARTIAL_CLONE, PARTIAL_CLONE_FILTER, SHARED_MIRROR_PATH)
     handler = GitHandler()
-    if handler.clone_or_open_repo(use_shallow_clone=USE_SHALLOW_CLONE):
+    sparse_dirs = SPARSE_CHECKOUT_DIRS if USE_SPARSE_CHECKOUT else None
+    clone_filter = PARTIAL_CLONE_FILTER if USE_PARTIAL_CLONE else None
+    if handler.clone_or_open_repo(use_shallow_clone=USE_SHALLOW_CLONE, sparse_dirs=sparse_dirs,
+                                  clone_filter=clone_filter, use_shared_mirror=bool(SHARED_MIRROR_PATH)):
         return handler
     else:
         logger.error("Unable to initialize GitHandler.")
@@ -0,0 +1,336 @@
+"""
+D-GRID Git Writer Module
+Single writer for the shared repository: registration, heartbeats, claims,
+releases and task results are queued as path-level mutations, and whatever
+is pending is merged into one commit and one push per flush window instead
+of one commit and push each. Callers get a Future per mutation, so claims
+can still wait for the push to confirm them.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from logger_config import get_logger
+from git_handler import PushRejectedError, LostRaceError
+from config import GIT_FLUSH_WINDOW, USE_FAST_COMMIT
+
+logger = get_logger("git_writer")
+
+
+class Mutation:
+    """A change to commit, expressed as repository paths to write, move or remove."""
+
+    def __init__(self, message, writes=None, moves=None, removes=None, node_id=None):
+        """
+        Initialize the mutation.
+
+        Args:
+            message: One-line description, used as (part of) the commit message
+            writes: Dict of path -> content (str or bytes) to write and stage
+            moves: List of (src, dst) paths to move with 'git mv'
+            removes: List of paths to delete
+            node_id: Node the change belongs to (the writer may be shared
+                     by the nodes of a supervisor), named in batch summaries
+
+        Moves and removes require their source to exist when the batch is
+        applied: if a pull removed it (e.g. another node claimed the task)
+        the mutation is rejected instead of committed.
+        """
+        self.message = message
+        self.writes = writes or {}
+        self.moves = moves or []
+        self.removes = removes or []
+        self.node_id = node_id
+        self.future = Future()
+
+
+class GitWriter:
+    """Background thread turning queued mutations into batched commits and pushes."""
+
+    def __init__(self, git_handler, flush_window=GIT_FLUSH_WINDOW, max_replays=3, fast_commit=USE_FAST_COMMIT):
+        """
+        Initialize the writer.
+
+        Args:
+            git_handler: GitHandler owning the repository and its lock
+            flush_window: Seconds to gather mutations after the first one arrives
+            max_replays: Times a batch is re-applied without the mutations
+                         that lost a race before the rest fails too
+            fast_commit: Commit through GitHandler.commit_changes() (tree
+                         built from the changed entries) instead of staging
+                         each mutation in the index and running 'git commit'
+        """
+        self.git_handler = git_handler
+        self.repo_path = git_handler.get_repo_path()
+        self.flush_window = flush_window
+        self.max_replays = max_replays
+        self.fast_commit = fast_commit
+        self._queue = queue.Queue()
+        self._thread = None
+
+        # Counters for the metrics endpoint (push retries are counted by
+        # GitHandler.get_push_stats())
+        self.mutations = 0
+        self.commits = 0
+        self.pushes = 0
+        self.replays = 0
+        self.conflicts = 0  # Mutations whose source was taken by another node
+        self.failures = 0
+
+    def is_running(self):
+        """True while the writer thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the writer thread."""
+        if self.is_running():
+            return
+        self._thread = threading.Thread(target=self._run, name="git-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"✍️  Git writer started (flush window {self.flush_window}s)")
+
+    def stop(self, timeout=None):
+        """Push whatever is pending, then stop the writer thread."""
+        if not self.is_running():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def submit(self, mutation):
+        """
+        Queue a mutation for the next flush.
+        Without a running writer thread the mutation is committed and pushed
+        inline, before returning.
+
+        Args:
+            mutation: Mutation to commit
+
+        Returns:
+            Future resolved with True once the change is pushed, or with the
+            error (LostRaceError if another node took one of its sources,
+            PushRejectedError if every push attempt was rejected).
+        """
+        self.mutations += 1
+        if self.is_running():
+            self._queue.put(mutation)
+        else:
+            self._flush([mutation])
+        return mutation.future
+
+    def _run(self):
+        """Gather mutations for one flush window at a time and flush them."""
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_window
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+
+        # Anything queued while stopping is still committed
+        leftovers = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                leftovers.append(item)
+        if leftovers:
+            self._flush(leftovers)
+
+    def _flush(self, batch):
+        """
+        Commit and push a batch. Rejected pushes are rebased and retried by
+        GitHandler.push_with_rebase(); when a mutation lost a race the batch
+        is replayed on top of the remote without it, unless the clone could
+        not be synced with the remote (the replay would lose again).
+        """
+        pending = batch
+        for replay in range(self.max_replays + 1):
+            if replay:
+                self.replays += 1
+                synced = self.git_handler.pull_rebase(smart_poll=False, direct=True)
+                # Mutations rejected while applying the previous attempt are settled
+                pending = [mutation for mutation in pending if not mutation.future.done()]
+                if not synced:
+                    logger.error(f"Cannot replay {len(pending)} change(s): pull from the remote failed")
+                    self._fail(pending, PushRejectedError("Pull failed before replaying the batch"))
+                    return
+
+            try:
+                pending = self._commit_batch(pending)
+            except LostRaceError as e:
+                logger.warning(f"Replaying {len(pending)} change(s) without the lost ones: {e}")
+                continue
+            except Exception as e:
+                logger.error(f"Error pushing {len(pending)} change(s): {e}")
+                self._fail(pending, e)
+                return
+
+            for mutation in pending:
+                mutation.future.set_result(True)
+            return
+
+        logger.error(f"Giving up on {len(pending)} change(s) after {self.max_replays} replays")
+        self._fail(pending, PushRejectedError("Too many lost races while pushing"))
+
+    def _commit_batch(self, pending):
+        """
+        Apply the mutations, commit them as one and push.
+        On failure the local commit is dropped, so the remaining mutations
+        can be replayed once the branch is synced with the remote.
+
+        Returns:
+            List of the mutations that were pushed (the others were rejected).
+        """
+        with self.git_handler.lock:
+            if self.fast_commit:
+                return self._commit_batch_fast(pending)
+
+            applied = []
+            for mutation in pending:
+                try:
+                    if self._apply(mutation):
+                        applied.append(mutation)
+                except Exception as e:
+                    # Drop whatever it half-applied, then replay the rest
+                    logger.error(f"Cannot apply '{mutation.message}': {e}")
+                    self.failures += 1
+                    mutation.future.set_exception(e)
+                    self.git_handler.repo.head.reset("HEAD", index=True, working_tree=True)
+                    return self._commit_batch([m for m in pending if m is not mutation])
+
+            if not applied:
+                return []
+
+            committed = False
+            try:
+                committed = self.git_handler.commit_staged(self._message(applied))
+                if committed:
+                    self.commits += 1
+                if committed or self.git_handler._has_unpushed_commits():
+                    # The sources of moves/removes must still be on the remote:
+                    # if one is gone the push is not retried
+                    required = [path for mutation in applied for path in self._sources(mutation)]
+                    self.git_handler.push_pending(required)
+                    self.pushes += 1
+                return applied
+            except Exception:
+                self.git_handler.repo.head.reset("HEAD~1" if committed else "HEAD", index=True, working_tree=True)
+                raise
+
+    def _commit_batch_fast(self, pending):
+        """
+        _commit_batch() through GitHandler.commit_changes(): the mutations
+        are checked against the index once, then committed without staging.
+        """
+        # Sources another node took are not in the index after the last
+        # pull; earlier mutations of the batch may create or consume some
+        missing = set(self.git_handler.untracked_paths([path for m in pending for path in self._sources(m)]))
+        applied = []
+        for mutation in pending:
+            lost = [path for path in self._sources(mutation) if path in missing]
+            if lost:
+                self.conflicts += 1
+                logger.warning(f"Dropping '{mutation.message}': {lost[0]} no longer exists")
+                mutation.future.set_exception(LostRaceError(f"{lost[0]} no longer exists", lost))
+                continue
+            missing.update(self._sources(mutation))
+            missing.difference_update([dst for _, dst in mutation.moves] + list(mutation.writes))
+            applied.append(mutation)
+
+        if not applied:
+            return []
+
+        committed = False
+        try:
+            committed = self.git_handler.commit_changes(self._message(applied), applied)
+            if committed:
+                self.commits += 1
+            if committed or self.git_handler._has_unpushed_commits():
+                required = [path for mutation in applied for path in self._sources(mutation)]
+                self.git_handler.push_pending(required)
+                self.pushes += 1
+            return applied
+        except Exception:
+            self.git_handler.repo.head.reset("HEAD~1" if committed else "HEAD", index=True, working_tree=True)
+            raise
+
+    def _sources(self, mutation):
+        """Paths a mutation consumes: sources of its moves and removed files."""
+        return [src for src, _ in mutation.moves] + mutation.removes
+
+    def _apply(self, mutation):
+        """
+        Apply a mutation to the working tree and the index.
+
+        Returns:
+            True if applied, False if a source path no longer exists (the
+            mutation's future is rejected).
+        """
+        missing = self.git_handler.untracked_paths(self._sources(mutation))
+        if missing:
+            self.conflicts += 1
+            logger.warning(f"Dropping '{mutation.message}': {missing[0]} no longer exists")
+            mutation.future.set_exception(LostRaceError(f"{missing[0]} no longer exists", missing))
+            return False
+
+        for src, dst in mutation.moves:
+            if not self.git_handler.move_file(src, dst):
+                raise RuntimeError(f"Failed to move {src} -> {dst}")
+
+        if mutation.writes:
+            self.git_handler.write_files(mutation.writes)
+
+        if mutation.removes:
+            self.git_handler.remove_paths(mutation.removes)
+        return True
+
+    def _message(self, mutations):
+        """Commit message for a batch: the mutation's own, or a summary plus one line each."""
+        if len(mutations) == 1:
+            return mutations[0].message
+        nodes = sorted({mutation.node_id for mutation in mutations if mutation.node_id})
+        if not nodes:
+            summary = f"Batch of {len(mutations)} changes"
+        elif len(nodes) == 1:
+            summary = f"{nodes[0]} commits {len(mutations)} changes"
+        else:
+            summary = f"{', '.join(nodes)} commit {len(mutations)} changes"
+        return f"[D-GRID] {summary}\n\n" + "\n".join(mutation.message for mutation in mutations)
+
+    def _fail(self, mutations, error):
+        """Reject the futures of mutations that could not be pushed."""
+        for mutation in mutations:
+            if not mutation.future.done():
+                self.failures += 1
+                mutation.future.set_exception(error)
+
+    def get_stats(self):
+        """
+        Get writer statistics.
+
+        Returns:
+            dict: Mutations, commits and pushes so far, and mutations per push
+        """
+        return {
+            "flush_window": self.flush_window,
+            "pending": self._queue.qsize(),
+            "mutations": self.mutations,
+            "commits": self.commits,
+            "pushes": self.pushes,
+            "replays": self.replays,
+            "conflicts": self.conflicts,
+            "failures": self.failures,
+            "mutations_per_push": round(self.mutations / self.pushes, 2) if self.pushes else 0.0
+        }
@@ -4,6 +4,7 @@ Implements #18: Health Monitoring & Self-Healing.
 Monitors worker health and performs self-healing actions.
 """
 import time
+import threading
 import psutil
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -22,6 +23,8 @@ class HealthMonitor:
         self.failed_pulls = 0
         self.failed_pushes = 0
         self.last_health_check = datetime.utcnow()
+        self._lock = threading.Lock()  # Tasks are recorded from executor slots (#7)
+        self._metrics_providers = {}
         
     def check_system_resources(self):
         """
@@ -118,6 +121,9 @@ class HealthMonitor:
                 # Clean up old Docker containers/images if disk is low
                 if any("disk" in w.lower() for w in system_health.get("warnings", [])):
                     self._cleanup_docker()
+                    # Repack and prune the clone at the next idle window
+                    if git_handler.maintenance:
+                        git_handler.maintenance.request()
             
             # Check Git health
             git_health = self.check_git_health(git_handler)
@@ -136,16 +142,11 @@ class HealthMonitor:
     def _cleanup_docker(self):
         """Clean up unused Docker resources to free disk space."""
         try:
-            import subprocess
+            from container_backend import get_container_backend
             logger.info("Cleaning up Docker resources...")
             
-            # Remove stopped containers
-            subprocess.run(["docker", "container", "prune", "-f"], 
-                         capture_output=True, timeout=30)
-            
-            # Remove dangling images
-            subprocess.run(["docker", "image", "prune", "-f"], 
-                         capture_output=True, timeout=30)
+            # Remove stopped containers and dangling images
+            get_container_backend().prune()
             
             logger.info("✅ Docker cleanup completed")
             
@@ -154,12 +155,13 @@ class HealthMonitor:
     
     def record_task_execution(self):
         """Record a task execution for rate limiting."""
-        self.task_count += 1
-        
-        # Reset counter every hour
-        if datetime.utcnow() - self.task_count_reset_time > timedelta(hours=1):
-            self.task_count = 1
-            self.task_count_reset_time = datetime.utcnow()
+        with self._lock:
+            self.task_count += 1
+            
+            # Reset counter every hour
+            if datetime.utcnow() - self.task_count_reset_time > timedelta(hours=1):
+                self.task_count = 1
+                self.task_count_reset_time = datetime.utcnow()
     
     def can_execute_task(self, max_tasks_per_hour):
         """
@@ -186,12 +188,30 @@ class HealthMonitor:
         
         return True
     
+    def register_metrics(self, name, provider):
+        """
+        Register a callable whose result is included in the health summary.
+        
+        Args:
+            name: Key used in the summary (e.g. "executor")
+            provider: Zero-argument callable returning a JSON-serializable value
+        """
+        self._metrics_providers[name] = provider
+    
     def get_health_summary(self):
         """Get a summary of worker health status."""
-        return {
+        summary = {
             "tasks_executed_this_hour": self.task_count,
             "task_count_reset_time": self.task_count_reset_time.isoformat(),
             "failed_pulls": self.failed_pulls,
             "failed_pushes": self.failed_pushes,
             "last_health_check": self.last_health_check.isoformat()
         }
+        
+        for name, provider in self._metrics_providers.items():
+            try:
+                summary[name] = provider()
+            except Exception as e:
+                logger.warning(f"Metrics provider '{name}' failed: {e}")
+        
+        return summary
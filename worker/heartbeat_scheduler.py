@@ -0,0 +1,76 @@
+"""
+D-GRID Heartbeat Scheduler Module
+Sends heartbeats on their own timer (HEARTBEAT_INTERVAL) instead of on every
+idle poll. Claim and result commits already carry the heartbeat (see
+StateManager.piggyback_paths()), so a standalone heartbeat commit is pushed
+only when nothing else did within the interval.
+"""
+import threading
+from logger_config import get_logger
+from state_manager import send_heartbeat_refs
+
+logger = get_logger("heartbeat_scheduler")
+
+
+class HeartbeatScheduler:
+    """Background timer pushing heartbeats that no other commit carried."""
+
+    def __init__(self, *state_managers):
+        """
+        Initialize the scheduler.
+
+        Args:
+            state_managers: StateManager of each node hosted by the process
+                            (several under a supervisor) owning the node
+                            file and interval
+        """
+        self.state_managers = list(state_managers)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the timer thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+        self._thread.start()
+        interval = self.state_managers[0].heartbeat_interval
+        logger.info(f"💓 Heartbeat scheduler started (every {interval}s, {len(self.state_managers)} node(s))")
+
+    def _next_due(self):
+        """Seconds until the first node's heartbeat is due."""
+        return min(manager.seconds_until_heartbeat() for manager in self.state_managers)
+
+    def _run(self):
+        """Sleep until the next heartbeat is due, then send it if still due."""
+        while not self._stop.wait(max(1.0, self._next_due())):
+            try:
+                self.send_due()
+            except Exception as e:
+                logger.error(f"Heartbeat scheduler error: {e}")
+
+    def send_due(self, force=False):
+        """
+        Send the heartbeats that are due.
+
+        Args:
+            force: Send every node's heartbeat (e.g. at shutdown)
+        """
+        # A claim or result commit may have carried it while waiting
+        due = [manager for manager in self.state_managers if force or manager.seconds_until_heartbeat() == 0]
+        # Heartbeat refs of several nodes share one push: once one is due all
+        # of them are refreshed, which keeps the nodes on the same timer
+        refs = [manager for manager in self.state_managers
+                if manager.heartbeat_mode == "ref" and manager.node_file.exists()]
+        if len(refs) > 1 and any(manager in due for manager in refs):
+            send_heartbeat_refs(refs)
+            due = [manager for manager in due if manager not in refs]
+        for manager in due:
+            manager.send_heartbeat(force=force)
+
+    def stop(self, timeout=None):
+        """Stop the timer thread (a heartbeat being pushed is completed)."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
@@ -6,13 +6,22 @@ The heart of the worker: main execution loop.
 import time
 import signal
 import sys
+import threading
 from logger_config import get_logger
 from git_handler import get_git_handler
-from state_manager import StateManager
-from task_runner import TaskRunner
+from task_runner import QUEUE_PREFIX
+from task_sharding import QueueIndex
 from health_monitor import HealthMonitor
+from state_index import get_state_index
+from repo_maintenance import get_repo_maintenance
+from container_backend import NODE_LABEL, get_container_backend
+from container_pool import POOL_LABEL, get_container_pool
+from result_cache import get_result_cache
+from worker_node import WorkerNode
+from heartbeat_scheduler import HeartbeatScheduler
 from config import (PULL_INTERVAL, HEARTBEAT_INTERVAL, NODE_ID, validate_config,
-                    USE_SHALLOW_CLONE, USE_SMART_POLLING, MAX_TASKS_PER_HOUR)
+                    USE_SHALLOW_CLONE, USE_SMART_POLLING, MAX_TASKS_PER_HOUR,
+                    MAX_PARALLEL_TASKS, PREFETCH_DEPTH, QUEUE_AUTO_RESHARD, RESULT_MODE)
 from web_server import start_web_server
 
 logger = get_logger("main")
@@ -32,13 +41,21 @@ def signal_handler(sig, frame):
     logger.info("Worker will complete current task (if any) and do a final push.")
     shutdown_requested = True
 
-def main():
-    """Main worker loop."""
+def run(node_ids):
+    """
+    Main worker loop for one or more logical nodes sharing this process's
+    clone: one pull per interval and one dashboard for all of them, while
+    each node keeps its own heartbeat, claims and executor slots.
+    
+    Args:
+        node_ids: Node IDs to host ([NODE_ID] for a plain worker)
+    """
     logger.info("=" * 60)
     logger.info("🚀 D-GRID Worker Node - Starting")
-    logger.info(f"   Node ID: {NODE_ID}")
+    logger.info(f"   Node ID: {', '.join(node_ids)}")
     logger.info(f"   Optimizations: Shallow Clone={USE_SHALLOW_CLONE}, Smart Polling={USE_SMART_POLLING}")
     logger.info(f"   Rate Limit: {MAX_TASKS_PER_HOUR if MAX_TASKS_PER_HOUR > 0 else 'Unlimited'} tasks/hour")
+    logger.info(f"   Parallel Slots: {MAX_PARALLEL_TASKS}, Prefetch Depth: {PREFETCH_DEPTH}")
     logger.info("=" * 60)
     
     # Validate configuration at startup
@@ -62,21 +79,96 @@ def main():
         logger.error("Unable to initialize Git Handler. Exiting.")
         sys.exit(1)
     
-    state_manager = StateManager(git_handler)
-    task_runner = TaskRunner(git_handler)
+    # Single writer coalescing every commit/push of this process
+    git_writer = git_handler.get_writer()
+    git_writer.start()
+    
+    # RESULT_MODE=branch: results go to this process's result branches
+    result_writer = git_handler.get_result_writer() if RESULT_MODE == "branch" else None
+    if result_writer:
+        result_writer.start()
+    
+    # One worker per host refreshes the shared mirror the others fetch from
+    if git_handler.mirror:
+        git_handler.mirror.start()
+    
     health_monitor = HealthMonitor()
     
-    # Register the node
-    if not state_manager.register_node():
-        logger.error("Unable to register node. Exiting.")
-        sys.exit(1)
+    # Repack, prune and re-shallow the clone while the writer is idle
+    git_handler.maintenance = get_repo_maintenance(git_handler, git_writer)
+    git_handler.maintenance.start()
+    
+    # Task counts and node liveness for the dashboard, updated from the
+    # paths each pull changed
+    state_index = get_state_index(git_handler)
+    if state_index:
+        state_index.sync()
+    
+    # Nodes share the queue index (same clone, same HEAD) and wake the main
+    # loop through one event when any of their slots is released
+    queue_index = QueueIndex(QUEUE_PREFIX)
+    slot_freed = threading.Event()
+    # Task containers a previous run of these nodes left behind (killed
+    # worker, lost client) still hold their CPU and memory: remove them.
+    # Pooled ones are labeled with the process's pool, not with a node,
+    # and are swept even if the pool is now disabled.
+    container_backend = get_container_backend()
+    for label in [f"{NODE_LABEL}={node_id}" for node_id in node_ids] + [f"{POOL_LABEL}={NODE_ID}"]:
+        container_backend.reap(label)
+    # Warm task containers, shared by the executor slots of every node
+    container_pool = get_container_pool(container_backend)
+    if container_pool:
+        container_pool.start()
+    # Results of deterministic tasks, reused by every node of the process
+    result_cache = get_result_cache(git_handler)
+    nodes = [WorkerNode(node_id, git_handler, health_monitor, queue_index, slot_freed, container_pool,
+                        container_backend, result_cache)
+             for node_id in node_ids]
+    
+    if len(nodes) == 1:
+        node = nodes[0]
+        health_monitor.register_metrics("executor", node.executor.get_utilization)
+        health_monitor.register_metrics("prefetch", node.prefetcher.get_stats)
+        health_monitor.register_metrics("acquisition", node.task_runner.get_acquisition_stats)
+        health_monitor.register_metrics("heartbeat", node.state_manager.get_heartbeat_stats)
+    else:
+        health_monitor.register_metrics("nodes", lambda: {node.node_id: node.get_stats() for node in nodes})
+        # The dashboard shows the liveness of the stalest node
+        health_monitor.register_metrics("heartbeat", lambda: min(
+            nodes, key=lambda node: node.state_manager.last_heartbeat).state_manager.get_heartbeat_stats())
+    health_monitor.register_metrics("queue", nodes[0].task_runner.get_queue_stats)
+    health_monitor.register_metrics("git_writer", git_writer.get_stats)
+    if result_writer:
+        health_monitor.register_metrics("result_writer", result_writer.get_stats)
+    health_monitor.register_metrics("push", git_handler.get_push_stats)
+    health_monitor.register_metrics("poll", git_handler.get_poll_stats)
+    if git_handler.mirror:
+        health_monitor.register_metrics("mirror", git_handler.mirror.get_stats)
+    if state_index:
+        health_monitor.register_metrics("state_index", state_index.get_stats)
+    health_monitor.register_metrics("maintenance", git_handler.maintenance.get_stats)
+    health_monitor.register_metrics("containers", container_backend.get_stats)
+    if container_pool:
+        health_monitor.register_metrics("container_pool", container_pool.get_stats)
+    if result_cache:
+        health_monitor.register_metrics("result_cache", result_cache.get_stats)
+    heartbeat_scheduler = HeartbeatScheduler(*(node.state_manager for node in nodes))
+    
+    # Register the nodes
+    for node in nodes:
+        if not node.register():
+            logger.error(f"Unable to register node {node.node_id}. Exiting.")
+            sys.exit(1)
     
-    logger.info("✅ Node registered and ready.")
+    logger.info(f"✅ {len(nodes)} node(s) registered and ready.")
+    
+    # Heartbeats run on their own timer and ride along with task commits
+    heartbeat_scheduler.start()
     
     # Start the web server for local dashboard
     logger.info("Starting local web server...")
     try:
-        start_web_server()
+        start_web_server(health_monitor, state_index)
         logger.info("✅ Web server started on http://0.0.0.0:8000")
     except Exception as e:
         logger.warning(f"⚠️  Unable to start web server: {e}")
@@ -99,6 +191,11 @@ def main():
                     if not system_health["healthy"]:
                         logger.warning("⚠️  System health check failed, running self-heal...")
                         health_monitor.self_heal(git_handler)
+                    
+                    for node in nodes:
+                        utilization = node.executor.get_utilization()
+                        logger.info(f"📊 Slot utilization of {node.node_id}: {utilization['utilization']:.0%} "
+                                    f"({utilization['busy_slots']}/{utilization['max_slots']} busy)")
                 
                 # Pull the latest state with smart polling (#6)
                 logger.debug("Pulling latest state...")
@@ -108,41 +205,23 @@ def main():
                     time.sleep(PULL_INTERVAL)
                     continue
                 
-                # Check rate limiting (#10)
-                if not health_monitor.can_execute_task(MAX_TASKS_PER_HOUR):
-                    logger.debug("Rate limit reached, sending heartbeat instead...")
-                    state_manager.send_heartbeat()
-                    time.sleep(PULL_INTERVAL)
-                    continue
+                if state_index:
+                    state_index.sync()
                 
-                # Look for a task to execute
-                task_file = task_runner.find_task_to_run()
+                # Split/merge queue shards if queue depth crossed a threshold (#1)
+                if QUEUE_AUTO_RESHARD:
+                    nodes[0].task_runner.rebalance_queue_shards()
                 
-                if task_file:
-                    # Execute the task
-                    logger.info(f"Executing task: {task_file.name}")
-                    result = task_runner.execute_task(task_file)
-                    
-                    # Record task execution for rate limiting
-                    health_monitor.record_task_execution()
-                    
-                    # Report the result (critical operation)
-                    logger.info(f"Reporting result: exit_code={result['exit_code']}")
-                    if not task_runner.report_task_result(task_file, result):
-                        logger.error("Failed to report result. Task may remain orphaned.")
-                        health_monitor.failed_pushes += 1
-                        # Note: Task has already been moved locally, but push failed.
-                        # Do a reset for consistency with remote state.
-                        logger.warning("Resetting local state after report failure...")
-                        git_handler.pull_rebase()  # Reacquire remote state
-                else:
-                    # No task, send heartbeat
-                    logger.debug("No task available, sending heartbeat...")
-                    state_manager.send_heartbeat()
+                # Fill free executor slots (#7: Parallel execution), then claim,
+                # read and verify up to PREFETCH_DEPTH tasks ahead of the slots.
+                # Each node claims its own batch from the same pulled state.
+                for node in nodes:
+                    node.fill_slots()
                 
-                # Sleep before next cycle
+                # Sleep before next cycle, waking early if a slot is released
                 logger.debug(f"Sleep {PULL_INTERVAL}s...")
-                time.sleep(PULL_INTERVAL)
+                slot_freed.wait(PULL_INTERVAL)
+                slot_freed.clear()
             
             except Exception as e:
                 # Catch ALL loop errors
@@ -164,13 +243,29 @@ def main():
     finally:
         logger.info("-" * 60)
         logger.info("🛑 SHUTDOWN SEQUENCE STARTED")
+        # Stop every node's slots from chaining new tasks before waiting
+        for node in nodes:
+            node.executor.shutdown(wait=False)
+        for node in nodes:
+            node.shutdown()
+        heartbeat_scheduler.stop()
         logger.info("Sending last heartbeat before exiting...")
         try:
-            state_manager.send_heartbeat()
+            heartbeat_scheduler.send_due(force=True)
             logger.info("✅ Last heartbeat sent.")
         except Exception as e:
             logger.warning(f"Failed to send last heartbeat: {e}")
         
+        # Push whatever results are still pending
+        if result_writer:
+            result_writer.stop()
+        git_writer.stop()
+        if git_handler.mirror:
+            git_handler.mirror.stop()
+        git_handler.maintenance.stop()
+        if container_pool:
+            container_pool.stop()
+        
         # Log health summary
         health_summary = health_monitor.get_health_summary()
         logger.info(f"Health Summary: {health_summary}")
@@ -179,5 +274,10 @@ def main():
         logger.info("=" * 60)
 
 
+def main():
+    """Main worker loop of a single node (NODE_ID)."""
+    run([NODE_ID])
+
+
 if __name__ == "__main__":
     main()
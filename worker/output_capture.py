@@ -0,0 +1,109 @@
+"""
+D-GRID Output Capture Module
+Bounded capture of a task's stdout/stderr. The output is consumed as a
+stream, chunk by chunk, as it comes out of the pipe or the Docker socket:
+only the first OUTPUT_HEAD_BYTES and the last OUTPUT_TAIL_BYTES are kept
+(the tail in a ring buffer), the rest is counted and dropped, and nothing is
+decoded until the task log is written. Worker memory stays the same whether
+a task prints a line or gigabytes. With OUTPUT_ARTIFACT_DIR the full output
+is also gzipped to a local file as it streams.
+"""
+import gzip
+import re
+from pathlib import Path
+from logger_config import get_logger
+from config import OUTPUT_HEAD_BYTES, OUTPUT_TAIL_BYTES, OUTPUT_ARTIFACT_DIR
+
+logger = get_logger("output_capture")
+
+# Bytes read from a pipe or socket at a time
+CHUNK_SIZE = 64 * 1024
+
+
+class OutputCapture:
+    """One output stream: head, tail ring buffer, byte count, optional gzip spill."""
+
+    def __init__(self, head=OUTPUT_HEAD_BYTES, tail=OUTPUT_TAIL_BYTES, artifact=None):
+        """
+        Initialize the capture.
+
+        Args:
+            head: First bytes to keep
+            tail: Last bytes to keep
+            artifact: Path of a gzip file receiving the full output, or None
+        """
+        self.head_limit = head
+        self.tail_limit = tail
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+        self.artifact = Path(artifact) if artifact else None
+        self._spill = None
+        self._text = None
+        if self.artifact:
+            try:
+                self.artifact.parent.mkdir(parents=True, exist_ok=True)
+                self._spill = gzip.open(self.artifact, "wb", compresslevel=1)
+            except OSError as e:
+                logger.warning(f"Cannot write output artifact {self.artifact}: {e}")
+                self.artifact = None
+
+    def write(self, data):
+        """Consumes a chunk of output (bytes); file-like, so it can be a sink."""
+        if not data:
+            return
+        self.total += len(data)
+        self._text = None
+        if self._spill:
+            self._spill.write(data)
+        data = memoryview(data)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head.extend(data[:room])
+            data = data[room:]
+        if not data or not self.tail_limit:
+            return
+        if len(data) >= self.tail_limit:
+            self.tail[:] = data[-self.tail_limit:]
+        else:
+            self.tail.extend(data)
+            excess = len(self.tail) - self.tail_limit
+            if excess > 0:
+                del self.tail[:excess]
+
+    @property
+    def omitted(self):
+        """Bytes counted but neither in the head nor in the tail."""
+        return self.total - len(self.head) - len(self.tail)
+
+    def text(self):
+        """Head and tail decoded (undecodable bytes replaced), with a marker where bytes were dropped."""
+        if self._text is None:
+            text = self.head.decode(errors="replace")
+            if self.omitted:
+                text += f"\n[... {self.omitted} bytes omitted ...]\n"
+            self._text = text + self.tail.decode(errors="replace")
+        return self._text
+
+    def close(self):
+        """Flushes and closes the artifact file, if any."""
+        if self._spill:
+            self._spill.close()
+            self._spill = None
+
+
+def get_output_captures(task_id=None):
+    """
+    Factory function to get the stdout and stderr captures of a task.
+
+    Args:
+        task_id: Names the artifact files if OUTPUT_ARTIFACT_DIR is set
+
+    Returns:
+        Tuple (stdout, stderr) of OutputCapture.
+    """
+    if not OUTPUT_ARTIFACT_DIR or not task_id:
+        return OutputCapture(), OutputCapture()
+    name = re.sub(r"[^a-zA-Z0-9_.-]", "-", task_id)
+    return (OutputCapture(artifact=Path(OUTPUT_ARTIFACT_DIR) / f"{name}.stdout.gz"),
+            OutputCapture(artifact=Path(OUTPUT_ARTIFACT_DIR) / f"{name}.stderr.gz"))
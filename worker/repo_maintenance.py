@@ -0,0 +1,235 @@
+"""
+D-GRID Repository Maintenance Module
+Background upkeep of a long-running worker clone: heartbeat, claim and result
+commits leave thousands of loose objects and an ever deeper history behind,
+and every pull and commit slows down with them. Once per MAINTENANCE_INTERVAL,
+in a window where the git writer has nothing pending, the clone is cut back
+to MAINTENANCE_SHALLOW_DEPTH commits, repacked, pruned and, unless shallow
+(git does not use it there), given a commit-graph.
+Only the steps that touch refs take the repository lock, and only when it is
+free; repack and prune run beside the worker at low CPU priority and keep
+every object younger than PRUNE_GRACE, so an in-flight commit or fetch is
+never pruned from under the worker.
+"""
+import os
+import subprocess
+import threading
+import time
+from logger_config import get_logger
+from config import MAINTENANCE_INTERVAL, MAINTENANCE_SHALLOW_DEPTH, MAINTENANCE_LOOSE_OBJECTS
+
+logger = get_logger("repo_maintenance")
+
+# Unreachable objects younger than this are kept (they may belong to a
+# commit or fetch in progress)
+PRUNE_GRACE = "1.hour.ago"
+
+# Packs (one per larger fetch) after which a repack is worth it anyway
+PACK_LIMIT = 20
+
+# Seconds between two idle checks while maintenance is due
+IDLE_POLL = 5
+
+
+class RepoMaintenance:
+    """Periodic re-shallow, repack, prune and commit-graph of the worker clone."""
+
+    def __init__(self, git_handler, git_writer=None, interval=MAINTENANCE_INTERVAL,
+                 shallow_depth=MAINTENANCE_SHALLOW_DEPTH, loose_objects=MAINTENANCE_LOOSE_OBJECTS,
+                 prune_grace=PRUNE_GRACE):
+        """
+        Initialize the maintenance task.
+
+        Args:
+            git_handler: GitHandler of the clone
+            git_writer: GitWriter of the process (maintenance waits until it is idle)
+            interval: Minimum seconds between two runs
+            shallow_depth: Commits kept in a shallow clone
+            loose_objects: Loose objects below which a run is skipped
+                           (unless the history or the pack count grew too)
+            prune_grace: Age (git date) under which unreachable objects are kept
+        """
+        self.git_handler = git_handler
+        self.git_writer = git_writer
+        self.interval = interval
+        self.shallow_depth = shallow_depth
+        self.loose_objects = loose_objects
+        self.prune_grace = prune_grace
+        self._requested = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_check = time.monotonic()
+
+        self.runs = 0
+        self.skipped = 0
+        self.postponed = 0
+        self.failures = 0
+        self.last_run = None
+        # Polls made since the last run: (count, total latency) at the run
+        self._polls_at_run = (git_handler.polls, git_handler.poll_latency_total)
+
+    def _git(self, *args, nice=False):
+        """Runs a git command in the clone and returns stdout."""
+        result = subprocess.run(["git", *args], cwd=self.git_handler.repo_path, check=True, capture_output=True,
+                                preexec_fn=(lambda: os.nice(10)) if nice else None)
+        return result.stdout.decode().strip()
+
+    def count_objects(self):
+        """
+        Object counts of the clone ('git count-objects -v').
+
+        Returns:
+            dict: loose, in_pack, packs, size_kb (loose + packed)
+        """
+        counts = dict(line.split(": ", 1) for line in self._git("count-objects", "-v").splitlines())
+        return {
+            "loose": int(counts["count"]),
+            "in_pack": int(counts["in-pack"]),
+            "packs": int(counts["packs"]),
+            "size_kb": int(counts["size"]) + int(counts["size-pack"])
+        }
+
+    def _is_shallow(self):
+        """True for a shallow clone (USE_SHALLOW_CLONE)."""
+        return self._git("rev-parse", "--is-shallow-repository") == "true"
+
+    def _poll_latency_since(self, since):
+        """Average poll latency (ms) of the polls made after a (count, total) snapshot."""
+        polls = self.git_handler.polls - since[0]
+        if not polls:
+            return None
+        return round((self.git_handler.poll_latency_total - since[1]) / polls * 1000, 1)
+
+    def _is_idle(self):
+        """True when no commit or push is waiting in the git writer."""
+        return self.git_writer is None or self.git_writer.get_stats()["pending"] == 0
+
+    def needs_maintenance(self, counts):
+        """True if the clone has enough loose objects, packs or history to be worth a run."""
+        if counts["loose"] >= self.loose_objects or counts["packs"] >= PACK_LIMIT:
+            return True
+        return self._is_shallow() and int(self._git("rev-list", "--count", "HEAD")) > 2 * self.shallow_depth
+
+    def request(self):
+        """Asks for a run at the next idle window, regardless of the interval (e.g. low disk)."""
+        self._requested.set()
+
+    def run_once(self, force=False):
+        """
+        One maintenance run, if due and idle.
+
+        Args:
+            force: Run even if the clone looks clean.
+
+        Returns:
+            True if the clone was maintained, False if skipped or postponed.
+        """
+        try:
+            before = self.count_objects()
+            if not force and not self.needs_maintenance(before):
+                self.skipped += 1
+                logger.debug(f"Repository maintenance skipped: {before['loose']} loose object(s)")
+                return False
+
+            start = time.perf_counter()
+            # Ref updates must not interleave with a pull or a commit: only
+            # when nobody holds the lock, otherwise try again later
+            if not self._is_idle() or not self.git_handler.lock.acquire(blocking=False):
+                self.postponed += 1
+                return False
+            try:
+                shallow = self._is_shallow()
+                if shallow:
+                    _, branch, tracking = self.git_handler._upstream()
+                    self._git("fetch", "-q", f"--depth={self.shallow_depth}", "origin",
+                              f"+refs/heads/{branch}:refs/remotes/{tracking}")
+                # Old reflog entries would keep the cut history alive
+                self._git("reflog", "expire", "--expire-unreachable=now", "--all")
+            finally:
+                self.git_handler.lock.release()
+
+            # -l: objects borrowed from a shared mirror stay there
+            self._git("repack", "-d", "-l", "-A", "-q", f"--unpack-unreachable={self.prune_grace}", nice=True)
+            self._git("prune", f"--expire={self.prune_grace}", nice=True)
+            if not shallow:
+                self._git("commit-graph", "write", "--reachable", nice=True)
+
+            after = self.count_objects()
+            self.runs += 1
+            self.last_run = {
+                "at": time.time(),
+                "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+                "before": before,
+                "after": after,
+                "poll_latency_ms_before": self._poll_latency_since(self._polls_at_run)
+            }
+            self._polls_at_run = (self.git_handler.polls, self.git_handler.poll_latency_total)
+            logger.info(f"🧹 Repository maintained: {before['loose']} -> {after['loose']} loose object(s), "
+                        f"{before['packs']} -> {after['packs']} pack(s), "
+                        f"{before['size_kb']} -> {after['size_kb']} KB")
+            return True
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Repository maintenance failed: {e}")
+            return False
+
+    def start(self):
+        """Start the maintenance thread."""
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, name="repo-maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the maintenance thread (a run in progress is completed)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(IDLE_POLL):
+            due = time.monotonic() - self._last_check >= self.interval
+            if not due and not self._requested.is_set():
+                continue
+            postponed = self.postponed
+            self.run_once(force=self._requested.is_set())
+            # A postponed run is retried at the next check, not next interval
+            if self.postponed == postponed:
+                self._last_check = time.monotonic()
+                self._requested.clear()
+
+    def get_stats(self):
+        """
+        Get maintenance statistics.
+
+        Returns:
+            dict: Runs, skips, postponements, last run with before/after
+                  object counts, and the poll latency before/after it
+        """
+        last_run = dict(self.last_run) if self.last_run else None
+        if last_run:
+            last_run["poll_latency_ms_after"] = self._poll_latency_since(self._polls_at_run)
+        return {
+            "interval": self.interval,
+            "shallow_depth": self.shallow_depth,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "postponed": self.postponed,
+            "failures": self.failures,
+            "last_run": last_run
+        }
+
+
+def get_repo_maintenance(git_handler, git_writer=None):
+    """
+    Factory function to get the maintenance task of a clone.
+
+    Args:
+        git_handler: Initialized GitHandler
+        git_writer: GitWriter of the process
+
+    Returns:
+        RepoMaintenance instance.
+    """
+    return RepoMaintenance(git_handler, git_writer)
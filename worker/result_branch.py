@@ -0,0 +1,109 @@
+"""
+D-GRID Result Branch Module
+RESULT_MODE=branch: instead of racing every other node for the main branch,
+each node appends its task results to its own ref, refs/dgrid/results/<node>.
+Nobody else writes there, so result pushes never conflict and never need a
+fetch + rebase. Every commit holds only the results of one flush window
+(tasks/{completed,failed}/<task> and its .log); the aggregator
+(.github/scripts/aggregate_results.py) merges them into the main branch in
+batches and removes the tasks from tasks/in_progress.
+"""
+import threading
+from logger_config import get_logger
+from git_handler import PushRejectedError
+from git_writer import GitWriter, Mutation
+from config import GIT_FLUSH_WINDOW
+
+logger = get_logger("result_branch")
+
+
+class ResultMutation(Mutation):
+    """Result files of one task, for the result branch of the node that ran it."""
+
+    def __init__(self, node_id, message, writes):
+        """
+        Initialize the result.
+
+        Args:
+            node_id: Node whose result branch receives the files
+            message: One-line description, used as (part of) the commit message
+            writes: Dict of path -> content (str or bytes)
+        """
+        super().__init__(message, writes=writes, node_id=node_id)
+
+
+class ResultBranchWriter(GitWriter):
+    """
+    Background thread turning queued results into one commit per node and
+    one push per flush window, on the nodes' result branches.
+    """
+
+    def __init__(self, git_handler, flush_window=GIT_FLUSH_WINDOW, max_replays=3):
+        """
+        Initialize the writer.
+
+        Args:
+            git_handler: GitHandler owning the repository
+            flush_window: Seconds to gather results after the first one arrives
+            max_replays: Times a rejected node commit is rebuilt on the
+                         remote tip before its results fail
+        """
+        super().__init__(git_handler, flush_window=flush_window, max_replays=max_replays)
+
+    def start(self):
+        """Start the writer thread."""
+        if self.is_running():
+            return
+        self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"📤 Result branch writer started (flush window {self.flush_window}s)")
+
+    def _flush(self, batch):
+        """
+        Commit each node's results on top of its result branch and push them
+        all at once. A rejected node (its branch moved on the remote) is
+        fetched, rebuilt and pushed again.
+        """
+        by_node = {}
+        for mutation in batch:
+            by_node.setdefault(mutation.node_id, []).append(mutation)
+
+        pending = by_node
+        for replay in range(self.max_replays + 1):
+            if replay:
+                self.replays += 1
+            try:
+                if replay:
+                    for node_id in pending:
+                        self.git_handler.fetch_result_ref(node_id)
+                commits = {}
+                for node_id, mutations in pending.items():
+                    files = {path: content for mutation in mutations for path, content in mutation.writes.items()}
+                    commits[node_id] = self.git_handler.commit_results(node_id, files, self._message(mutations))
+                self.commits += len(commits)
+                rejected = self.git_handler.push_result_refs(commits)
+                self.pushes += 1
+            except Exception as e:
+                logger.error(f"Error pushing results of {', '.join(pending)}: {e}")
+                self._fail([mutation for mutations in pending.values() for mutation in mutations], e)
+                return
+
+            for node_id, mutations in pending.items():
+                if node_id not in rejected:
+                    for mutation in mutations:
+                        mutation.future.set_result(True)
+            pending = {node_id: pending[node_id] for node_id in rejected}
+            if not pending:
+                return
+            self.conflicts += len(pending)
+
+        logger.error(f"Giving up on the results of {', '.join(pending)} after {self.max_replays} replays")
+        self._fail([mutation for mutations in pending.values() for mutation in mutations],
+                   PushRejectedError("Result branch push rejected"))
+
+    def _message(self, mutations):
+        """Commit message for a node's batch: the result's own, or a summary plus one line each."""
+        if len(mutations) == 1:
+            return mutations[0].message
+        return (f"[D-GRID] {mutations[0].node_id} reports {len(mutations)} results\n\n"
+                + "\n".join(mutation.message for mutation in mutations))
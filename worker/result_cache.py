@@ -0,0 +1,184 @@
+"""
+D-GRID Result Cache Module
+Submitters often enqueue the same script many times (retried pipelines,
+fan-out jobs). A task marked "deterministic": true declares that its result
+depends only on its script, so the worker can report the result of an
+identical earlier run instead of starting a container.
+
+Results are keyed by a hash of what determines them: image, script, timeout
+and container limits. Each worker keeps the last RESULT_CACHE_SIZE in memory
+(LRU). With RESULT_CACHE_SHARED the node that ran a task also commits its
+result to cache/results/<2 hex>/<key>.json along with the task result, and
+the other nodes look there (in HEAD's tree, outside the sparse checkout) when
+their own cache misses. Timeouts and worker-side errors are never cached.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from logger_config import get_logger
+from container_backend import TASK_IMAGE
+from config import NODE_ID, DOCKER_CPUS, DOCKER_MEMORY, RESULT_CACHE_SIZE, RESULT_CACHE_SHARED
+
+logger = get_logger("result_cache")
+
+# Directory of the shared index in the repository
+CACHE_PREFIX = "cache/results"
+
+# Result fields stored in an entry
+RESULT_FIELDS = ("exit_code", "stdout", "stderr", "stdout_bytes", "stderr_bytes")
+
+
+class ResultCache:
+    """Results of deterministic tasks, by content key: local LRU plus optional shared index."""
+
+    def __init__(self, git_handler=None, size=RESULT_CACHE_SIZE, shared=RESULT_CACHE_SHARED, node_id=NODE_ID):
+        """
+        Initialize the cache.
+
+        Args:
+            git_handler: GitHandler of the clone, to read the shared index
+            size: Entries kept in memory (least recently used evicted first)
+            shared: Read and write the shared index in the repository
+            node_id: Node recorded in the entries this worker creates
+        """
+        self.git_handler = git_handler
+        self.size = size
+        self.shared = shared and git_handler is not None
+        self.node_id = node_id
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Counters for the metrics endpoint
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(script, timeout, image=TASK_IMAGE):
+        """Content key of a task: sha256 of its image, script, timeout and limits."""
+        spec = {"image": image, "script": script, "timeout": timeout,
+                "cpus": DOCKER_CPUS, "memory": DOCKER_MEMORY, "pids": 10}
+        return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def path(key):
+        """Repository path of a key in the shared index."""
+        return f"{CACHE_PREFIX}/{key[:2]}/{key}.json"
+
+    def get(self, key):
+        """
+        Cached result of a key, from memory or (if shared) from HEAD.
+
+        Returns:
+            Result dict (exit_code, stdout, stderr, stdout_bytes,
+            stderr_bytes, cache_key, cached=True, cached_from), or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if entry is None and self.shared:
+            entry = self._read_shared(key)
+            if entry is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.shared_hits += 1
+                self._store(key, entry)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        result = {field: entry.get(field) for field in RESULT_FIELDS}
+        result.update(cache_key=key, cached=True, cached_from=entry.get("task_id"))
+        return result
+
+    def _read_shared(self, key):
+        try:
+            path = self.path(key)
+            content = self.git_handler.read_files(self.git_handler.get_head_commit(), [path]).get(path)
+            return json.loads(content) if content else None
+        except Exception as e:
+            logger.warning(f"Could not read shared cache entry {key[:12]}: {e}")
+            return None
+
+    def put(self, key, result, task_id):
+        """
+        Stores the result of a task that ran (skipped for timeouts and
+        worker-side errors, exit_code < 0).
+
+        Returns:
+            The entry (dict) if stored, None otherwise.
+        """
+        if result.get("cached") or result["exit_code"] < 0:
+            return None
+        entry = {field: result.get(field) for field in RESULT_FIELDS}
+        entry.update(key=key, task_id=task_id, node_id=self.node_id, created=datetime.utcnow().isoformat())
+        self._store(key, entry)
+        with self._lock:
+            self.stores += 1
+        return entry
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def shared_writes(self, result):
+        """
+        Shared index file to commit with a task result (see put()).
+
+        Returns:
+            Dict of path -> content, empty unless shared and the result was
+            computed (not a hit) and stored.
+        """
+        key = result.get("cache_key")
+        if not self.shared or not key or result.get("cached"):
+            return {}
+        with self._lock:
+            entry = self._entries.get(key)
+        return {self.path(key): json.dumps(entry, indent=2)} if entry else {}
+
+    def get_stats(self):
+        """
+        Get result cache statistics.
+
+        Returns:
+            dict: Entries, lookups split in hits (of which from the shared
+                  index) and misses, hit rate, stores, evictions
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size": self.size,
+                "shared": self.shared,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions
+            }
+
+
+def get_result_cache(git_handler=None):
+    """
+    Factory function to get the result cache of the process.
+
+    Args:
+        git_handler: GitHandler of the clone (for RESULT_CACHE_SHARED)
+
+    Returns:
+        ResultCache instance, or None if RESULT_CACHE_SIZE is 0.
+    """
+    if RESULT_CACHE_SIZE <= 0:
+        return None
+    return ResultCache(git_handler)
@@ -0,0 +1,173 @@
+"""
+D-GRID Shared Mirror Module
+Host-local bare mirror of the task repository, shared by every worker on the
+machine (SHARED_MIRROR_PATH on a volume mounted in all worker containers).
+Worker clones borrow its objects (git alternates) and fetch from it over the
+local filesystem, so a host with N workers fetches from the upstream
+repository once per refresh interval instead of N times. Only the process
+holding the refresh lock fetches; if it exits, the lock is released and
+another worker of the host takes over.
+"""
+import fcntl
+import os
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+from logger_config import get_logger
+
+logger = get_logger("shared_mirror")
+
+
+class SharedMirror:
+    """Bare mirror of the upstream branches, refreshed by one worker per host."""
+
+    def __init__(self, path, upstream_url, refresh_interval):
+        """
+        Initialize the mirror.
+
+        Args:
+            path: Directory of the bare mirror repository
+            upstream_url: URL to fetch from (with credentials, if any)
+            refresh_interval: Seconds between two upstream fetches
+        """
+        self.path = Path(path)
+        self.upstream_url = upstream_url
+        self.refresh_interval = refresh_interval
+        self._refresh_lock = None  # Open lock file while this process is the refresher
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.last_refresh = None
+
+    def _git(self, *args, cwd=None):
+        """Runs a git command in the mirror and returns stdout."""
+        result = subprocess.run(["git", *args], cwd=cwd or self.path, check=True, capture_output=True)
+        return result.stdout.decode().strip()
+
+    def _lock_path(self, name):
+        """Lock file next to the mirror (the mirror directory may not exist yet)."""
+        return self.path.parent / f".{self.path.name}.{name}.lock"
+
+    def objects_path(self):
+        """Object directory worker clones list in their alternates."""
+        return self.path / "objects"
+
+    def ensure(self):
+        """
+        Creates the mirror unless another worker of the host already did.
+        Creation is serialized by a lock file; the clone is built aside and
+        renamed into place, so a half-made mirror is never used.
+
+        Raises:
+            subprocess.CalledProcessError: If the upstream clone failed.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._lock_path("create"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if (self.path / "HEAD").exists():
+                return
+
+            logger.info(f"🪞 Creating shared mirror in {self.path}...")
+            building = self.path.with_name(self.path.name + ".tmp")
+            shutil.rmtree(building, ignore_errors=True)
+            self._git("clone", "--bare", "--quiet", self.upstream_url, str(building), cwd=self.path.parent)
+            # Branches only: heartbeat refs and pull requests are not needed
+            self._git("config", "remote.origin.fetch", "+refs/heads/*:refs/heads/*", cwd=building)
+            # Worker clones borrow these objects: never prune them
+            self._git("config", "gc.pruneExpire", "never", cwd=building)
+            os.rename(building, self.path)
+            logger.info("✅ Shared mirror ready.")
+
+    def is_refresher(self):
+        """True if this process holds the refresh lock of the host."""
+        return self._refresh_lock is not None
+
+    def _try_become_refresher(self):
+        """Takes the refresh lock if no other process of the host holds it."""
+        lock = open(self._lock_path("refresh"), "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return False
+        self._refresh_lock = lock
+        logger.info(f"🪞 This worker refreshes the shared mirror (every {self.refresh_interval}s)")
+        return True
+
+    def refresh(self):
+        """
+        Fetches the upstream branches into the mirror.
+
+        Returns:
+            True if success.
+        """
+        start = time.perf_counter()
+        try:
+            self._git("fetch", "--quiet", "--prune", "origin")
+            self.refreshes += 1
+            self.last_refresh = {"at": time.time(), "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+            return True
+        except subprocess.CalledProcessError as e:
+            self.refresh_failures += 1
+            logger.warning(f"Shared mirror refresh failed: {e.stderr.decode().strip()}")
+            return False
+
+    def start(self):
+        """Start the refresh thread (it only fetches while holding the refresh lock)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="shared-mirror", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """Refresh while holding the lock; otherwise retry taking it over."""
+        while not self._stop.is_set():
+            if self.is_refresher() or self._try_become_refresher():
+                self.refresh()
+            self._stop.wait(self.refresh_interval)
+
+    def stop(self, timeout=None):
+        """Stop the refresh thread and hand the refresh lock over."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self._refresh_lock:
+            self._refresh_lock.close()
+            self._refresh_lock = None
+
+    def get_stats(self):
+        """
+        Get mirror statistics.
+
+        Returns:
+            dict: Whether this worker refreshes the mirror, and refresh counts
+        """
+        return {
+            "path": str(self.path),
+            "refresher": self.is_refresher(),
+            "refresh_interval": self.refresh_interval,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "last_refresh": self.last_refresh
+        }
+
+
+def get_shared_mirror(upstream_url):
+    """
+    Factory function to get the host's shared mirror.
+
+    Args:
+        upstream_url: URL the mirror fetches from (with credentials, if any)
+
+    Returns:
+        SharedMirror, or None if SHARED_MIRROR_PATH is not set.
+    """
+    from config import SHARED_MIRROR_PATH, SHARED_MIRROR_REFRESH
+    if not SHARED_MIRROR_PATH:
+        return None
+    return SharedMirror(SHARED_MIRROR_PATH, upstream_url, SHARED_MIRROR_REFRESH)
@@ -0,0 +1,279 @@
+"""
+D-GRID State Index Module
+Worker-local SQLite index of the repository state: task paths and counts per
+status directory, and the registered nodes with their last heartbeat.
+After each pull it applies only the paths changed between the indexed HEAD
+and the new one, so the dashboard reads counts and liveness without listing
+tasks/completed, whatever its size. With HEARTBEAT_MODE=ref liveness comes
+from the refs/dgrid/heartbeat/<node_id> refs, fetched at most once per
+HEARTBEAT_INTERVAL (as often as they can move). The index is kept in the
+clone's git directory and survives restarts.
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path, PurePosixPath
+from logger_config import get_logger
+from config import HEARTBEAT_MODE, HEARTBEAT_INTERVAL
+
+logger = get_logger("state_index")
+
+TASK_DIRS = ("queue", "in_progress", "completed", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS tasks (path TEXT PRIMARY KEY, dir TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS tasks_by_dir ON tasks (dir, path);
+CREATE TABLE IF NOT EXISTS counts (dir TEXT PRIMARY KEY, n INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS nodes (node_id TEXT PRIMARY KEY, last_heartbeat TEXT, status TEXT);
+CREATE TABLE IF NOT EXISTS heartbeats (node_id TEXT PRIMARY KEY, last_heartbeat TEXT NOT NULL);
+"""
+
+
+def _task_dir(path):
+    """Status directory of a task path (tasks/<dir>/...json), or None."""
+    parts = PurePosixPath(path).parts
+    if len(parts) >= 3 and parts[0] == "tasks" and parts[1] in TASK_DIRS and path.endswith(".json"):
+        return parts[1]
+    return None
+
+
+def _node_id(path):
+    """Node ID of a node file path (nodes/<node_id>.json), or None."""
+    parts = PurePosixPath(path).parts
+    if len(parts) == 2 and parts[0] == "nodes" and path.endswith(".json"):
+        return parts[1][:-len(".json")]
+    return None
+
+
+class StateIndex:
+    """Task counts and node liveness, kept current from git diffs between HEADs."""
+
+    def __init__(self, git_handler, db_path, heartbeat_refs=False, heartbeat_interval=HEARTBEAT_INTERVAL):
+        """
+        Initialize the index (the database is created if missing).
+
+        Args:
+            git_handler: GitHandler of the clone to index
+            db_path: SQLite database file
+            heartbeat_refs: Also read liveness from the heartbeat refs
+                            (HEARTBEAT_MODE=ref, where node files only hold
+                            the registration)
+            heartbeat_interval: Minimum seconds between two fetches of the
+                                heartbeat refs
+        """
+        self.git_handler = git_handler
+        self.db_path = Path(db_path)
+        self.heartbeat_refs = heartbeat_refs
+        self.heartbeat_interval = heartbeat_interval
+        self._heartbeats_fetched = None  # Monotonic time of the last fetch attempt
+        self._lock = threading.Lock()  # Synced by the main loop, read by the web server
+        self._db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self.syncs = 0
+        self.rebuilds = 0
+        self.paths_applied = 0
+        self.heartbeat_fetches = 0
+
+    @property
+    def indexed_commit(self):
+        """HEAD the index reflects (None if never built)."""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'commit'").fetchone()
+        return row[0] if row else None
+
+    def sync(self):
+        """
+        Brings the index up to date with HEAD. The first call (or one whose
+        indexed commit is gone, e.g. after a history rewrite) builds it from
+        the tracked paths; later calls only apply the changed ones. Heartbeat
+        refs move without HEAD: they are fetched again once
+        heartbeat_interval has passed, not on every call.
+
+        Returns:
+            True if success.
+        """
+        try:
+            head = self.git_handler.get_head_commit()
+            indexed = self.indexed_commit
+            if indexed != head:
+                changes = None
+                if indexed is not None:
+                    try:
+                        changes = [(status, path) for status, path in self.git_handler.get_changed_paths(indexed, head)
+                                   if _task_dir(path) or _node_id(path)]
+                    except Exception as e:
+                        logger.warning(f"Incremental state index update failed ({e}), rebuilding...")
+
+                if changes is None:
+                    self._rebuild(head)
+                else:
+                    self._apply(changes, head)
+                self.syncs += 1
+
+            if self.heartbeat_refs and (self._heartbeats_fetched is None or
+                                        time.monotonic() - self._heartbeats_fetched >= self.heartbeat_interval):
+                self._sync_heartbeats()
+            return True
+        except Exception as e:
+            logger.error(f"Error syncing state index: {e}")
+            return False
+
+    def _sync_heartbeats(self):
+        """Replaces the heartbeat table with the committer dates of the heartbeat refs."""
+        self._heartbeats_fetched = time.monotonic()
+        self.heartbeat_fetches += 1
+        try:
+            heartbeats = self.git_handler.fetch_heartbeat_refs()
+        except Exception as e:
+            # Keep the last known heartbeats until the next sync
+            logger.warning(f"Could not fetch heartbeat refs: {e}")
+            return
+
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM heartbeats")
+            self._db.executemany("INSERT INTO heartbeats (node_id, last_heartbeat) VALUES (?, ?)",
+                                 heartbeats.items())
+
+    def _node_rows(self, commit, paths):
+        """(node_id, last_heartbeat, status) of node files at a commit."""
+        rows = []
+        for path, content in self.git_handler.read_files(commit, paths).items():
+            try:
+                data = json.loads(content)
+            except ValueError:
+                data = {}
+            rows.append((_node_id(path), data.get("last_heartbeat"), data.get("status")))
+        return rows
+
+    def _rebuild(self, head):
+        """Indexes every tracked task and node file at HEAD."""
+        tasks = [(path, _task_dir(path)) for path in self.git_handler.list_paths("tasks") if _task_dir(path)]
+        nodes = self._node_rows(head, [path for path in self.git_handler.list_paths("nodes") if _node_id(path)])
+
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM tasks")
+            self._db.execute("DELETE FROM counts")
+            self._db.execute("DELETE FROM nodes")
+            self._db.executemany("INSERT OR IGNORE INTO tasks (path, dir) VALUES (?, ?)", tasks)
+            self._db.execute("INSERT INTO counts (dir, n) SELECT dir, COUNT(*) FROM tasks GROUP BY dir")
+            self._db.executemany("INSERT INTO nodes (node_id, last_heartbeat, status) VALUES (?, ?, ?)", nodes)
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('commit', ?)", (head,))
+
+        self.rebuilds += 1
+        logger.info(f"State index built: {len(tasks)} task(s), {len(nodes)} node(s)")
+
+    def _apply(self, changes, head):
+        """Applies the (status, path) changes between the indexed HEAD and head."""
+        nodes = self._node_rows(head, [path for status, path in changes
+                                       if _node_id(path) and not status.startswith("D")])
+
+        with self._lock, self._db:
+            for status, path in changes:
+                task_dir = _task_dir(path)
+                if task_dir is None:
+                    if status.startswith("D"):
+                        self._db.execute("DELETE FROM nodes WHERE node_id = ?", (_node_id(path),))
+                    continue
+
+                if status.startswith("D"):
+                    delta = -self._db.execute("DELETE FROM tasks WHERE path = ?", (path,)).rowcount
+                else:
+                    delta = self._db.execute("INSERT OR IGNORE INTO tasks (path, dir) VALUES (?, ?)",
+                                             (path, task_dir)).rowcount
+                if delta:
+                    self._db.execute("INSERT INTO counts (dir, n) VALUES (?, ?) "
+                                     "ON CONFLICT (dir) DO UPDATE SET n = n + excluded.n", (task_dir, delta))
+
+            self._db.executemany("INSERT OR REPLACE INTO nodes (node_id, last_heartbeat, status) VALUES (?, ?, ?)",
+                                 nodes)
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('commit', ?)", (head,))
+
+        self.paths_applied += len(changes)
+        if changes:
+            logger.debug(f"State index updated: {len(changes)} change(s)")
+
+    def task_counts(self):
+        """
+        Number of tasks per status directory, without listing any of them.
+
+        Returns:
+            dict: {"queue": n, "in_progress": n, "completed": n, "failed": n}
+        """
+        with self._lock:
+            counts = dict(self._db.execute("SELECT dir, n FROM counts").fetchall())
+        return {task_dir: counts.get(task_dir, 0) for task_dir in TASK_DIRS}
+
+    def task_paths(self, task_dir, limit=None):
+        """
+        Task paths of a status directory, in path order.
+
+        Args:
+            task_dir: One of TASK_DIRS
+            limit: Maximum number of paths (None = all)
+
+        Returns:
+            list: Repository-relative task paths
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT path FROM tasks WHERE dir = ? ORDER BY path LIMIT ?",
+                                    (task_dir, -1 if limit is None else limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def nodes(self):
+        """
+        Registered nodes with their last heartbeat: the later of the one in
+        their node file and their heartbeat ref's (see heartbeat_refs).
+
+        Returns:
+            dict: node_id -> {"last_heartbeat": ..., "status": ...}
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT n.node_id, NULLIF(MAX(COALESCE(n.last_heartbeat, ''), COALESCE(h.last_heartbeat, '')), ''), "
+                "n.status FROM nodes n LEFT JOIN heartbeats h ON h.node_id = n.node_id ORDER BY n.node_id"
+            ).fetchall()
+        return {node_id: {"last_heartbeat": last_heartbeat, "status": status}
+                for node_id, last_heartbeat, status in rows}
+
+    def get_stats(self):
+        """
+        Get index statistics.
+
+        Returns:
+            dict: Indexed commit, counts, sync/rebuild totals and heartbeat
+                  ref fetches
+        """
+        indexed = self.indexed_commit
+        return {
+            "indexed_commit": indexed[:8] if indexed else None,
+            "tasks": self.task_counts(),
+            "syncs": self.syncs,
+            "rebuilds": self.rebuilds,
+            "paths_applied": self.paths_applied,
+            "heartbeat_fetches": self.heartbeat_fetches
+        }
+
+    def close(self):
+        """Closes the database."""
+        with self._lock:
+            self._db.close()
+
+
+def get_state_index(git_handler):
+    """
+    Factory function to get the state index of a clone.
+
+    Args:
+        git_handler: Initialized GitHandler
+
+    Returns:
+        StateIndex, or None if the database could not be opened.
+    """
+    try:
+        return StateIndex(git_handler, Path(git_handler.repo.git_dir) / "dgrid-state.sqlite3",
+                          heartbeat_refs=HEARTBEAT_MODE == "ref")
+    except Exception as e:
+        logger.warning(f"State index unavailable: {e}")
+        return None
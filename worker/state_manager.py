@@ -3,21 +3,37 @@ D-GRID State Manager Module
 Manages node registration and heartbeats.
 """
 import json
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 from pathlib import Path
 from logger_config import get_logger
-from config import NODE_ID, get_node_specs
+from git_writer import Mutation
+from config import NODE_ID, HEARTBEAT_INTERVAL, HEARTBEAT_MODE, get_node_specs
 
 logger = get_logger("state_manager")
 
 class StateManager:
     """Manager per lo stato dei nodi e gli heartbeat."""
     
-    def __init__(self, git_handler):
+    def __init__(self, git_handler, node_id=NODE_ID):
         self.git_handler = git_handler
+        self.node_id = node_id
         self.repo_path = git_handler.get_repo_path()
         self.nodes_dir = self.repo_path / "nodes"
-        self.node_file = self.nodes_dir / f"{NODE_ID}.json"
+        self.node_file = self.nodes_dir / f"{node_id}.json"
+        self.node_path = f"nodes/{node_id}.json"
+        
+        # Heartbeat coalescing: any claim/result commit carries the heartbeat,
+        # a standalone heartbeat commit is pushed only if none did.
+        # In "ref" mode liveness goes to refs/dgrid/heartbeat/<node> instead
+        # and never touches the main branch.
+        self.heartbeat_interval = HEARTBEAT_INTERVAL
+        self.heartbeat_mode = HEARTBEAT_MODE
+        self.last_heartbeat = 0.0  # Epoch of the last pushed heartbeat
+        self._standalone = False
+        self.heartbeats_sent = 0
+        self.heartbeats_piggybacked = 0
+        git_handler.add_piggyback(self)
     
     def register_node(self):
         """
@@ -27,21 +43,22 @@ class StateManager:
         try:
             self.nodes_dir.mkdir(parents=True, exist_ok=True)
             
-            specs = get_node_specs()
+            specs = get_node_specs(self.node_id)
             specs["last_heartbeat"] = datetime.utcnow().isoformat()
             specs["status"] = "active"
             
-            with open(self.node_file, "w") as f:
-                json.dump(specs, f, indent=2)
+            # Il file viene scritto dal git writer, nello stesso commit del push
+            future = self.git_handler.get_writer().submit(Mutation(
+                f"[D-GRID] Registrazione nodo {self.node_id}",
+                writes={self.node_path: json.dumps(specs, indent=2)},
+                node_id=self.node_id
+            ))
             
             logger.info(f"Nodo registrato: {self.node_file}")
             logger.debug(f"Specs: {json.dumps(specs, indent=2)}")
             
             # Commit e push
-            if self.git_handler.commit_and_push(
-                f"[D-GRID] Registrazione nodo {NODE_ID}",
-                paths=[str(self.node_file)]
-            ):
+            if future.result():
                 logger.info("Registrazione nodo pushata.")
                 return True
             else:
@@ -51,31 +68,106 @@ class StateManager:
             logger.error(f"Errore nella registrazione del nodo: {e}")
             return False
     
-    def send_heartbeat(self):
+    def _heartbeat_data(self):
+        """Contenuto del file del nodo con il timestamp aggiornato."""
+        with open(self.node_file, "r") as f:
+            data = json.load(f)
+        
+        data["last_heartbeat"] = datetime.utcnow().isoformat()
+        data["status"] = "active"
+        return data
+    
+    def _write_heartbeat(self):
+        """Aggiorna il timestamp nel file del nodo (senza commit)."""
+        data = self._heartbeat_data()
+        with open(self.node_file, "w") as f:
+            json.dump(data, f, indent=2)
+    
+    def _file_heartbeat(self):
+        """Epoch del timestamp attualmente scritto nel file del nodo (0 se assente)."""
+        try:
+            with open(self.node_file, "r") as f:
+                stamp = json.load(f)["last_heartbeat"]
+            return datetime.fromisoformat(stamp).replace(tzinfo=timezone.utc).timestamp()
+        except Exception:
+            return 0.0
+    
+    def seconds_until_heartbeat(self):
+        """Secondi mancanti al prossimo heartbeat dovuto (0 se già dovuto)."""
+        return max(0.0, self.last_heartbeat + self.heartbeat_interval - time.time())
+    
+    def piggyback_paths(self):
         """
-        Aggiorna semplicemente il timestamp nel file del nodo (heartbeat).
+        Called by GitHandler before any commit: once half the interval has
+        passed, the heartbeat rides along with the claim/result commit.
+        A fresh heartbeat written but not pushed yet (e.g. by a commit being
+        retried) is reused rather than rewritten.
+        
+        Returns:
+            list: Paths to add to the commit (empty if no heartbeat needed)
+        """
+        if self.heartbeat_mode == "ref" or self._standalone or not self.node_file.exists():
+            return []
+        
+        now = time.time()
+        written = self._file_heartbeat()
+        if written <= self.last_heartbeat or now - written >= self.heartbeat_interval / 2:
+            if now - self.last_heartbeat < self.heartbeat_interval / 2:
+                return []
+            try:
+                self._write_heartbeat()
+            except Exception as e:
+                logger.warning(f"Impossibile aggiungere l'heartbeat al commit: {e}")
+                return []
+        
+        return [self.node_path]
+    
+    def piggyback_pushed(self):
+        """Called by GitHandler after a successful push."""
+        pushed = self._file_heartbeat()
+        if pushed <= self.last_heartbeat:
+            return
+        
+        self.last_heartbeat = pushed
+        if self._standalone:
+            self.heartbeats_sent += 1
+        else:
+            self.heartbeats_piggybacked += 1
+            logger.debug(f"Heartbeat di {self.node_id} incluso nel commit")
+    
+    def send_heartbeat(self, force=False):
+        """
+        Invia un heartbeat con un commit dedicato, solo se nessun altro
+        commit lo ha già trasportato nell'ultimo HEARTBEAT_INTERVAL.
+        
+        Args:
+            force: Invia comunque (es. allo shutdown)
         """
         try:
             if not self.node_file.exists():
                 logger.warning(f"File del nodo non esiste: {self.node_file}, registrando...")
                 return self.register_node()
             
-            with open(self.node_file, "r") as f:
-                data = json.load(f)
-            
-            data["last_heartbeat"] = datetime.utcnow().isoformat()
-            data["status"] = "active"
+            if not force and self.seconds_until_heartbeat() > 0:
+                logger.debug("Heartbeat già trasportato da un altro commit, salto.")
+                return True
             
-            with open(self.node_file, "w") as f:
-                json.dump(data, f, indent=2)
+            if self.heartbeat_mode == "ref":
+                return self._send_heartbeat_ref()
             
-            logger.debug(f"Heartbeat inviato per {NODE_ID}")
+            mutation = Mutation(
+                f"[D-GRID] Heartbeat da {self.node_id}",
+                writes={self.node_path: json.dumps(self._heartbeat_data(), indent=2)},
+                node_id=self.node_id
+            )
+            self._standalone = True
+            try:
+                pushed = self.git_handler.get_writer().submit(mutation).result()
+            finally:
+                self._standalone = False
             
-            # Commit e push
-            if self.git_handler.commit_and_push(
-                f"[D-GRID] Heartbeat da {NODE_ID}",
-                paths=[str(self.node_file)]
-            ):
+            logger.debug(f"Heartbeat inviato per {self.node_id}")
+            if pushed:
                 return True
             else:
                 logger.error("Errore nel push dell'heartbeat.")
@@ -84,6 +176,34 @@ class StateManager:
             logger.error(f"Errore nell'invio dell'heartbeat: {e}")
             return False
     
+    def _send_heartbeat_ref(self):
+        """
+        Heartbeat fuori banda: force-push di refs/dgrid/heartbeat/<node>.
+        Il file del nodo non viene modificato, quindi il main branch resta
+        libero per claim e risultati.
+        """
+        now = time.time()
+        self.git_handler.push_heartbeat_ref(self.node_id, self._heartbeat_data())
+        self._heartbeat_ref_sent(now)
+        logger.debug(f"Heartbeat ref aggiornato per {self.node_id}")
+        return True
+    
+    def _heartbeat_ref_sent(self, now):
+        """Registra un heartbeat ref pushato (anche insieme ad altri nodi)."""
+        self.last_heartbeat = now
+        self.heartbeats_sent += 1
+    
+    def get_heartbeat_stats(self):
+        """Statistiche heartbeat per l'health summary."""
+        return {
+            "mode": self.heartbeat_mode,
+            "interval": self.heartbeat_interval,
+            "sent_alone": self.heartbeats_sent,
+            "piggybacked": self.heartbeats_piggybacked,
+            "seconds_since_last": round(time.time() - self.last_heartbeat, 1) if self.last_heartbeat else None,
+            "last_heartbeat": datetime.utcfromtimestamp(self.last_heartbeat).isoformat() if self.last_heartbeat else None
+        }
+    
     def get_node_status(self):
         """Ritorna lo stato corrente del nodo."""
         try:
@@ -95,3 +215,29 @@ class StateManager:
         except Exception as e:
             logger.error(f"Errore nella lettura dello stato del nodo: {e}")
             return None
+
+
+def send_heartbeat_refs(state_managers):
+    """
+    Heartbeat fuori banda di più nodi logici (supervisor) con un solo push
+    di tutti i loro refs/dgrid/heartbeat/<node>.
+    
+    Args:
+        state_managers: StateManager in modalità "ref", già registrati
+    
+    Returns:
+        True se il push è riuscito.
+    """
+    if not state_managers:
+        return True
+    try:
+        now = time.time()
+        payloads = {manager.node_id: manager._heartbeat_data() for manager in state_managers}
+        state_managers[0].git_handler.push_heartbeat_refs(payloads)
+        for manager in state_managers:
+            manager._heartbeat_ref_sent(now)
+        logger.debug(f"Heartbeat ref aggiornati per {len(payloads)} nodi")
+        return True
+    except Exception as e:
+        logger.error(f"Errore nell'invio degli heartbeat: {e}")
+        return False
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+"""
+D-GRID Worker Supervisor - Entry Point
+Hosts SUPERVISOR_NODES logical worker nodes (SUPERVISOR_NODE_IDS) in a single
+process instead of one main.py per node: the nodes share the clone, the pull
+of each interval, the git writer and the dashboard on port 8000, while each
+one keeps its own heartbeat, in-progress claims and MAX_PARALLEL_TASKS slots.
+"""
+from main import run
+from config import SUPERVISOR_NODE_IDS
+
+
+if __name__ == "__main__":
+    run(SUPERVISOR_NODE_IDS)
@@ -0,0 +1,177 @@
+"""
+D-GRID Parallel Task Executor Module
+Implements #7: Parallel execution (MAX_PARALLEL_TASKS).
+Keeps up to N tasks in flight, each one in its own slot/container.
+"""
+import threading
+import time
+from logger_config import get_logger
+
+logger = get_logger("task_executor")
+
+
+class ParallelExecutor:
+    """Slot-based executor that runs up to max_slots tasks concurrently."""
+
+    def __init__(self, max_slots, task_fn, next_task_fn=None, slot_freed=None):
+        """
+        Initialize the executor.
+
+        Args:
+            max_slots: Maximum number of tasks in flight (MAX_PARALLEL_TASKS)
+            task_fn: Callable executed in the slot thread as task_fn(task_file, prepared)
+            next_task_fn: Optional callable returning the next (task_file, prepared)
+                          to chain into the same slot without waiting for the
+                          main loop, or None when nothing is ready (prefetch)
+            slot_freed: threading.Event set when a slot is released, which
+                        the main loop waits on; shared by several executors,
+                        so one wait wakes on any of their slots (supervisor)
+        """
+        self.max_slots = max(1, int(max_slots))
+        self.task_fn = task_fn
+        self.next_task_fn = next_task_fn
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._slot_freed = slot_freed or threading.Event()
+        self._started_at = time.monotonic()
+
+        # Per-slot bookkeeping: current task, start time, accumulated busy time
+        self._slots = [
+            {
+                "task": None,
+                "thread": None,
+                "busy_since": None,
+                "busy_seconds": 0.0,
+                "tasks_completed": 0
+            }
+            for _ in range(self.max_slots)
+        ]
+
+    def free_slots(self):
+        """Returns the number of idle slots."""
+        with self._lock:
+            return sum(1 for slot in self._slots if slot["task"] is None)
+
+    def busy_slots(self):
+        """Returns the number of slots currently running a task."""
+        return self.max_slots - self.free_slots()
+
+    def submit(self, task_file, prepared=None):
+        """
+        Start a task in the first idle slot.
+
+        Args:
+            task_file: Path of the acquired task (in tasks/in_progress)
+            prepared: Optional output of TaskRunner.prepare_task()
+
+        Returns:
+            bool: True if the task was started, False if all slots are busy
+        """
+        with self._lock:
+            for slot_id, slot in enumerate(self._slots):
+                if slot["task"] is not None:
+                    continue
+
+                thread = threading.Thread(
+                    target=self._run_slot,
+                    args=(slot_id, task_file, prepared),
+                    name=f"dgrid-slot-{slot_id}",
+                    daemon=True
+                )
+                slot["task"] = task_file
+                slot["thread"] = thread
+                slot["busy_since"] = time.monotonic()
+                thread.start()
+                logger.info(f"Slot {slot_id}: started {task_file.name} ({self._busy_count()}/{self.max_slots} busy)")
+                return True
+
+        logger.debug(f"No free slot for {task_file.name}")
+        return False
+
+    def _busy_count(self):
+        """Busy slot count (caller must hold the lock)."""
+        return sum(1 for slot in self._slots if slot["task"] is not None)
+
+    def _run_slot(self, slot_id, task_file, prepared):
+        """Slot thread body: runs tasks until nothing is ready, then releases the slot."""
+        while task_file is not None:
+            try:
+                self.task_fn(task_file, prepared)
+            except Exception as e:
+                logger.error(f"Slot {slot_id}: unhandled error running {task_file.name}: {e}", exc_info=True)
+
+            next_task = None
+            if self.next_task_fn and not self._stopping:
+                try:
+                    next_task = self.next_task_fn()
+                except Exception as e:
+                    logger.error(f"Slot {slot_id}: error fetching next task: {e}")
+
+            with self._lock:
+                slot = self._slots[slot_id]
+                now = time.monotonic()
+                slot["busy_seconds"] += now - slot["busy_since"]
+                slot["tasks_completed"] += 1
+                if next_task is not None:
+                    task_file, prepared = next_task
+                    slot["task"] = task_file
+                    slot["busy_since"] = now
+                    logger.info(f"Slot {slot_id}: chained prefetched task {task_file.name}")
+                else:
+                    task_file = None
+                    slot["task"] = None
+                    slot["thread"] = None
+                    slot["busy_since"] = None
+
+        self._slot_freed.set()
+        logger.debug(f"Slot {slot_id}: released")
+
+    def shutdown(self, wait=True, timeout=None):
+        """
+        Stop accepting work and optionally wait for in-flight tasks.
+
+        Args:
+            wait: If True, join all running slot threads
+            timeout: Maximum seconds to wait per slot (None = no limit)
+        """
+        self._stopping = True
+        with self._lock:
+            threads = [slot["thread"] for slot in self._slots if slot["thread"] is not None]
+
+        if not wait or not threads:
+            return
+
+        logger.info(f"Waiting for {len(threads)} in-flight task(s) to finish...")
+        for thread in threads:
+            thread.join(timeout)
+
+    def get_utilization(self):
+        """
+        Per-slot utilization since the executor started.
+        Used to size MAX_PARALLEL_TASKS from real data.
+
+        Returns:
+            dict: Overall and per-slot busy ratio and completed task counts
+        """
+        now = time.monotonic()
+        elapsed = max(now - self._started_at, 1e-9)
+        slots = []
+
+        with self._lock:
+            for slot_id, slot in enumerate(self._slots):
+                busy = slot["busy_seconds"]
+                if slot["busy_since"] is not None:
+                    busy += now - slot["busy_since"]
+                slots.append({
+                    "slot": slot_id,
+                    "busy": slot["task"] is not None,
+                    "utilization": round(busy / elapsed, 3),
+                    "tasks_completed": slot["tasks_completed"]
+                })
+
+        return {
+            "max_slots": self.max_slots,
+            "busy_slots": sum(1 for s in slots if s["busy"]),
+            "utilization": round(sum(s["utilization"] for s in slots) / self.max_slots, 3),
+            "slots": slots
+        }
@@ -0,0 +1,102 @@
+"""
+D-GRID Task Prefetch Module
+Pipelines task acquisition with execution: task N+1 is claimed, read and
+signature-checked while task N is still running in Docker.
+"""
+import threading
+from collections import deque
+from logger_config import get_logger
+
+logger = get_logger("task_prefetch")
+
+
+class TaskPrefetcher:
+    """Bounded buffer of claimed and verified tasks waiting for a free slot."""
+
+    def __init__(self, task_runner, depth):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            task_runner: TaskRunner used to prepare and release tasks
+            depth: Maximum number of claimed-but-not-started tasks (lookahead)
+        """
+        self.task_runner = task_runner
+        self.depth = max(0, int(depth))
+        self._ready = deque()
+        self._lock = threading.Lock()
+
+        # Counters: slots that found a ready task vs. slots that went idle
+        self.hits = 0
+        self.misses = 0
+
+    def capacity(self):
+        """Returns how many more tasks may be prefetched."""
+        with self._lock:
+            return max(0, self.depth - len(self._ready))
+
+    def size(self):
+        """Returns the number of prefetched tasks waiting for a slot."""
+        with self._lock:
+            return len(self._ready)
+
+    def prepare(self, task_file):
+        """
+        Reads and verifies a freshly claimed task.
+
+        Returns:
+            dict: Output of TaskRunner.prepare_task()
+        """
+        return self.task_runner.prepare_task(task_file)
+
+    def add(self, task_file, prepared):
+        """Queue a prepared task for the next free slot."""
+        with self._lock:
+            self._ready.append((task_file, prepared))
+        logger.debug(f"Prefetched {task_file.name} ({len(self._ready)}/{self.depth})")
+
+    def pop(self):
+        """
+        Take the next prepared task, if any.
+        Called by executor slots as soon as their current task finishes.
+
+        Returns:
+            tuple: (task_file, prepared) or None if nothing is ready
+        """
+        with self._lock:
+            if self._ready:
+                self.hits += 1
+                return self._ready.popleft()
+            self.misses += 1
+            return None
+
+    def release_all(self):
+        """
+        Return every prefetched or batch-claimed (never started) task to the
+        queue in one commit. Used at shutdown so a stopping worker does not
+        hoard tasks.
+
+        Returns:
+            int: Number of tasks released
+        """
+        with self._lock:
+            pending = list(self._ready)
+            self._ready.clear()
+
+        released = self.task_runner.release_tasks([task_file for task_file, _ in pending])
+
+        if pending:
+            logger.info(f"Released {released}/{len(pending)} prefetched task(s) back to queue")
+        return released
+
+    def get_stats(self):
+        """Prefetch statistics for the health summary."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "depth": self.depth,
+                "ready": len(self._ready),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
@@ -3,26 +3,80 @@ D-GRID Task Runner Module
 Manages task recognition, execution, and reporting.
 """
 import json
-import subprocess
+import math
+import time
+from collections import deque
 from datetime import datetime
-from pathlib import Path
+from itertools import groupby
+from pathlib import PurePosixPath
 from logger_config import get_logger
-from config import NODE_ID, DOCKER_CPUS, DOCKER_MEMORY, DOCKER_TIMEOUT
+from git_handler import PushRejectedError
+from git_writer import Mutation
+from result_branch import ResultMutation
+from task_selection import TaskSelector
+from task_sharding import TaskSharding, QueueIndex
+from container_backend import TASK_IMAGE, TASK_LABEL, NODE_LABEL, ContainerTimeout, get_container_backend
+from output_capture import get_output_captures
+from result_cache import get_result_cache
+from config import (NODE_ID, MAX_PARALLEL_TASKS, PULL_INTERVAL, BATCH_CLAIM_MAX,
+                    TASK_SELECTION_STRATEGY, TASK_SELECTION_WINDOW,
+                    QUEUE_SHARD_TARGET, QUEUE_SHARD_MIN_DIGITS, QUEUE_SHARD_MAX_DIGITS,
+                    RESULT_MODE)
 
 logger = get_logger("task_runner")
 
+QUEUE_PREFIX = "tasks/queue"
+
 
 class TaskRunner:
     """Runner for task execution."""
     
-    def __init__(self, git_handler):
+    def __init__(self, git_handler, node_id=NODE_ID, queue_index=None, container_pool=None, container_backend=None,
+                 result_cache=None):
+        """
+        Initialize the runner.
+        
+        Args:
+            git_handler: GitHandler of the (possibly shared) clone
+            node_id: Node the claims and results belong to
+            queue_index: QueueIndex shared by the nodes of a supervisor
+                         (a new one if None)
+            container_pool: ContainerPool of the process, or None to start a
+                            container per task with 'docker run'
+            container_backend: Container backend (the pool's, or a new
+                               DOCKER_BACKEND one if None)
+            result_cache: ResultCache shared by the nodes of the process
+                          (a new one if None, unless RESULT_CACHE_SIZE is 0)
+        """
         self.git_handler = git_handler
+        self.container_pool = container_pool
+        self.container_backend = (container_backend or (container_pool.backend if container_pool else None)
+                                  or get_container_backend())
+        self.result_cache = result_cache or get_result_cache(git_handler)
+        self.node_id = node_id
         self.repo_path = git_handler.get_repo_path()
         self.queue_dir = self.repo_path / "tasks" / "queue"
         self.in_progress_dir = self.repo_path / "tasks" / "in_progress"
         self.completed_dir = self.repo_path / "tasks" / "completed"
         self.failed_dir = self.repo_path / "tasks" / "failed"
         
+        # Recent execution times, used to size batch claims
+        self.recent_durations = deque(maxlen=20)
+        
+        # Spread nodes across the queue instead of racing for the same file
+        self.task_selector = TaskSelector(node_id, TASK_SELECTION_STRATEGY, TASK_SELECTION_WINDOW)
+        self.claim_attempts = 0
+        self.claim_conflicts = 0
+        self.tasks_claimed = 0
+        
+        # Sharded priority queue (#1) behind an in-memory index, kept current
+        # from git diffs between HEADs instead of rescanning the shards
+        self.sharding = TaskSharding(self.queue_dir, QUEUE_SHARD_MIN_DIGITS)
+        self.queue_index = queue_index or QueueIndex(QUEUE_PREFIX)
+        self._claimed_from = {}  # in_progress file name -> original queue path
+        self.reshard_migrations = 0
+        self.reshard_conflicts = 0
+        
         # Initialize task signing (#9: Task Signing & Verification)
         self.task_signer = None
         try:
@@ -41,82 +95,312 @@ class TaskRunner:
         Returns:
             Path of the task in in_progress, or None if no task available.
         """
+        claimed = self.claim_tasks(1)
+        return claimed[0] if claimed else None
+    
+    def claim_tasks(self, max_count):
+        """
+        Batch acquisition: moves up to max_count tasks from tasks/queue to
+        tasks/in_progress/{node_id}-* with 'git mv' and claims all of them
+        with a single commit and push.
+        
+        Args:
+            max_count: Maximum number of tasks to claim (see get_batch_size()).
+        
+        Returns:
+            List of task paths in in_progress (empty if nothing was claimed).
+        """
         try:
-            if not self.queue_dir.exists():
-                logger.debug("Queue directory does not exist.")
-                return None
+            if max_count < 1:
+                return []
             
-            # Iterate files in queue
-            tasks = sorted([f for f in self.queue_dir.iterdir() if f.is_file()])
-            if not tasks:
-                logger.debug("No tasks available in queue.")
-                return None
+            # Select under the repo lock so the index matches HEAD; the moves
+            # are applied by the git writer, in the same commit as whatever
+            # else (results, heartbeat) is pending
+            with self.git_handler.lock:
+                self._sync_queue_index()
+                if not len(self.queue_index):
+                    logger.debug("No tasks available in queue.")
+                    return []
+                
+                # Pick tasks according to priority, then the selection strategy
+                task_paths = self._select_tasks(max_count)
             
-            # Pick the first task
-            task_file = tasks[0]
-            task_name = task_file.name
+            logger.info(f"Attempting to acquire {len(task_paths)} task(s): "
+                        f"{', '.join(PurePosixPath(path).name for path in task_paths)}")
             
-            logger.info(f"Attempting to acquire task: {task_name}")
+            # One mutation per task: a task taken by another node meanwhile
+            # only drops its own claim, not the whole batch
+            writer = self.git_handler.get_writer()
+            pending = []
+            for src in task_paths:
+                task_name = PurePosixPath(src).name
+                dst = f"tasks/in_progress/{self.node_id}-{task_name}"
+                mutation = Mutation(f"[D-GRID] {self.node_id} acquires task {task_name}", moves=[(src, dst)],
+                                    node_id=self.node_id)
+                pending.append((src, task_name, writer.submit(mutation)))
             
-            # Move file from queue to in_progress using git mv
-            src = f"tasks/queue/{task_name}"
-            dst = f"tasks/in_progress/{NODE_ID}-{task_name}"
+            # Wait for the push: first to push wins
+            self.claim_attempts += 1
+            claimed = []
+            lost = 0
+            for src, task_name, future in pending:
+                try:
+                    future.result()
+                except PushRejectedError as e:
+                    # Lost the race: the writer already synced with the remote,
+                    # the selector picks other tasks next time
+                    lost += 1
+                    logger.debug(f"Claim of {task_name} rejected: {e}")
+                    continue
+                except Exception as e:
+                    # Counted as lost too: the claims already pushed must
+                    # still be run (or released), so keep going
+                    lost += 1
+                    logger.warning(f"Claim of {task_name} failed: {e}")
+                    continue
+                self._claimed_from[f"{self.node_id}-{task_name}"] = src
+                claimed.append(self.in_progress_dir / f"{self.node_id}-{task_name}")
             
-            if self.git_handler.move_file(src, dst):
-                # Atomic commit and push - first to push wins
-                if self.git_handler.commit_and_push(
-                    f"[D-GRID] {NODE_ID} acquires task {task_name}",
-                    paths=[src, dst]
-                ):
-                    logger.info(f"Task acquired: {NODE_ID}-{task_name}")
-                    return self.in_progress_dir / f"{NODE_ID}-{task_name}"
-                else:
-                    logger.warning(f"Failed to push task acquisition for {task_name}, retrying...")
-                    return None
-            else:
-                logger.warning(f"Failed to move task {task_name}")
-                return None
+            if lost:
+                self.claim_conflicts += 1
+                logger.warning(f"Acquisition conflict for {lost} of {len(pending)} task(s)")
+            
+            self.tasks_claimed += len(claimed)
+            if claimed:
+                logger.info(f"Acquired {len(claimed)} task(s)")
+            return claimed
         except Exception as e:
             logger.error(f"Error finding/acquiring task: {e}")
-            return None
+            return []
     
-    def execute_task(self, task_file):
+    def _sync_queue_index(self):
         """
-        Reads the task file and executes the command in an isolated Docker container.
+        Brings the queue index up to date with HEAD.
+        The first call builds it from the tracked queue paths; later calls
+        only apply the paths changed between the indexed HEAD and the
+        current one (pulls, our own claims/releases, resets).
+        """
+        head = self.git_handler.get_head_commit()
+        if self.queue_index.indexed_commit == head:
+            return
         
-        SECURITY: The container is executed with:
-        - --network=none: No network access
-        - --read-only: Read-only filesystem
-        - --rm: Automatic cleanup
-        - CPU and memory limits
+        if self.queue_index.indexed_commit is None:
+            self.queue_index.build(self.git_handler.list_paths(QUEUE_PREFIX), head)
+            return
+        
+        try:
+            changes = self.git_handler.get_changed_paths(self.queue_index.indexed_commit, head, QUEUE_PREFIX)
+            self.queue_index.apply_changes(changes, head)
+            if changes:
+                logger.debug(f"Queue index updated: {len(changes)} change(s), {len(self.queue_index)} queued")
+        except Exception as e:
+            # e.g. the indexed commit is gone after a history rewrite
+            logger.warning(f"Incremental queue index update failed ({e}), rebuilding...")
+            self.queue_index.build(self.git_handler.list_paths(QUEUE_PREFIX), head)
+    
+    def _select_tasks(self, max_count):
+        """
+        Chooses up to max_count queued task paths: highest priority first,
+        and within one priority level the selection strategy spreads nodes.
+        """
+        candidates = self.queue_index.candidates(max(TASK_SELECTION_WINDOW, max_count))
+        selected = []
+        for _, group in groupby(candidates, key=self.queue_index.priority_of):
+            selected += self.task_selector.select(list(group), max_count - len(selected))
+            if len(selected) >= max_count:
+                break
+        return selected
+    
+    def rebalance_queue_shards(self):
+        """
+        Splits or merges the queue shards when queue depth crosses
+        QUEUE_SHARD_TARGET tasks per shard (#1: Task Sharding).
+        The check is O(1); a migration renames every queued task and the
+        layout file in a single commit, so nodes never see a half-migrated
+        queue. If another node pushed first (a claim or the same migration)
+        the commit is dropped and the check runs again next cycle.
+        
+        Returns:
+            True if the queue was migrated, False otherwise.
+        """
+        try:
+            with self.git_handler.lock:
+                self._sync_queue_index()
+                current = self.sharding.load_layout()
+                target = TaskSharding.plan_fanout(current, len(self.queue_index), QUEUE_SHARD_TARGET,
+                                                  QUEUE_SHARD_MIN_DIGITS, QUEUE_SHARD_MAX_DIGITS)
+                if target == current:
+                    return False
+                
+                renames = self.sharding.migration_plan(self.queue_index.paths(), target, QUEUE_PREFIX)
+                logger.info(f"🔀 Resharding queue: {self.sharding.bucket_count(current)} -> "
+                            f"{self.sharding.bucket_count(target)} shards per priority "
+                            f"({len(self.queue_index)} queued, {len(renames)} renames)")
+                
+                layout_file = self.sharding.write_layout(target)
+                try:
+                    self.git_handler.commit_renames(
+                        renames,
+                        f"[D-GRID] {self.node_id} reshards queue to {self.sharding.bucket_count(target)} shards per priority",
+                        extra_paths=[str(layout_file.relative_to(self.repo_path))]
+                    )
+                except PushRejectedError as e:
+                    self.sharding.shard_digits = current
+                    self.reshard_conflicts += 1
+                    logger.warning(f"Resharding lost the race, will retry: {e}")
+                    return False
+                
+                self.reshard_migrations += 1
+                self._sync_queue_index()
+                logger.info("✅ Queue resharded")
+                return True
+        except Exception as e:
+            self.sharding.load_layout()
+            logger.error(f"Error resharding queue: {e}")
+            return False
+    
+    def get_queue_stats(self):
+        """Queue depth and shard layout, from the index (no directory scan)."""
+        stats = self.queue_index.get_stats()
+        stats.update({
+            "shards_per_priority": self.sharding.bucket_count(),
+            "reshard_migrations": self.reshard_migrations,
+            "reshard_conflicts": self.reshard_conflicts
+        })
+        return stats
+    
+    def get_acquisition_stats(self):
+        """Acquisition counters, used to measure contention between nodes."""
+        return {
+            "strategy": self.task_selector.strategy,
+            "claim_attempts": self.claim_attempts,
+            "claim_conflicts": self.claim_conflicts,
+            "conflict_rate": round(self.claim_conflicts / self.claim_attempts, 3) if self.claim_attempts else 0.0,
+            "tasks_claimed": self.tasks_claimed
+        }
+    
+    def record_task_duration(self, seconds):
+        """Records how long a task took to run (feeds get_batch_size())."""
+        self.recent_durations.append(seconds)
+    
+    def get_batch_size(self, free_slots, lookahead):
+        """
+        Adaptive batch size K for claim_tasks().
+        
+        K covers the idle slots plus enough lookahead to keep every slot busy
+        until the next poll: short tasks drain the slots many times per
+        PULL_INTERVAL, long tasks need at most one task ready per cycle.
+        
+        Args:
+            free_slots: Idle executor slots.
+            lookahead: How many claimed-but-not-started tasks may still be held.
+        
+        Returns:
+            int: Number of tasks to claim (0..BATCH_CLAIM_MAX).
+        """
+        extra = 0
+        if lookahead > 0:
+            if self.recent_durations:
+                avg_duration = max(sum(self.recent_durations) / len(self.recent_durations), 0.1)
+                extra = math.ceil(MAX_PARALLEL_TASKS * PULL_INTERVAL / avg_duration)
+            extra = min(lookahead, max(extra, 1))
+        
+        return max(0, min(BATCH_CLAIM_MAX, free_slots + extra))
+    
+    def release_task(self, task_file):
+        """
+        Gives back a claimed task that was never started.
+        
+        Args:
+            task_file: Path of the task in tasks/in_progress.
+        
+        Returns:
+            True if the task was returned to the queue, False otherwise.
+        """
+        return self.release_tasks([task_file]) == 1
+    
+    def release_tasks(self, task_files):
+        """
+        Gives back claimed tasks that were never started (e.g. prefetched or
+        batch-claimed leftovers at shutdown) by moving them from in_progress
+        back to the queue in a single commit.
+        
+        Args:
+            task_files: Paths of the tasks in tasks/in_progress.
+        
+        Returns:
+            int: Number of tasks returned to the queue.
+        """
+        if not task_files:
+            return 0
+        
+        try:
+            prefix = f"{self.node_id}-"
+            
+            writer = self.git_handler.get_writer()
+            pending = []
+            for task_file in task_files:
+                task_name = task_file.name[len(prefix):] if task_file.name.startswith(prefix) else task_file.name
+                src = f"tasks/in_progress/{task_file.name}"
+                # Back to the shard it came from (flat queue if unknown)
+                dst = self._claimed_from.pop(task_file.name, f"{QUEUE_PREFIX}/{task_name}")
+                mutation = Mutation(f"[D-GRID] {self.node_id} releases task {task_name}", moves=[(src, dst)],
+                                    node_id=self.node_id)
+                pending.append((task_file, writer.submit(mutation)))
+            
+            released = 0
+            for task_file, future in pending:
+                try:
+                    future.result()
+                    released += 1
+                except Exception as e:
+                    logger.warning(f"Failed to move task {task_file.name} back to queue: {e}")
+            
+            if released:
+                logger.info(f"Released {released} task(s) back to queue")
+            return released
+        except Exception as e:
+            logger.error(f"Error releasing tasks: {e}")
+            return 0
+    
+    def prepare_task(self, task_file):
+        """
+        Reads, validates and signature-checks a task file without running it.
+        Used by the prefetch stage so task N+1 is ready while task N runs.
         
         Args:
             task_file: Path of the task file.
         
         Returns:
-            Dict with exit_code, stdout, stderr.
+            Dict with task_id, script, timeout_seconds and deterministic. If the task is
+            rejected, the dict contains an "error" key holding the result
+            to report (exit_code, stdout, stderr).
         """
         task_id = "unknown"
         try:
             if not task_file.exists():
                 logger.error(f"Task file does not exist: {task_file}")
-                return {"exit_code": -1, "stdout": "", "stderr": "File not found"}
+                return {"task_id": task_id, "error": {"exit_code": -1, "stdout": "", "stderr": "File not found"}}
             
             # Verify task signature (#9: Task Signing & Verification)
             if self.task_signer and self.task_signer.is_enabled():
                 if not self.task_signer.verify_task(task_file):
                     logger.error(f"❌ Task signature verification failed: {task_file.name}")
                     return {
-                        "exit_code": -1,
-                        "stdout": "",
-                        "stderr": "Task signature verification failed - task rejected for security"
+                        "task_id": task_id,
+                        "error": {
+                            "exit_code": -1,
+                            "stdout": "",
+                            "stderr": "Task signature verification failed - task rejected for security"
+                        }
                     }
             
             # Read task file
             with open(task_file, "r") as f:
                 task_data = json.load(f)
             
-            # Schema: task_id, script, timeout_seconds
+            # Schema: task_id, script, timeout_seconds (deterministic: optional)
             task_id = task_data.get("task_id", "unknown")
             task_script = task_data.get("script", "")
             task_timeout = task_data.get("timeout_seconds", 60)
@@ -124,66 +408,121 @@ class TaskRunner:
             # Script validation
             if not task_script or task_script.strip() == "":
                 logger.error(f"Task {task_id}: empty script")
-                return {"exit_code": -1, "stdout": "", "stderr": "Task script is empty"}
+                return {"task_id": task_id, "error": {"exit_code": -1, "stdout": "", "stderr": "Task script is empty"}}
             
             # Timeout validation (must be between 10 and 300)
             if not isinstance(task_timeout, int) or task_timeout < 10 or task_timeout > 300:
                 logger.error(f"Task {task_id}: invalid timeout_seconds: {task_timeout}")
-                return {"exit_code": -1, "stdout": "", "stderr": f"Invalid timeout (required 10-300): {task_timeout}"}
+                return {
+                    "task_id": task_id,
+                    "error": {"exit_code": -1, "stdout": "", "stderr": f"Invalid timeout (required 10-300): {task_timeout}"}
+                }
+            
+            return {"task_id": task_id, "script": task_script, "timeout_seconds": task_timeout,
+                    "deterministic": task_data.get("deterministic") is True}
+        except json.JSONDecodeError as e:
+            logger.error(f"Task {task_id}: malformed JSON file: {e}")
+            return {"task_id": task_id, "error": {"exit_code": -1, "stdout": "", "stderr": f"Malformed JSON: {e}"}}
+        except Exception as e:
+            logger.error(f"Task {task_id}: error preparing task: {e}", exc_info=True)
+            return {"task_id": task_id, "error": {"exit_code": -1, "stdout": "", "stderr": str(e)}}
+    
+    def execute_task(self, task_file, prepared=None):
+        """
+        Reads the task file and executes the command in an isolated Docker container.
+        
+        SECURITY: The container is executed with:
+        - --network=none: No network access
+        - --read-only: Read-only filesystem
+        - --rm: Automatic cleanup (warm containers are removed after the task)
+        - CPU and memory limits
+        
+        Args:
+            task_file: Path of the task file.
+            prepared: Output of prepare_task() if the task was prefetched
+                      (skips reading and signature verification).
+        
+        Returns:
+            Dict with exit_code, stdout, stderr (head and tail of the output,
+            at most OUTPUT_HEAD_BYTES + OUTPUT_TAIL_BYTES each) and, once the
+            task ran, stdout_bytes, stderr_bytes (the full output size).
+        """
+        task_id = "unknown"
+        try:
+            if prepared is None:
+                prepared = self.prepare_task(task_file)
+            
+            task_id = prepared["task_id"]
+            if "error" in prepared:
+                return prepared["error"]
+            
+            task_script = prepared["script"]
+            task_timeout = prepared["timeout_seconds"]
+            
+            # A deterministic task identical to one already run (same image,
+            # script, timeout and limits) is answered from the result cache
+            cache_key = None
+            if self.result_cache and prepared.get("deterministic"):
+                cache_key = self.result_cache.key(task_script, task_timeout)
+                cached = self.result_cache.get(cache_key)
+                if cached:
+                    logger.info(f"♻️  Task {task_id}: result of identical task {cached['cached_from']} "
+                                f"from cache (exit code {cached['exit_code']})")
+                    return cached
             
-            # ⚠️  SECURITY: Image always python:3.11-alpine
-            task_image = "python:3.11-alpine"
             logger.info(f"Executing task {task_id}")
             logger.debug(f"Script length: {len(task_script)} char, timeout: {task_timeout}s")
             
-            # Prepare Docker command with maximum isolation
-            docker_cmd = [
-                "docker", "run",
-                "--rm",
-                # Network isolation
-                "--network=none",
-                # Protected filesystem
-                "--read-only",
-                # Resource limits
-                f"--cpus={DOCKER_CPUS}",
-                f"--memory={DOCKER_MEMORY}",
-                # Process time limits (protects against infinite loops)
-                f"--pids-limit=10",
-                # Do not run as root
-                "--user=1000:1000",
-                # Image and command
-                task_image,
-                "sh", "-c", task_script
-            ]
+            # Warm container from the pool if one is ready, created with the
+            # same isolation flags; otherwise a new one just for this task
+            container = self.container_pool.acquire(self.node_id, task_id) if self.container_pool else None
+            logger.debug(f"Docker isolation: network=none, read-only, user=1000:1000, pids-limit=10 "
+                         f"({self.container_backend.name}{', warm container' if container else ''})")
             
-            logger.debug(f"Docker isolation: network=none, read-only, user=1000:1000, pids-limit=10")
+            # Output is streamed into bounded head/tail buffers (and the
+            # artifact files if OUTPUT_ARTIFACT_DIR is set), never held whole
+            output = get_output_captures(task_id)
             
             # Execute command with aggressive timeout
+            started_at = time.monotonic()
             try:
-                result = subprocess.run(
-                    docker_cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=task_timeout
-                )
-                
-                logger.info(f"Task {task_id} completed with exit code {result.returncode}")
+                if container:
+                    result = self.container_backend.exec(container, task_script, task_timeout, output)
+                else:
+                    # Labeled with the task and node: killed and removed on
+                    # timeout, swept at the next start if the worker dies first
+                    labels = {NODE_LABEL: self.node_id, TASK_LABEL: task_id}
+                    result = self.container_backend.run(TASK_IMAGE, task_script, task_timeout, labels, output)
+                self.record_task_duration(time.monotonic() - started_at)
                 
-                return {
-                    "exit_code": result.returncode,
-                    "stdout": result.stdout[:10000],  # Limit output to 10KB
-                    "stderr": result.stderr[:10000]
-                }
-            except subprocess.TimeoutExpired:
-                logger.error(f"Task {task_id} timeout (>{task_timeout}s)")
+                logger.info(f"Task {task_id} completed with exit code {result['exit_code']} "
+                            f"({result['stdout_bytes']}+{result['stderr_bytes']} output bytes)")
+                if cache_key:
+                    result["cache_key"] = cache_key
+                    self.result_cache.put(cache_key, result, task_id)
+                return result
+            except ContainerTimeout as e:
+                self.record_task_duration(time.monotonic() - started_at)
+                killed = f" (container {e.container} killed)" if e.container else ""
+                logger.error(f"Task {task_id} timeout (>{task_timeout}s){killed}")
+                # What the task printed before it was killed
+                stdout, stderr = output
+                printed = stderr.text()
+                if printed and not printed.endswith("\n"):
+                    printed += "\n"
                 return {
                     "exit_code": -2,
-                    "stdout": "",
-                    "stderr": f"Timeout after {task_timeout}s"
+                    "stdout": stdout.text(),
+                    "stderr": f"{printed}Timeout after {task_timeout}s{killed}",
+                    "stdout_bytes": stdout.total,
+                    "stderr_bytes": stderr.total
                 }
-        except json.JSONDecodeError as e:
-            logger.error(f"Task {task_id}: malformed JSON file: {e}")
-            return {"exit_code": -1, "stdout": "", "stderr": f"Malformed JSON: {e}"}
+            finally:
+                for capture in output:
+                    capture.close()
+                # Used containers are removed (killing what is left running), never reused
+                if container:
+                    self.container_pool.release(container)
         except Exception as e:
             logger.error(f"Task {task_id}: execution error: {e}", exc_info=True)
             return {"exit_code": -1, "stdout": "", "stderr": str(e)}
@@ -191,7 +530,7 @@ class TaskRunner:
     def report_task_result(self, task_file, result):
         """
         Reports the task result by moving the file to the appropriate folder
-        and creating a log file with the output.
+        and creating a log file with the output, and waits for the push.
         
         Args:
             task_file: Path of the task file in in_progress.
@@ -200,59 +539,93 @@ class TaskRunner:
         Returns:
             True if success, False otherwise.
         """
+        future = self.submit_task_result(task_file, result)
+        if future is None:
+            return False
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error(f"Error pushing task result: {e}")
+            return False
+    
+    def submit_task_result(self, task_file, result):
+        """
+        Queues the result report on the git writer without waiting for the
+        push, so it can share a commit with the next claim.
+        With RESULT_MODE=branch the task and its log go to the node's result
+        branch instead (see result_branch.py); the task stays in in_progress
+        until the aggregator merges the result.
+        
+        Args:
+            task_file: Path of the task file in in_progress.
+            result: Dict with exit_code, stdout, stderr.
+        
+        Returns:
+            Future resolved with True once pushed, or None if the report
+            could not be prepared.
+        """
         try:
             if not task_file.exists():
                 logger.error(f"Task file does not exist: {task_file}")
-                return False
+                return None
             
             # Read task
             with open(task_file, "r") as f:
-                task_data = json.load(f)
+                task_content = f.read()
+            task_data = json.loads(task_content)
             
             task_id = task_data.get("id", "unknown")
             task_name = task_file.name
             is_success = result["exit_code"] == 0
             
-            # Determine destination directory
-            dest_dir = self.completed_dir if is_success else self.failed_dir
-            dest_file = dest_dir / task_name
-            
-            # Create log file
-            log_file = dest_dir / f"{task_name}.log"
+            # Log file next to the task in its destination directory
             log_data = {
                 "task_id": task_id,
-                "node_id": NODE_ID,
+                "node_id": self.node_id,
                 "exit_code": result["exit_code"],
                 "stdout": result["stdout"],
                 "stderr": result["stderr"],
+                "stdout_bytes": result.get("stdout_bytes", 0),
+                "stderr_bytes": result.get("stderr_bytes", 0),
                 "timestamp": datetime.utcnow().isoformat(),
                 "status": "success" if is_success else "failed"
             }
+            if result.get("cache_key"):
+                log_data["cache_key"] = result["cache_key"]
+            if result.get("cached"):
+                log_data["cached_from"] = result["cached_from"]
             
-            # Move task file
-            dest_file.parent.mkdir(parents=True, exist_ok=True)
-            task_file.rename(dest_file)
-            logger.info(f"Task file moved: {task_name} -> {dest_file.name}")
-            
-            # Write log
-            with open(log_file, "w") as f:
-                json.dump(log_data, f, indent=2)
-            logger.info(f"Task log written: {log_file.name}")
+            # Shared result cache entry, committed with the result
+            cache_writes = self.result_cache.shared_writes(result) if self.result_cache else {}
             
-            # Commit and push
             src = f"tasks/in_progress/{task_name}"
             dst_relative = f"tasks/{'completed' if is_success else 'failed'}/{task_name}"
             log_relative = f"tasks/{'completed' if is_success else 'failed'}/{task_name}.log"
             
-            if self.git_handler.commit_and_push(
-                f"[D-GRID] Task {task_id} {'completed' if is_success else 'failed'} by {NODE_ID}",
-                paths=[str(dest_file), str(log_file)]
-            ):
-                logger.info(f"Task {task_id} result pushed.")
-                return True
+            message = f"[D-GRID] Task {task_id} {'completed' if is_success else 'failed'} by {self.node_id}"
+            if RESULT_MODE == "branch":
+                future = self.git_handler.get_result_writer().submit(ResultMutation(
+                    self.node_id,
+                    message,
+                    {dst_relative: task_content, log_relative: json.dumps(log_data, indent=2), **cache_writes}
+                ))
             else:
-                logger.error(f"Error pushing task {task_id} result")
-                return False
+                # Working tree changes happen in the git writer, under the repo
+                # lock, otherwise a concurrent pull could see a dirty tree (#7)
+                mutation = Mutation(
+                    message,
+                    moves=[(src, dst_relative)],
+                    writes={log_relative: json.dumps(log_data, indent=2), **cache_writes},
+                    node_id=self.node_id
+                )
+                future = self.git_handler.get_writer().submit(mutation)
+            
+            def on_pushed(done):
+                if not done.exception():
+                    logger.info(f"Task {task_id} result pushed.")
+            
+            future.add_done_callback(on_pushed)
+            return future
         except Exception as e:
             logger.error(f"Error reporting task result: {e}")
-            return False
+            return None
@@ -0,0 +1,67 @@
+"""
+D-GRID Task Selection Module
+Spreads workers across the queue instead of every node racing for the
+first task, which made all but one acquisition push per cycle fail.
+"""
+import hashlib
+import random
+from logger_config import get_logger
+
+logger = get_logger("task_selection")
+
+
+class TaskSelector:
+    """Chooses which queued tasks a node tries to claim."""
+
+    STRATEGIES = {
+        "first": "Oldest tasks first (every node competes for the same files)",
+        "random": "Node-seeded random choice within the candidate window",
+        "rendezvous": "Rendezvous hashing: each node has its own stable preference order"
+    }
+
+    def __init__(self, node_id, strategy="rendezvous", window=32):
+        """
+        Initialize the selector.
+
+        Args:
+            node_id: Node identifier, used to seed the selection
+            strategy: One of STRATEGIES
+            window: Number of head-of-queue tasks considered, which keeps
+                    selection close to FIFO order while spreading nodes
+        """
+        if strategy not in self.STRATEGIES:
+            logger.warning(f"Invalid selection strategy '{strategy}', defaulting to 'rendezvous'")
+            strategy = "rendezvous"
+
+        self.node_id = node_id
+        self.strategy = strategy
+        self.window = max(1, int(window))
+        self._rng = random.Random(f"{node_id}-{random.random()}")
+
+    def _score(self, task_name):
+        """Rendezvous weight of a task for this node."""
+        return hashlib.sha1(f"{self.node_id}:{task_name}".encode()).digest()
+
+    def select(self, task_names, count):
+        """
+        Pick up to count tasks to claim.
+
+        Args:
+            task_names: Queued task names in queue order (oldest first)
+            count: Number of tasks wanted
+
+        Returns:
+            list: Selected task names
+        """
+        if count < 1 or not task_names:
+            return []
+
+        candidates = list(task_names[:max(self.window, count)])
+
+        if self.strategy == "first":
+            return candidates[:count]
+
+        if self.strategy == "random":
+            return self._rng.sample(candidates, min(count, len(candidates)))
+
+        return sorted(candidates, key=self._score, reverse=True)[:count]
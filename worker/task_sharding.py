@@ -4,7 +4,9 @@ Implements #1: Task Sharding & Priority Queues.
 Reduces contention and enables task prioritization.
 """
 import hashlib
-from pathlib import Path
+import heapq
+import json
+from pathlib import Path, PurePosixPath
 from logger_config import get_logger
 
 logger = get_logger("task_sharding")
@@ -20,36 +22,97 @@ class TaskSharding:
         "low": 3
     }
     
-    def __init__(self, queue_base_path):
+    # Committed next to the queue so every node and producer agrees on the
+    # current fan-out; rewritten by the migration commit that changes it
+    LAYOUT_FILE = ".layout"
+    
+    def __init__(self, queue_base_path, shard_digits=1):
         """
         Initialize task sharding.
         
         Args:
             queue_base_path: Base path for task queue (e.g., tasks/queue)
+            shard_digits: Hex digits of the task hash used for bucketing when
+                          the queue has no layout file yet (1 = 16 shards,
+                          2 = 256, 3 = 4096, 4 = 65536)
         """
         self.queue_base_path = Path(queue_base_path)
+        self.shard_digits = shard_digits
+        self.load_layout()
         self._ensure_shard_directories()
     
     def _ensure_shard_directories(self):
-        """Create shard directories for priorities and hash buckets."""
+        """
+        Create the priority directories.
+        Shard directories are created on demand: git does not track empty
+        directories, and eagerly creating 4 x 4096 of them is wasted work.
+        """
         try:
-            # Create priority subdirectories
             for priority in self.PRIORITY_LEVELS.keys():
                 priority_dir = self.queue_base_path / priority
                 priority_dir.mkdir(parents=True, exist_ok=True)
                 logger.debug(f"Created priority directory: {priority}")
             
-            # Create hash-based shards within each priority (0-9, a-f)
-            for priority in self.PRIORITY_LEVELS.keys():
-                for shard in "0123456789abcdef":
-                    shard_dir = self.queue_base_path / priority / shard
-                    shard_dir.mkdir(parents=True, exist_ok=True)
-            
-            logger.info("✅ Task shard directories initialized")
+            logger.info(f"✅ Task shard directories initialized ({self.bucket_count()} shards per priority)")
             
         except Exception as e:
             logger.error(f"Error creating shard directories: {e}")
     
+    def load_layout(self):
+        """
+        Reads the shard fan-out from the committed layout file, if any.
+        
+        Returns:
+            int: Current shard digits
+        """
+        layout_file = self.queue_base_path / self.LAYOUT_FILE
+        try:
+            if layout_file.exists():
+                with open(layout_file, 'r') as f:
+                    self.shard_digits = int(json.load(f)["shard_digits"])
+        except Exception as e:
+            logger.warning(f"Invalid queue layout file, keeping {self.shard_digits} shard digit(s): {e}")
+        return self.shard_digits
+    
+    def write_layout(self, shard_digits):
+        """
+        Writes the layout file for a new fan-out (committed by the caller
+        together with the renames).
+        
+        Returns:
+            Path: The layout file
+        """
+        layout_file = self.queue_base_path / self.LAYOUT_FILE
+        with open(layout_file, 'w') as f:
+            json.dump({"shard_digits": shard_digits}, f)
+            f.write("\n")
+        self.shard_digits = shard_digits
+        return layout_file
+    
+    def bucket_count(self, shard_digits=None):
+        """Number of shards per priority for a fan-out."""
+        return 16 ** (shard_digits or self.shard_digits)
+    
+    @staticmethod
+    def shard_parts(task_id, shard_digits):
+        """
+        Shard directories of a task: the hash prefix split over at most two
+        levels, so no directory holds more than 256 shard subdirectories.
+        
+        1 digit: a/    2 digits: a/b/    3 digits: a/bc/    4 digits: ab/cd/
+        
+        Args:
+            task_id: Unique task identifier
+            shard_digits: Hex digits of the hash to use
+        
+        Returns:
+            list: One or two directory names
+        """
+        task_hash = hashlib.md5(task_id.encode()).hexdigest()[:shard_digits]
+        first = task_hash[:max(1, shard_digits // 2)]
+        second = task_hash[len(first):]
+        return [first, second] if second else [first]
+    
     def get_task_shard_path(self, task_id, priority="medium"):
         """
         Get the shard path for a task based on its ID and priority.
@@ -66,11 +129,15 @@ class TaskSharding:
             logger.warning(f"Invalid priority '{priority}', defaulting to 'medium'")
             priority = "medium"
         
-        # Hash-based sharding: use first character of task_id hash
-        task_hash = hashlib.md5(task_id.encode()).hexdigest()
-        shard_id = task_hash[0]
-        
-        return self.queue_base_path / priority / shard_id
+        return self.queue_base_path.joinpath(priority, *self.shard_parts(task_id, self.shard_digits))
+    
+    def _iter_task_files(self, directory):
+        """Task files below a directory at any shard depth, in name order."""
+        for entry in sorted(directory.iterdir()):
+            if entry.is_dir():
+                yield from self._iter_task_files(entry)
+            elif entry.suffix == '.json':
+                yield entry
     
     def find_next_task(self):
         """
@@ -89,16 +156,10 @@ class TaskSharding:
                 if not priority_dir.exists():
                     continue
                 
-                # Scan all shards within this priority
-                for shard_dir in sorted(priority_dir.iterdir()):
-                    if not shard_dir.is_dir():
-                        continue
-                    
-                    # Find first available task in this shard
-                    tasks = sorted([f for f in shard_dir.iterdir() if f.is_file() and f.suffix == '.json'])
-                    if tasks:
-                        logger.info(f"Found task in {priority}/{shard_dir.name}: {tasks[0].name}")
-                        return tasks[0]
+                # Find first available task in any shard of this priority
+                for task_file in self._iter_task_files(priority_dir):
+                    logger.info(f"Found task in {task_file.parent.relative_to(self.queue_base_path)}: {task_file.name}")
+                    return task_file
             
             logger.debug("No tasks found in any shard")
             return None
@@ -127,11 +188,7 @@ class TaskSharding:
                     stats["by_priority"][priority] = 0
                     continue
                 
-                count = 0
-                for shard_dir in priority_dir.iterdir():
-                    if shard_dir.is_dir():
-                        tasks = [f for f in shard_dir.iterdir() if f.is_file() and f.suffix == '.json']
-                        count += len(tasks)
+                count = sum(1 for _ in priority_dir.rglob("*.json"))
                 
                 stats["by_priority"][priority] = count
                 stats["total"] += count
@@ -142,6 +199,200 @@ class TaskSharding:
         except Exception as e:
             logger.error(f"Error getting queue stats: {e}")
             return stats
+    
+    @staticmethod
+    def recommended_digits(queue_size, target_per_shard, min_digits=1, max_digits=3):
+        """
+        Smallest fan-out keeping the average shard at or below the target.
+        
+        Args:
+            queue_size: Number of queued tasks
+            target_per_shard: Desired maximum tasks per shard directory
+            min_digits: Lower bound on shard digits
+            max_digits: Upper bound on shard digits
+        
+        Returns:
+            int: Shard digits
+        """
+        digits = min_digits
+        while digits < max_digits and queue_size > target_per_shard * 16 ** digits:
+            digits += 1
+        return digits
+    
+    @classmethod
+    def plan_fanout(cls, current_digits, queue_size, target_per_shard, min_digits=1, max_digits=3):
+        """
+        Decide whether the queue should be split or merged.
+        Splits as soon as shards exceed the target, but merges only once the
+        smaller layout would stay under half the target, so a queue hovering
+        around a threshold does not migrate back and forth.
+        
+        Returns:
+            int: Shard digits to use (current_digits if no change is needed)
+        """
+        split = cls.recommended_digits(queue_size, target_per_shard, min_digits, max_digits)
+        if split > current_digits:
+            return split
+        
+        merge = cls.recommended_digits(queue_size, target_per_shard // 2, min_digits, max_digits)
+        if merge < current_digits:
+            return merge
+        
+        return max(min(current_digits, max_digits), min_digits)
+    
+    def migration_plan(self, task_paths, shard_digits, queue_prefix="tasks/queue"):
+        """
+        Renames needed to move queued tasks to a new fan-out.
+        The shard key is the file name stem (task files are named
+        <task_id>.json), so no task file has to be read.
+        Legacy flat tasks are left alone (see migrate_legacy_tasks).
+        
+        Args:
+            task_paths: Repository-relative paths of queued tasks
+            shard_digits: Target shard digits
+            queue_prefix: Repository-relative queue directory
+        
+        Returns:
+            list: (src, dst) repository-relative path pairs
+        """
+        renames = []
+        for path in task_paths:
+            pure = PurePosixPath(path)
+            parts = pure.relative_to(queue_prefix).parts
+            if len(parts) < 2 or parts[0] not in self.PRIORITY_LEVELS:
+                continue
+            
+            dst = PurePosixPath(queue_prefix, parts[0], *self.shard_parts(pure.stem, shard_digits), pure.name)
+            if str(dst) != path:
+                renames.append((path, str(dst)))
+        return renames
+
+
+class QueueIndex:
+    """
+    In-memory priority index of queued tasks.
+    
+    Built once from the queue paths at startup, then kept current with the
+    paths changed between two HEADs, so picking the next task costs
+    O(log n) instead of scanning every shard directory on each poll.
+    Supports both the sharded layout (queue/<priority>/<shard>/<task>.json)
+    and legacy flat tasks (queue/<task>.json, treated as "medium").
+    """
+    
+    def __init__(self, queue_prefix="tasks/queue"):
+        """
+        Initialize an empty index.
+        
+        Args:
+            queue_prefix: Repository-relative queue directory
+        """
+        self.queue_prefix = queue_prefix.rstrip("/")
+        self.indexed_commit = None  # HEAD the index reflects
+        self._heap = []
+        self._live = set()
+    
+    def __len__(self):
+        return len(self._live)
+    
+    def priority_of(self, path):
+        """Priority level (0 = critical) of a queue path."""
+        parts = PurePosixPath(path).relative_to(self.queue_prefix).parts
+        if len(parts) > 1 and parts[0] in TaskSharding.PRIORITY_LEVELS:
+            return TaskSharding.PRIORITY_LEVELS[parts[0]]
+        return TaskSharding.PRIORITY_LEVELS["medium"]
+    
+    def _is_task(self, path):
+        return path.startswith(self.queue_prefix + "/") and path.endswith(".json")
+    
+    def build(self, paths, commit=None):
+        """
+        (Re)build the index from a full list of repository paths.
+        
+        Args:
+            paths: Repository-relative paths (non-queue paths are ignored)
+            commit: HEAD the paths were read from
+        """
+        self._live = {path for path in paths if self._is_task(path)}
+        self._heap = [(self.priority_of(path), PurePosixPath(path).name, path) for path in self._live]
+        heapq.heapify(self._heap)
+        self.indexed_commit = commit
+        logger.info(f"Queue index built: {len(self._live)} task(s)")
+    
+    def add(self, path):
+        """Add a queued task path."""
+        if self._is_task(path) and path not in self._live:
+            self._live.add(path)
+            heapq.heappush(self._heap, (self.priority_of(path), PurePosixPath(path).name, path))
+    
+    def paths(self):
+        """All queued task paths currently indexed."""
+        return list(self._live)
+    
+    def remove(self, path):
+        """Remove a task path (lazy deletion, O(1))."""
+        self._live.discard(path)
+    
+    def apply_changes(self, changes, commit=None):
+        """
+        Apply the changes between the indexed HEAD and a new one.
+        
+        Args:
+            changes: List of (status, path) from 'git diff --name-status'
+            commit: New HEAD the index now reflects
+        """
+        for status, path in changes:
+            if status.startswith("D"):
+                self.remove(path)
+            else:
+                self.add(path)
+        
+        # Rebuild once stale heap entries dominate, so memory stays bounded
+        if len(self._heap) > 2 * len(self._live) + 1024:
+            self._heap = [(self.priority_of(path), PurePosixPath(path).name, path) for path in self._live]
+            heapq.heapify(self._heap)
+        
+        self.indexed_commit = commit
+    
+    def candidates(self, count):
+        """
+        Highest-priority queued tasks, in priority then name order.
+        Costs O(count * log n), independent of queue size.
+        
+        Args:
+            count: Maximum number of candidates
+        
+        Returns:
+            list: Repository-relative task paths
+        """
+        popped = []
+        result = []
+        while self._heap and len(result) < count:
+            entry = heapq.heappop(self._heap)
+            if entry[2] not in self._live or (popped and entry == popped[-1]):
+                continue  # Stale or duplicate entry
+            popped.append(entry)
+            result.append(entry[2])
+        
+        for entry in popped:
+            heapq.heappush(self._heap, entry)
+        
+        return result
+    
+    def get_stats(self):
+        """
+        Queue statistics from the index (same shape as
+        TaskSharding.get_queue_stats(), without touching the filesystem).
+        """
+        by_priority = {priority: 0 for priority in TaskSharding.PRIORITY_LEVELS}
+        levels = {level: priority for priority, level in TaskSharding.PRIORITY_LEVELS.items()}
+        for path in self._live:
+            by_priority[levels[self.priority_of(path)]] += 1
+        
+        return {
+            "total": len(self._live),
+            "by_priority": by_priority,
+            "indexed_commit": self.indexed_commit[:8] if self.indexed_commit else None
+        }
 
 
 # Legacy support: check if task is in old flat queue structure
@@ -169,7 +420,6 @@ def migrate_legacy_tasks(old_queue_path, sharding):
         for task_file in tasks:
             try:
                 # Parse task to get priority (default to medium)
-                import json
                 with open(task_file, 'r') as f:
                     task_data = json.load(f)
                 
@@ -181,6 +431,7 @@ def migrate_legacy_tasks(old_queue_path, sharding):
                 new_path = shard_path / task_file.name
                 
                 # Move task to new location
+                shard_path.mkdir(parents=True, exist_ok=True)
                 task_file.rename(new_path)
                 logger.info(f"Migrated task {task_file.name} to {priority} queue")
                 
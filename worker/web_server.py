@@ -11,6 +11,7 @@ Exposes a local UI on localhost:8000 that shows:
 
 import json
 import os
+import subprocess
 import sys
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
@@ -26,6 +27,12 @@ REPO_PATH = Path(os.getenv("DGRID_REPO_PATH", "/tmp/dgrid-repo"))
 NODE_ID = os.getenv("NODE_ID", "unknown-node")
 PORT = 8000
 
+# Health monitor whose summary is served on /api/metrics (set by start_web_server)
+_health_monitor = None
+
+# State index serving task counts and the node list (set by start_web_server)
+_state_index = None
+
 
 class WorkerDashboardHandler(BaseHTTPRequestHandler):
     """HTTP handler for the worker dashboard"""
@@ -36,6 +43,8 @@ class WorkerDashboardHandler(BaseHTTPRequestHandler):
             self.serve_dashboard()
         elif self.path == "/api/status":
             self.serve_status_json()
+        elif self.path == "/api/metrics":
+            self.serve_metrics_json()
         elif self.path == "/health":
             self.serve_health()
         else:
@@ -60,6 +69,16 @@ class WorkerDashboardHandler(BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(json_str.encode("utf-8"))
 
+    def serve_metrics_json(self):
+        """Serves the worker health summary and performance metrics as JSON"""
+        metrics = _health_monitor.get_health_summary() if _health_monitor else {}
+        json_str = json.dumps(metrics, indent=2, default=str)
+        self.send_response(200)
+        self.send_header("Content-type", "application/json")
+        self.send_header("Content-Length", len(json_str))
+        self.end_headers()
+        self.wfile.write(json_str.encode("utf-8"))
+
     def serve_health(self):
         """Simple health check"""
         self.send_response(200)
@@ -351,44 +370,38 @@ class WorkerDashboardHandler(BaseHTTPRequestHandler):
         uptime = "N/A"
         last_heartbeat = "N/A"
 
-        if node_file.exists():
+        node_data = None
+        if _state_index:
+            node_data = _state_index.nodes().get(NODE_ID)
+        elif node_file.exists():
             try:
                 with open(node_file, "r") as f:
                     node_data = json.load(f)
-                    last_heartbeat = node_data.get("last_heartbeat", "N/A")
-                    
-                    # Calculate if active (heartbeat < 5 min ago)
-                    if last_heartbeat != "N/A":
-                        try:
-                            ts = datetime.fromisoformat(last_heartbeat.replace("Z", "+00:00"))
-                            delta = (datetime.now(timezone.utc) - ts).total_seconds()
-                            is_active = delta < 300  # 5 minutes
-                        except:
-                            pass
             except:
                 pass
 
-        # Count tasks
-        task_dirs = {
-            "tasks_queue": REPO_PATH / "tasks" / "queue",
-            "tasks_in_progress": REPO_PATH / "tasks" / "in_progress",
-            "tasks_completed": REPO_PATH / "tasks" / "completed",
-            "tasks_failed": REPO_PATH / "tasks" / "failed",
-        }
+        if node_data:
+            last_heartbeat = node_data.get("last_heartbeat") or "N/A"
 
-        task_counts = {}
-        recent_tasks = []
-        for key, path in task_dirs.items():
-            if path.exists():
-                tasks = list(path.glob("*/"))
-                task_counts[key] = len(tasks)
-                recent_tasks.extend([t.name for t in tasks[:3]])
-            else:
-                task_counts[key] = 0
+            # Calculate if active (heartbeat < 5 min ago)
+            if last_heartbeat != "N/A":
+                try:
+                    ts = datetime.fromisoformat(last_heartbeat.replace("Z", "+00:00"))
+                    delta = (datetime.now(timezone.utc) - ts).total_seconds()
+                    is_active = delta < 300  # 5 minutes
+                except:
+                    pass
 
-        # Count visible nodes
-        nodes_dir = REPO_PATH / "nodes"
-        visible_nodes = len(list(nodes_dir.glob("*.json"))) if nodes_dir.exists() else 0
+        # Counts and node list come from the state index, kept current from
+        # the paths changed by each pull: no listing of tasks/completed
+        if _state_index:
+            counts = _state_index.task_counts()
+            task_counts = {f"tasks_{task_dir}": count for task_dir, count in counts.items()}
+            recent_tasks = [path.rsplit("/", 1)[-1] for task_dir in counts
+                            for path in _state_index.task_paths(task_dir, limit=3)]
+            visible_nodes = len(_state_index.nodes())
+        else:
+            task_counts, recent_tasks, visible_nodes = self._scan_repository()
 
         return {
             "node_id": NODE_ID,
@@ -403,13 +416,50 @@ class WorkerDashboardHandler(BaseHTTPRequestHandler):
             "recent_tasks": recent_tasks[:8],
         }
 
+    def _scan_repository(self):
+        """Task counts, recent tasks and visible nodes without a state index"""
+        # Count tasks from the git index: with a sparse checkout
+        # tasks/completed and tasks/failed are not in the working tree
+        task_dirs = {
+            "tasks_queue": "tasks/queue",
+            "tasks_in_progress": "tasks/in_progress",
+            "tasks_completed": "tasks/completed",
+            "tasks_failed": "tasks/failed",
+        }
+
+        task_counts = {}
+        recent_tasks = []
+        for key, path in task_dirs.items():
+            tasks = [t for t in _tracked_files(path) if t.endswith(".json")]
+            task_counts[key] = len(tasks)
+            recent_tasks.extend([t.rsplit("/", 1)[-1] for t in tasks[:3]])
+
+        # Count visible nodes
+        nodes_dir = REPO_PATH / "nodes"
+        visible_nodes = len(list(nodes_dir.glob("*.json"))) if nodes_dir.exists() else 0
+
+        return task_counts, recent_tasks, visible_nodes
+
     def log_message(self, format, *args):
         """Silence default logging"""
         logger.debug(f"HTTP: {format % args}")
 
 
-def start_web_server():
+def _tracked_files(directory):
+    """Tracked paths under a repository directory (empty list on error)."""
+    try:
+        result = subprocess.run(["git", "ls-files", "-z", "--", directory],
+                                cwd=REPO_PATH, capture_output=True, check=True)
+        return [path for path in result.stdout.decode().split("\0") if path]
+    except Exception:
+        return []
+
+
+def start_web_server(health_monitor=None, state_index=None):
     """Starts the web server in a separate thread"""
+    global _health_monitor, _state_index
+    _health_monitor = health_monitor
+    _state_index = state_index
     server = HTTPServer(("0.0.0.0", PORT), WorkerDashboardHandler)
     thread = threading.Thread(target=server.serve_forever, daemon=True)
     thread.start()
@@ -0,0 +1,130 @@
+"""
+D-GRID Worker Node Module
+One logical node of the grid: its registration and heartbeat, its claims in
+tasks/in_progress/{node_id}-* and the executor slots that run them.
+main.py runs a single node; supervisor.py runs several on the same clone,
+sharing the GitHandler, the pulls, the queue index and the dashboard.
+"""
+from logger_config import get_logger
+from state_manager import StateManager
+from task_runner import TaskRunner
+from task_executor import ParallelExecutor
+from task_prefetch import TaskPrefetcher
+from config import MAX_PARALLEL_TASKS, PREFETCH_DEPTH, MAX_TASKS_PER_HOUR
+
+logger = get_logger("worker_node")
+
+
+class WorkerNode:
+    """A logical node with its own heartbeat, claims and executor slots."""
+
+    def __init__(self, node_id, git_handler, health_monitor, queue_index=None, slot_freed=None, container_pool=None,
+                 container_backend=None, result_cache=None):
+        """
+        Initialize the node.
+
+        Args:
+            node_id: Node ID used for the node file, heartbeat ref and claims
+            git_handler: GitHandler of the clone (shared under a supervisor)
+            health_monitor: HealthMonitor of the process (rate limit, counters)
+            queue_index: QueueIndex shared by the nodes of a supervisor
+            slot_freed: threading.Event set when any node's slot is released
+            container_pool: ContainerPool shared by the nodes of the process
+            container_backend: Container backend shared by the nodes of the process
+            result_cache: ResultCache shared by the nodes of the process
+        """
+        self.node_id = node_id
+        self.health_monitor = health_monitor
+        self.state_manager = StateManager(git_handler, node_id)
+        self.task_runner = TaskRunner(git_handler, node_id, queue_index, container_pool, container_backend,
+                                      result_cache)
+
+        # Slot-based executor (#7: Parallel execution) fed by the prefetch stage:
+        # a slot that finishes a task chains straight into a prefetched one
+        self.prefetcher = TaskPrefetcher(self.task_runner, PREFETCH_DEPTH)
+        self.executor = ParallelExecutor(MAX_PARALLEL_TASKS, self.run_task,
+                                         next_task_fn=self.prefetcher.pop, slot_freed=slot_freed)
+
+    def run_task(self, task_file, prepared=None):
+        """Executes and reports a single task inside an executor slot."""
+        logger.info(f"[{self.node_id}] Executing task: {task_file.name}")
+        result = self.task_runner.execute_task(task_file, prepared)
+
+        # Record task execution for rate limiting
+        self.health_monitor.record_task_execution()
+
+        # Report the result (critical operation). The slot does not wait for
+        # the push: the git writer batches it with the next claim.
+        logger.info(f"[{self.node_id}] Reporting result: exit_code={result['exit_code']}")
+        future = self.task_runner.submit_task_result(task_file, result)
+        if future is None:
+            logger.error("Failed to report result. Task may remain orphaned.")
+            self.health_monitor.failed_pushes += 1
+            return
+
+        def on_reported(done):
+            # The writer has already synced the local state with the remote
+            if done.exception():
+                logger.error(f"Failed to push result of {task_file.name}: {done.exception()}. "
+                             "Task may remain orphaned.")
+                self.health_monitor.failed_pushes += 1
+
+        future.add_done_callback(on_reported)
+
+    def register(self):
+        """
+        Registers the node file.
+
+        Returns:
+            True if success.
+        """
+        return self.state_manager.register_node()
+
+    def fill_slots(self):
+        """
+        One acquisition cycle, run by the main loop after each pull: hands
+        prefetched tasks to idle slots, then claims a batch for the free slots
+        and the prefetch buffer (one commit/push for K tasks).
+
+        Returns:
+            int: Number of tasks claimed
+        """
+        # Hand prefetched tasks to any slot that went idle meanwhile
+        while self.executor.free_slots() > 0 and self.prefetcher.size() > 0:
+            ready = self.prefetcher.pop()
+            if ready:
+                self.executor.submit(*ready)
+
+        batch_size = self.task_runner.get_batch_size(self.executor.free_slots(), self.prefetcher.capacity())
+
+        # Check rate limiting (#10)
+        if batch_size > 0 and not self.health_monitor.can_execute_task(MAX_TASKS_PER_HOUR):
+            logger.debug("Rate limit reached, not acquiring more tasks.")
+            batch_size = 0
+
+        # Look for tasks to execute
+        claimed = self.task_runner.claim_tasks(batch_size)
+        for task_file in claimed:
+            prepared = self.prefetcher.prepare(task_file)
+            if not self.executor.submit(task_file, prepared):
+                self.prefetcher.add(task_file, prepared)
+        return len(claimed)
+
+    def shutdown(self):
+        """Waits for the running tasks and gives the prefetched ones back."""
+        self.executor.shutdown(wait=True)
+        self.prefetcher.release_all()
+
+    def get_stats(self):
+        """
+        Get node statistics.
+
+        Returns:
+            dict: Slot utilization, prefetch, acquisition and heartbeat stats
+        """
+        return {
+            "executor": self.executor.get_utilization(),
+            "prefetch": self.prefetcher.get_stats(),
+            "acquisition": self.task_runner.get_acquisition_stats(),
+            "heartbeat": self.state_manager.get_heartbeat_stats()
+        }